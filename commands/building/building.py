@@ -15,9 +15,14 @@ from commands.building.item_building import ItemMakingMenu, ItemSculptingMenu
 from evennia import create_object, default_cmds
 from typeclasses.objects import Object
 from typeclasses.items import Building
+from typeclasses.characters import Character
 from evennia.utils.logger import log_file
 from evennia import utils as utils
 from world.handlers.biomes import apply_biomes
+from world import registries
+from world.character_creation import benchmark_creation
+from world import npc_spawner
+from world.handlers import map_atlas, room_snapshot, spatial_index
 from django.conf import settings
 
 
@@ -270,7 +275,9 @@ class CmdDig(default_cmds.CmdDig, MuxCommand):
             if to_exit["name"] == "southeast" or to_exit["name"] =="se":
                 new_room.traits.ycord.base = self.caller.location.traits.ycord.base - 1
                 new_room.traits.xcord.base = self.caller.location.traits.xcord.base + 1
-
+        # coordinate changes update maps themselves, but the zone or map
+        # symbol may have changed too
+        new_room.at_map_change()
 
         # create exit to room
 
@@ -616,6 +623,7 @@ class CoordinateWorm(Object):
             room.traits.ycord.base = self.curY
             room.db.info['zone'] = self.zone
             room.db.info['outdoor room'] = self.outdoors
+            room.at_map_change()
 
 
     def update_pos(self, room, exit_name):
@@ -708,3 +716,161 @@ class CreateTownCmd(Command):
                 home=self.caller.location)
         self.caller.execute_cmd(f"open enter {town.key};enter town;enter,exit {town.key};exit town;exit = #{town.db.entryway.id}")
         self.caller.msg(f"You create a town named {town.key}")
+
+
+class ReloadRegistriesCmd(Command):
+    """
+    Reloads the mutation, talent, and biome registries from their data files.
+
+    Usage:
+        @reloadregistries
+
+    The data files live in world/data/. Every registry is loaded and
+    validated before any of them is swapped in, so a broken data file leaves
+    the running game untouched. No server reload is required.
+    """
+    key = '@reloadregistries'
+    locks = 'cmd:id(1) or perm(Admins)'
+    help_category = 'Building'
+
+    def func(self):
+        try:
+            counts = registries.reload_registries()
+        except registries.RegistryException as err:
+            self.msg(f"|rRegistry reload failed, nothing was changed:|n {err.msg}")
+            return
+        summary = ", ".join(f"{name}: {count}" for name, count in counts.items())
+        log_file(f"{self.caller.key} reloaded registries ({summary})",
+                 filename='registries.log')
+        self.msg(f"Registries reloaded. {summary}")
+
+
+class BenchCreateCmd(Command):
+    """
+    Benchmarks character creation.
+
+    Usage:
+        @benchcreate [number of characters]
+
+    Creates the given number of throwaway characters (10 by default) in
+    your current location, reports the time taken per character, and then
+    deletes them again. Results are also written to benchmarks.log.
+    """
+    key = '@benchcreate'
+    locks = 'cmd:id(1) or perm(Admins)'
+    help_category = 'Building'
+
+    def func(self):
+        count = self.args.strip()
+        count = int(count) if count.isdigit() else 10
+        result = benchmark_creation(count, self.caller.location)
+        self.msg(f"Created {result['count']} characters in "
+                 f"{result['total']:.3f}s: |w{result['per_character']:.1f} ms|n "
+                 f"per character.")
+
+
+class CompactBodyCmd(MuxCommand):
+    """
+    Migrates body part objects to inline body part components.
+
+    Usage:
+        @compactbody <character>
+        @compactbody/all
+
+    Each body part object of the character is converted to a component
+    stored in the character's `body_parts` Attribute, and the object is
+    deleted. With /all, every character whose typeclass sets `compact_body`
+    (NPCs and mobs) is migrated.
+    """
+    key = '@compactbody'
+    switch_options = ('all',)
+    locks = 'cmd:id(1) or perm(Admins)'
+    help_category = 'Building'
+
+    def func(self):
+        caller = self.caller
+        if 'all' in self.switches:
+            characters = [char for char in Character.objects.all_family()
+                          if char.compact_body]
+        elif self.args:
+            target = caller.search(self.args.strip(), global_search=True)
+            if not target:
+                return
+            if not utils.inherits_from(target, 'typeclasses.characters.Character'):
+                caller.msg(f"|r{target.key} is not a character.|n")
+                return
+            characters = [target]
+        else:
+            caller.msg("Usage: @compactbody <character> or @compactbody/all")
+            return
+        converted = 0
+        for char in characters:
+            converted += char.body.compact()
+        log_file(f"{caller.key} compacted {converted} body parts on "
+                 f"{len(characters)} characters.", filename='body_parts.log')
+        caller.msg(f"Converted {converted} body parts on {len(characters)} "
+                   f"character(s) to components.")
+
+
+class SpawnNPCsCmd(MuxCommand):
+    """
+    Spawns many NPCs from a prototype into your current location.
+
+    Usage:
+        @spawnnpcs[/replace] <prototype> [= <number>]
+
+    Switches:
+        replace - first delete the NPCs of this prototype already here
+
+    Prototypes are defined in world/prototypes.py, ex. 'raider'. Stats for
+    every NPC are rolled in one batch and the NPCs are created in chunks,
+    each in a single database transaction. Spawns 1 NPC by default.
+    """
+    key = '@spawnnpcs'
+    switch_options = ('replace',)
+    locks = 'cmd:id(1) or perm(Builders)'
+    help_category = 'Building'
+
+    def func(self):
+        caller = self.caller
+        if not self.lhs:
+            caller.msg("Usage: @spawnnpcs[/replace] <prototype> [= <number>]")
+            return
+        count = self.rhs.strip() if self.rhs else '1'
+        if not count.isdigit():
+            caller.msg("|rThe number of NPCs must be a whole number.|n")
+            return
+        spawn = npc_spawner.repopulate if 'replace' in self.switches \
+            else npc_spawner.spawn_npcs
+        try:
+            report = spawn(self.lhs.strip(), int(count), caller.location)
+        except npc_spawner.SpawnerException as err:
+            caller.msg(f"|r{err.msg}|n")
+            return
+        if 'cleared' in report:
+            caller.msg(f"Removed {report['cleared']} existing NPCs.")
+        caller.msg(f"Spawned {report['count']} NPCs in {report['total']:.2f}s "
+                   f"(|w{report['rate']:.1f}|n per second).")
+
+
+class SpatialIndexCmd(Command):
+    """
+    Rebuilds the spatial index of rooms.
+
+    Usage:
+        @spatialindex
+
+    Re-indexes every room at the zone and X, Y coordinates it has now. The
+    index is normally kept up to date on its own; use this after editing
+    zones by hand or if room lookups by coordinates look wrong.
+    """
+    key = '@spatialindex'
+    locks = 'cmd:id(1) or perm(Admins)'
+    help_category = 'Building'
+
+    def func(self):
+        self.msg("Rebuilding the spatial index...")
+        room_snapshot.reset()
+        indexed = spatial_index.rebuild()
+        map_atlas.reset()
+        self.msg(f"{indexed} rooms indexed by zone and coordinates.")
@@ -564,19 +564,19 @@ def nomatch_csa(menu, caller, item, string):
         elif option_letter == 'T':
             match = caller.search(cmd_str)
             if match:
-                item.db.key_for.append(match)
+                item.add_target(match)
         elif option_letter == 'U':
             if cmd_str == 'True':
-                item.db.armed = True
+                item.arm()
                 caller.msg("Set to True")
             else:
-                item.db.armed = False
+                item.disarm()
                 caller.msg("Set to False")
         elif option_letter == 'V':
             item.talents.sneak.current = int(cmd_str)
             caller.msg(f"Trap Hide 'skill' Set to: {int(cmd_str)}")
         elif option_letter == 'W':
-            item.db.triggered_by.append(cmd_str)
+            item.add_trigger(cmd_str)
             caller.msg(f"Added {cmd_str} to {item.db.triggered_by}")
         else:
             caller.msg("Sorry, that cannot be set at this time.")
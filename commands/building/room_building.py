@@ -6,6 +6,7 @@ from evennia.contrib.building_menu import BuildingMenu
 from evennia.utils import lazy_property
 from world.handlers.traits import TraitHandler
 from evennia.utils.logger import log_file
+from world.handlers import spatial_index
 
 MAP_SYMBOLS = {
     'Crossroads' : ['|155╬|n','|255╬|n','|355╬|n','|455╬|n','|555╬|n'],
@@ -285,6 +286,7 @@ def nomatch_map_symbol(menu, caller, room, string):
         caller.msg(f"You typed in {string}. Checking against dictionary of map symbols.")
         if string in MAP_SYMBOLS.keys():
             room.db.map_symbol = MAP_SYMBOLS[string]
+            room.at_map_change()
             caller.msg(f"Map Symbol set to: {MAP_SYMBOLS[string]}")
 
 
@@ -333,6 +335,7 @@ def nomatch_info(menu, caller, room, string):
         else:
             caller.msg("Unknown Command")
             return False
+        room.at_map_change()
     return
 
 
@@ -378,50 +381,15 @@ def update_on_enter(caller):
 
 def find_adjacent_room_ids(room, caller):
     """
-    This func uses the temp variable nearby_rooms on the caller and compares
-    the X,Y Coordinates of the rooms in the nearby room list to find rooms
-    that are adjecent. This will be used with other functions to create linked
-    exits between adjacent rooms if the builder chooses to do so.
+    Finds the rooms next to this one by X,Y Coordinates, in the same zone,
+    through the spatial index. This will be used with other functions to
+    create linked exits between adjacent rooms if the builder chooses to do
+    so.
     """
     log_file(f"Checking for adjacent rooms for: {room.id}", filename='room_build_debug.log')
-    if room.ndb.nearby_rooms:
-        adjacent_rooms = []
-        for room_id in room.ndb.nearby_rooms:
-            search_string = f"#{room_id}"
-            adj_room_candidate = caller.search(search_string)
-            if adj_room_candidate:
-                if adj_room_candidate.traits.xcord.current == room.traits.xcord.current:
-                    # matching X coordinate, check to north and south
-                    if int(adj_room_candidate.traits.ycord.current) == int(room.traits.ycord.current) + 1:
-                        # X matches, Y is 1 room north of room we're editing
-                        adjacent_rooms.append([adj_room_candidate.id, 'north'])
-                    if int(adj_room_candidate.traits.ycord.current) == int(room.traits.ycord.current) - 1:
-                        # X matches, Y is 1 room south of room we're editing
-                        adjacent_rooms.append([adj_room_candidate.id, 'south'])
-                elif adj_room_candidate.traits.ycord.current == room.traits.ycord.current:
-                    # matching Y coordinate, check to west and east
-                    if int(adj_room_candidate.traits.xcord.current) == int(room.traits.xcord.current) + 1:
-                        # Y matches, X is 1 room east of room we're editing
-                        adjacent_rooms.append([adj_room_candidate.id, 'east'])
-                    if int(adj_room_candidate.traits.xcord.current) == int(room.traits.xcord.current) - 1:
-                        # Y matches, X is 1 room west of room we're editing
-                        adjacent_rooms.append([adj_room_candidate.id, 'west'])
-                elif int(adj_room_candidate.traits.ycord.current) == int(room.traits.ycord.current) + 1  and \
-                    int(adj_room_candidate.traits.xcord.current) == int(room.traits.xcord.current) + 1:
-                    adjacent_rooms.append([adj_room_candidate.id, 'northeast'])
-                elif int(adj_room_candidate.traits.ycord.current) == int(room.traits.ycord.current) + 1  and \
-                    int(adj_room_candidate.traits.xcord.current) == int(room.traits.xcord.current) - 1:
-                    adjacent_rooms.append([adj_room_candidate.id, 'northwest'])
-                elif int(adj_room_candidate.traits.ycord.current) == int(room.traits.ycord.current) - 1  and \
-                    int(adj_room_candidate.traits.xcord.current) == int(room.traits.xcord.current) + 1:
-                    adjacent_rooms.append([adj_room_candidate.id, 'southeast'])
-                elif int(adj_room_candidate.traits.ycord.current) == int(room.traits.ycord.current) - 1  and \
-                    int(adj_room_candidate.traits.xcord.current) == int(room.traits.xcord.current) - 1:
-                    adjacent_rooms.append([adj_room_candidate.id, 'southwest'])
-        log_file(f"List of adjacent rooms: {adjacent_rooms}", filename='room_build_debug.log' )
-        return adjacent_rooms
-    else:
-        return None
+    adjacent_rooms = spatial_index.neighbours(room)
+    log_file(f"List of adjacent rooms: {adjacent_rooms}", filename='room_build_debug.log' )
+    return adjacent_rooms or None
 
 
 def check_adjacent_rooms_for_missing_exits(room, adjacent_rooms):
@@ -17,7 +17,8 @@ own cmdsets by inheriting from them or directly from `evennia.CmdSet`.
 from evennia import default_cmds
 from commands.building.building import SculptCmd, CoordinatesWormCmd, \
     CreateBuildingCmd, FormItemCmd, CmdDig, CmdTunnel, CreateTownCmd, \
-    CmdDestroy, CmdCreate
+    CmdDestroy, CmdCreate, ReloadRegistriesCmd, BenchCreateCmd, \
+    CompactBodyCmd, SpawnNPCsCmd, SpatialIndexCmd
 
 
 class CharacterCmdSet(default_cmds.CharacterCmdSet):
@@ -47,6 +48,11 @@ class CharacterCmdSet(default_cmds.CharacterCmdSet):
         self.add(CmdTunnel())
         self.add(CmdDig())
         self.add(CmdCreate())
+        self.add(ReloadRegistriesCmd())
+        self.add(BenchCreateCmd())
+        self.add(CompactBodyCmd())
+        self.add(SpawnNPCsCmd())
+        self.add(SpatialIndexCmd())
 
 
 
@@ -15,6 +15,8 @@ at_server_cold_start()
 at_server_cold_stop()
 
 """
+from evennia import create_script, search_script
+from world.data_migrations import run_migrations
 
 
 def at_server_start():
@@ -22,7 +24,14 @@ def at_server_start():
     This is called every time the server starts up, regardless of
     how it was shut down.
     """
-    pass
+    # one-off fixes to game data already in the database
+    run_migrations()
+    # global script that breaks items whose condition has decayed to zero
+    if not search_script('decay_sweep'):
+        create_script('typeclasses.scripts.DecaySweepScript')
+    # global script that clears away old piles of broken items
+    if not search_script('trash_collector'):
+        create_script('typeclasses.scripts.TrashCollectorScript')
 
 
 def at_server_stop():
@@ -25,6 +25,23 @@ as argument.
     default(session, cmdname, *args, **kwargs)
 
 """
+from world.handlers import map_stream
+
+
+def minimap(session, *args, **kwargs):
+    """
+    Starts or stops streaming the overhead map to the webclient as tile
+    data. See world.handlers.map_stream.
+
+    Args:
+        session (Session): The active Session.
+        kwargs (dict, optional): `enable` (bool), True to stream the map
+            (the default), False to go back to the text map. Enabling again
+            sends a full frame, ex. after the client lost its grid.
+
+    """
+    map_stream.subscribe(session, kwargs.get("enable", True))
+
 
 # def oob_echo(session, *args, **kwargs):
 #     """
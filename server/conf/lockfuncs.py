@@ -19,6 +19,7 @@ Lock functions in this module extend (and will overload same-named)
 lock functions from evennia.locks.lockfuncs.
 
 """
+from evennia.utils.logger import log_trace
 
 # def myfalse(accessing_obj, accessed_obj, *args, **kwargs):
 #    """
@@ -28,3 +29,26 @@ lock functions from evennia.locks.lockfuncs.
 #    """
 #    print "%s tried to access %s. Access denied." % (accessing_obj, accessed_obj)
 #    return False
+
+
+def haskey(accessing_obj, accessed_obj, *args, **kwargs):
+    """
+    Usage:
+        haskey()
+        haskey(#123)
+
+    True if accessing_obj carries a Key for accessed_obj, or for the given
+    dbref (ex. the exit on the other side of a door). Looks the key up in the
+    carrier's inventory index, so the check does not depend on how much the
+    carrier holds.
+    """
+    from typeclasses.items import key_target_id
+    try:
+        inventory = getattr(accessing_obj, 'inventory', None)
+        if inventory is None:
+            return False
+        target = key_target_id(args[0]) if args else accessed_obj.id
+        return inventory.find('key', target) is not None
+    except Exception:
+        log_trace(f"haskey lock check failed for {accessing_obj}.")
+        return False
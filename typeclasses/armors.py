@@ -40,10 +40,10 @@ class Armor(Equippable):
 
 
     def at_equip(self, character):
-        pass
+        super().at_equip(character)
 
     def at_remove(self, character):
-        pass
+        super().at_remove(character)
 
 class Shield(Armor):
     """Typeclass for shield prototypes."""
@@ -13,9 +13,14 @@ from evennia.utils import lazy_property
 from evennia import utils as utils
 from world.handlers.equipment import EquipHandler
 from world.handlers.traits import TraitHandler
+from world.handlers.body_mutations import BodyMutationHandler
+from world.handlers.body_parts import BodyHandler
+from world.handlers.equip_stats import EquipStatsHandler
+from world.handlers.inventory_index import InventoryIndex
+from world.handlers.fog_of_war import FogOfWar
 from world.randomness_controller import distro_return_a_roll as roll
-from world.randomness_controller import distro_return_a_roll_sans_crits as rarsc
-from world.handlers import talents, mutations, body_parts#, status_effects
+from world.handlers import encumbrance, lighting
+from world import character_creation
 from evennia.utils.logger import log_file
 from evennia import gametime
 from evennia import create_script
@@ -32,6 +37,8 @@ class Character(DefaultCharacter):
                     and its commands only be called by itself, not anyone else.
                     (to change things, use at_object_creation() instead).
     at_after_move(source_location) - Launches the "look" command after every move.
+    at_after_move(source_location) - Also records the room in the character's
+                    fog of war (see world.handlers.fog_of_war).
     at_post_unpuppet(account) -  when Account disconnects from the Character, we
                     store the current location in the pre_logout_location Attribute and
                     move it to a None-location so the "unpuppeted" character
@@ -43,6 +50,10 @@ class Character(DefaultCharacter):
 
     """
 
+    # store body parts as components in one Attribute instead of as objects.
+    # Used for NPCs and mobs created in bulk. See world.handlers.body_parts
+    compact_body = False
+
     # pull in handlers for traits, equipment, mutations, talents
     @lazy_property
     def traits(self):
@@ -67,101 +78,105 @@ class Character(DefaultCharacter):
         """TraitHandler that manages room status effects."""
         return TraitHandler(self, db_attribute='status_effects')
 
+    @lazy_property
+    def body(self):
+        """Handler for the body parts, whether objects or components."""
+        return BodyHandler(self)
+
+    @lazy_property
+    def body_mutations(self):
+        """Cached whole-body rollups of the mutations on the body parts."""
+        return BodyMutationHandler(self)
+
     @lazy_property
     def equipment(self):
         """Handler for equipped items. We may need to move this to the
         individual body part objects or keep it both here and there. TBD"""
         return EquipHandler(self)
 
+    @lazy_property
+    def inventory(self):
+        """Index of carried items by category, ex. ammunition type."""
+        return InventoryIndex(self)
+
+    @lazy_property
+    def equip_stats(self):
+        """Cached armor and weapon stats of the equipped items."""
+        return EquipStatsHandler(self)
+
+    @lazy_property
+    def fog(self):
+        """Rooms the character has visited and seen on their map."""
+        return FogOfWar(self)
+
     def at_object_creation(self):
         "Called only at object creation and with update command."
-        # clear traits and trait-like containers
-        self.traits.clear()
-        self.mutations.clear()
-        self.talents.clear()
-        #self.status_effects.clear()
-        ## Define initial attribute score traits and the secondary traits that
-        ## are calculated from the primary attributes
-
-        ## PRIMARY attribute scores
-        self.traits.add(key='Dex', name='Dexterity', type='static', \
-                        base=rarsc(100), extra={'learn' : 0})
-        self.traits.add(key='Str', name='Strength', type='static', \
-                        base=rarsc(100), extra={'learn' : 0})
-        self.traits.add(key='Vit', name='Vitality', type='static', \
-                        base=rarsc(100), extra={'learn' : 0})
-        self.traits.add(key='Per', name='Perception', type='static', \
-                        base=rarsc(100), extra={'learn' : 0})
-        self.traits.add(key='FOP', name='Force of Personality', type='static', \
-                        base=rarsc(100), extra={'learn' : 0})
-
-        ## SECONDARY attribute scores
-        self.traits.add(key="hp", name="Health Points", type="gauge", \
-                        base=((self.traits.Vit.current * 5) + \
-                        (self.traits.FOP.current * 2)), extra={'learn' : 0})
-        self.traits.add(key="sp", name="Stamina Points", type="gauge", \
-                        base=((self.traits.Vit.current * 3) + \
-                        (self.traits.Str.current * 2)+ \
-                        (self.traits.Dex.current)), extra={'learn' : 0})
-        self.traits.add(key="cp", name="Conviction Points", type="gauge", \
-                        base=((self.traits.FOP.current * 5) + \
-                        (self.traits.Vit.current)), extra={'learn' : 0})
-        ## mass and height will need to be rerolled after gender is chosen
-        # height is in cm. Weight is in kilograms
-        self.traits.add(key="mass", name="Mass", type='static', \
-                        base=rarsc(75, dist_shape='normal'), \
-                        extra={'learn' : 0})
-        self.traits.add(key="height", name="Height", type='static', \
-                        base=rarsc(170, dist_shape='normal'), \
-                        extra={'learn' : 0})
-        self.traits.add(key="enc", name="Encumberance", type='counter', \
-                        base=0, max=(self.traits.Str.current * .5), \
-                        extra={'learn' : 0})
-
-        ## generate initial component parts of the body
-        if len(self.contents) == 0:
-            body_parts.initialize_body_parts(self)
-        ## add list of empty eq slots to character db
-        self.eq_slots_status_update()
-
-
-        # money
-        self.db.wallet = {'GC': 0, 'SC': 0, 'CC': 0}
-
-        ## info dictionary to contain player preferences. These can be changed
-        ## via player commands
-        self.db.info = {'target': None, 'mercy': True, 'default attack': \
-            'unarmed_strike', 'sneaking' : False, 'wimpy': 150, 'yield': 250}
-
-        # apply the initial mutations and talents. Most talents will be set
-        # to zero. Many mutations will only be added if the character gains
-        # that mutation
-        talents.apply_talents(self)
-        mutations.initialize_mutations(self)
+        # Traits, body parts, equipment slots, talents and mutations are all
+        # set up by the batched creation pipeline, in a single transaction.
+        # See world.character_creation for the details.
+        character_creation.initialize_character(self)
+
+    def at_after_move(self, source_location, **kwargs):
+        "Called after the character moves, before it looks around."
+        if self.has_account and self.location:
+            self.fog.visit(self.location)
+        super().at_after_move(source_location, **kwargs)
+
+    def at_post_unpuppet(self, account, session=None, **kwargs):
+        "Saves the recent visits kept in memory before the character logs off."
+        self.fog.flush()
+        super().at_post_unpuppet(account, session=session, **kwargs)
 
     def eq_slots_status_update(self):
         """
-        This function pulls all of the equipment slots from the individual
-        body parts of the character. This function should be run before doing
-        anything with the Equipment Handler found in world.handlers.equipment
+        Rebuilds the equipment slot index from the individual body parts of
+        the character. This function should be run whenever body parts are
+        added, removed, or converted. See world.handlers.equipment
         """
-        self.db.eq_slots = {}
-        self.db.limbs = []
-
-        for item in self.contents:
-            if utils.inherits_from(item, 'world.handlers.body_parts.BodyPart'):
-                self.db.limbs.append(item)
-
-        if len(self.db.limbs) > 0:
-            for part in self.db.limbs:
-                self.db.eq_slots[part.name] = part.db.slots
-
-        else:
+        if not self.body.parts():
             log_file("List of Body Parts is Empty.", filename="error.log")
+        self.equipment.rebuild()
+
 
+    def at_trait_change(self, db_attribute, trait_key):
+        """
+        Called by the TraitHandlers whenever one of this character's traits,
+        mutations, talents or status effects changes.
+        """
+        if db_attribute == 'mutations':
+            self.body_mutations.update_whole_body(trait_key)
+        elif db_attribute == 'traits' and trait_key == 'mass':
+            encumbrance.refresh(self)
+
+    def at_object_receive(self, moved_obj, source_location, **kwargs):
+        "Called after an object has been moved into this character"
+        super().at_object_receive(moved_obj, source_location, **kwargs)
+        if utils.inherits_from(moved_obj, 'world.handlers.body_parts.BodyPart'):
+            self.body_mutations.add_part(moved_obj)
+        encumbrance.apply_delta(self, encumbrance.total_mass(moved_obj))
+        lighting.apply_delta(self, lighting.total_light(moved_obj))
+        self.inventory.add(moved_obj)
+
+    def at_object_leave(self, moved_obj, target_location, **kwargs):
+        "Called just before an object leaves this character"
+        super().at_object_leave(moved_obj, target_location, **kwargs)
+        if utils.inherits_from(moved_obj, 'world.handlers.body_parts.BodyPart'):
+            self.body_mutations.remove_part(moved_obj)
+        encumbrance.apply_delta(self, -encumbrance.total_mass(moved_obj))
+        lighting.apply_delta(self, -lighting.total_light(moved_obj))
+        self.inventory.remove(moved_obj)
 
     def at_before_move(self, destination):
         "Called just before trying to move"
         if self.ndb.cantmove: # replace with condition you want to test
             return False
-        return True
+        # ex. sitting on a furnishing that can't take the character's mass
+        return encumbrance.can_carry(destination, self)
+
+    def calculate_encumberance(self):
+        """
+        Rebuilds the carried mass of this character from scratch. Normally
+        the total is kept current by the move hooks; see
+        world.handlers.encumbrance
+        """
+        return encumbrance.recalculate(self)
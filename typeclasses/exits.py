@@ -10,6 +10,7 @@ for allowing Characters to traverse the exit to its destination.
 from evennia import DefaultExit
 from world.handlers.traits import TraitHandler
 from evennia.utils import lazy_property
+from world.handlers import render_cache
 
 class Exit(DefaultExit):
     """
@@ -47,4 +48,18 @@ class Exit(DefaultExit):
         """TraitHandler that manages room status effects."""
         return TraitHandler(self, db_attribute='status_effects')
 
-    pass
+    def at_object_creation(self):
+        "Called only at object creation. New exits change nearby maps."
+        super().at_object_creation()
+        if hasattr(self.location, 'at_map_change'):
+            self.location.at_map_change()
+        else:
+            render_cache.bump_map()
+
+    def at_object_delete(self):
+        "Called just before the exit is deleted."
+        if hasattr(self.location, 'at_map_change'):
+            self.location.at_map_change(removed_exit=self)
+        else:
+            render_cache.bump_map()
+        return super().at_object_delete()
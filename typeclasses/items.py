@@ -10,6 +10,8 @@ from evennia.prototypes.spawner import spawn
 from evennia.utils.logger import log_file
 from evennia.utils import lazy_property
 from world.handlers.traits import TraitHandler
+from world.handlers import encumbrance, decay, lighting, render_cache, trash
+from world.handlers.inventory_index import InventoryIndex
 from evennia import utils as utils
 
 class Item(Object):
@@ -21,6 +23,7 @@ class Item(Object):
     """
     value = 1 # default value in copper coins
     mass = 0.5 # default mass in kilograms
+    decay_rate = 0 # condition lost per game day, see world.handlers.decay
 
     @lazy_property
     def traits(self):
@@ -39,6 +42,16 @@ class Item(Object):
         # note: These will be used rarely for rooms
         return TraitHandler(self, db_attribute='talents')
 
+    @lazy_property
+    def materials(self):
+        """TraitHandler that manages what the item is made of."""
+        return TraitHandler(self, db_attribute='materials')
+
+    @lazy_property
+    def inventory(self):
+        """Index of the items inside this one, ex. arrows in a quiver."""
+        return InventoryIndex(self)
+
     def at_object_creation(self):
         "Only called at creation and forced update"
         super().at_object_creation()
@@ -61,6 +74,8 @@ class Item(Object):
         # degrade over time for most items. Scale is from 0 (broken) to 1 (new)
         self.traits.add(key="cond", name="Condition", type="static", \
                         base=1, extra={'learn' : 0})
+        if self.decay_rate:
+            self.set_decay(self.decay_rate)
         # carrying capacity of the item. Useful for chairs, quivers, or any
         # item that might have another item in its inventory
         self.traits.add(key="cap", name="Container Capacity", type="static", \
@@ -72,72 +87,315 @@ class Item(Object):
         self.db.parts = []
 
 
-    def at_before_move(self, getter):
+    def at_first_save(self):
         """
-        Called when a character or NPC tries to get the item. Checks to see if
-        adding this amount of weight will make the character/NPC overencumbered.
+        Called by the typeclass system when the item is first saved. Runs
+        at_object_creation and sets the Attributes, Tags and aliases given
+        to `create_object`, which also calls the holder's at_object_receive
+        to index the item and count its whole mass. Mass trait changes made
+        while the item is being created are therefore not passed on; the
+        mass it was counted with is recorded once it is created.
         """
-        log_file(f"trying to move {self.key} to {getter.name}", filename='item_moves.log')
-        if getter.traits.enc.current + self.traits.mass.current > getter.traits.enc.max:
-            if utils.inherits_from(obj, 'typeclasses.npcs.NPC') or utils.inherits_from(obj, 'typeclasses.characters.Character'):
-                # this item is too heavy for the getter to pick up, cancel move
-                log_file(f"{self.name} is too heavy for {getter.name} to pick up.", \
-                         filename='item_moves.log')
-                getter.msg(f"{self.name} is too heavy for you to pick up.")
-                return False
-            # getter is a non-character. We're trying to put something in something else
-            else:
-                log_file(f"{getter.name} is a non character/NPC and doesn't have room to fit {self.name}.", \
-                         filename='item_moves.log')
-                return False
+        self.ndb.creating = True
+        super().at_first_save()
+        self.ndb.creating = False
+        mass = self.traits.get('mass')
+        self.attributes.add('counted_mass', mass.actual if mass else 0)
 
-        else:
-            log_file(f"{getter.name} calculating new enc value.", \
-                     filename='item_moves.log')
-            getter.calculate_encumberance()
-            log_file(f"{getter.name} Enc: {getter.traits.enc.current}", \
+    def at_before_move(self, destination):
+        """
+        Called just before the item is moved, ex. when a character or NPC
+        tries to get it. Checks that the extra mass will not overload the
+        destination or anything carrying it.
+        """
+        if not encumbrance.can_carry(destination, self):
+            if utils.inherits_from(destination, 'typeclasses.characters.Character'):
+                # this item is too heavy for the getter to pick up, cancel move
+                destination.msg(f"{self.name} is too heavy for you to pick up.")
+            log_file(f"{destination.name} doesn't have room to fit {self.name}.", \
                      filename='item_moves.log')
-            return True
+            return False
+        return True
+
+    def at_object_receive(self, moved_obj, source_location, **kwargs):
+        "Called after an object has been moved into this item"
+        super().at_object_receive(moved_obj, source_location, **kwargs)
+        encumbrance.apply_delta(self, encumbrance.total_mass(moved_obj))
+        lighting.apply_delta(self, lighting.total_light(moved_obj))
+        self.inventory.add(moved_obj)
+
+    def at_object_leave(self, moved_obj, target_location, **kwargs):
+        "Called just before an object leaves this item"
+        super().at_object_leave(moved_obj, target_location, **kwargs)
+        if not self.ndb.deleting:
+            encumbrance.apply_delta(self, -encumbrance.total_mass(moved_obj))
+            lighting.apply_delta(self, -lighting.total_light(moved_obj))
+        self.inventory.remove(moved_obj)
+
+    def at_object_delete(self):
+        "Called just before the item is deleted"
+        # take this item and its contents off whoever carries it in one go;
+        # the contents being emptied out afterwards must not count again
+        encumbrance.apply_delta(self.location, -encumbrance.total_mass(self))
+        lighting.apply_delta(self.location, -lighting.total_light(self))
+        self.ndb.deleting = True
+        if hasattr(self.location, 'inventory'):
+            self.location.inventory.remove(self)
+        if self.location is not None:
+            render_cache.bump_content(self.location)
+        return True
+
+    def index_keys(self):
+        """
+        Returns the (category, key) pairs this item is indexed under in its
+        holder's inventory index. See world.handlers.inventory_index
+        """
+        return []
+
+    def at_trait_change(self, db_attribute, trait_key):
+        """
+        Called by the TraitHandlers when one of this item's traits changes.
+        Keeps the carried mass and light of whoever holds this item current.
+        """
+        if db_attribute == 'traits' and trait_key == 'mass':
+            if not self.ndb.creating:
+                encumbrance.mass_changed(self)
+        elif db_attribute == 'traits' and trait_key == 'light' and self.db.lit:
+            lighting.set_emitted(self, self.traits.light.actual)
 
-    def at_get(self, getter):
-        "Called just after getter picks up the object"
-        getter.calculate_encumberance()
+    def set_lit(self, lit):
+        """
+        Lights or darkens an item with a `light` trait and updates the light
+        level of the room it is in. See world.handlers.lighting
+        """
+        self.db.lit = lit
+        light = self.traits.get('light')
+        lighting.set_emitted(self, light.actual if lit and light else 0)
 
-    def at_drop(self, dropper):
-        "Called just after dropper drops this object"
-        dropper.calculate_encumberance()
+    def calculate_encumberance(self):
+        """Rebuilds the carried mass of this item and its contents."""
+        return encumbrance.recalculate(self)
 
     def at_break(self):
-        """ Item has been broken. Replace it with broken bits of """
-        self.location.msg_contents(f"{self.key} has broken!")
-        broken_junk = create_object('typeclasses.items.Trash',
-                             key=f'Broken pieces of {self.key}',
-                             location=self.location,
-                             parent_materials=self.material.all_dict)
-        self.delete()
+        """ Item has been broken. Add its remains to a trash pile. """
+        room = trash.room_of(self.location)
+        if room is not None:
+            room.msg_contents(f"{self.key} has broken!")
+        trash.break_item(self)
+
+    @property
+    def condition(self):
+        """
+        Current condition of the item, from 0 (broken) to 1 (new), including
+        decay since it was last settled. Reading it does not save anything.
+        """
+        return decay.condition(self)
+
+    def set_decay(self, rate):
+        """
+        Sets how much condition the item loses per game day. 0 stops decay.
+        See world.handlers.decay
+        """
+        decay.set_rate(self, rate)
 
     def change_condition(self, amount):
         """ Called when condition of the item is degraded or repaired """
-        self.traits.cond.mod + amount
-        if self.traits.cond.current <= 0:
+        decay.settle(self)
+        self.traits.cond.mod += amount
+        if self.traits.cond.actual <= 0:
             self.at_break()
+        else:
+            decay.reschedule(self)
 
 
 class Trash(Item):
     """
-    Any item that has been completely broken. Worthless, other than it can be
-    canibalized for parts (maybe).
+    A pile of completely broken items. Worthless, other than it can be
+    canibalized for parts (maybe). Broken items in the same room are added to
+    one pile, which tallies their materials (see world.handlers.trash).
     """
     value = 0
+    mass = 0
 
-    def at_object_creation(self, parent_materials):
+    def at_object_creation(self):
         "Only called at creation and forced update"
         super().at_object_creation()
-        for material, data in parent_materials.items():
-            self.materials.add(key=data[key])
+        self.db.pieces = 0
+        self.db.desc = "A heap of broken pieces and scraps."
+        trash.schedule_expiry(self)
+
+    def index_keys(self):
+        """Trash piles are indexed so a room can find its pile."""
+        return [('trash', 'pile')]
+
+    def add_debris(self, item):
+        """
+        Adds a broken item to the pile. The item's materials are added to
+        the pile's tally; items without materials count as scrap by mass.
+        """
+        materials = {key: (item.materials.get(key).name,
+                           item.materials.get(key).actual)
+                     for key in item.materials.all}
+        if not materials:
+            materials = {'scrap': ('Scrap', encumbrance.own_mass(item))}
+        for key, (name, amount) in materials.items():
+            material = self.materials.get(key)
+            if material is None:
+                self.materials.add(key=key, name=name, type='static',
+                                   base=amount)
+            else:
+                material.base += amount
+        self.traits.mass.base += encumbrance.own_mass(item)
+        self.db.pieces = (self.db.pieces or 0) + 1
+        trash.schedule_expiry(self)
+
+    def return_appearance(self, looker, **kwargs):
+        """Lists what the pile is made of."""
+        text = super().return_appearance(looker, **kwargs)
+        tally = ", ".join(f"{self.materials.get(key).name} "
+                          f"({self.materials.get(key).actual:g} kg)"
+                          for key in sorted(self.materials.all))
+        return f"{text}\n{self.db.pieces or 0} broken pieces: {tally}"
 
 
-class Bundable(Item):
+class Stackable(Item):
+    """
+    Items kept as one object with a quantity, such as arrows or coins. A
+    stack of 100 arrows is a single database object: firing one only lowers
+    the quantity. Stacks split when part of them is needed as a separate
+    object, and merge again when moved next to a matching stack.
+
+    The `mass` trait is the mass of one unit; the mass of the whole stack is
+    that times the quantity (see world.handlers.encumbrance).
+    Attributes:
+        stack_type (str): stacks only merge with stacks of the same
+            typeclass and stack type. Defaults to the item's key.
+        max_stack (int): most units that one stack can hold
+    """
+    stack_type = None
+    max_stack = 999
+
+    def at_object_creation(self):
+        "Only called at creation and forced update"
+        super().at_object_creation()
+        self.db.quantity = 1
+        self.db.stack_type = self.stack_type
+        self.db.max_stack = self.max_stack
+
+    @property
+    def quantity(self):
+        """Number of units in this stack."""
+        return self.attributes.get('quantity', default=1)
+
+    def get_display_name(self, looker, **kwargs):
+        name = super().get_display_name(looker, **kwargs)
+        if self.quantity != 1:
+            name = f"{name} (x{self.quantity})"
+        return name
+
+    @property
+    def stack_id(self):
+        """Stacks with the same stack id can merge."""
+        return f"{self.typeclass_path}:{self.db.stack_type or self.key}"
+
+    def stacks_with(self, other):
+        """True if the other object is a stack this one can merge with."""
+        return other is not self and \
+            getattr(other, 'stack_id', None) == self.stack_id
+
+    def index_keys(self):
+        """Stacks are found by stack id and as ammunition of their type."""
+        ammo_types = {self.db.stack_type or self.key}
+        ammo_types.update(self.aliases.all())
+        return [('stack', self.stack_id)] + \
+            [('ammo', ammo_type) for ammo_type in ammo_types]
+
+    def set_quantity(self, amount):
+        """
+        Sets the number of units in the stack. The stack is deleted if the
+        amount drops to zero.
+        """
+        if amount <= 0:
+            self.delete()
+            return
+        delta = (amount - self.quantity) * self._unit_mass()
+        self.db.quantity = amount
+        # only the stack's own mass changed, so pass the difference on up
+        encumbrance.apply_delta(self.location, delta)
+        if self.location is not None:
+            # the quantity is part of the stack's name
+            render_cache.bump_content(self.location)
+
+    def consume(self, amount=1):
+        """
+        Uses up units of the stack, ex. when firing arrows or eating rations.
+        Returns:
+            (int): the number of units actually used
+        """
+        amount = min(amount, self.quantity)
+        self.set_quantity(self.quantity - amount)
+        return amount
+
+    def split(self, amount):
+        """
+        Splits units off into a new stack in the same location.
+        Args:
+            amount (int): units for the new stack
+        Returns:
+            (Stackable): the new stack, or this stack if all of it was asked
+                for
+        """
+        if amount >= self.quantity:
+            return self
+        # the copy does not merge back into this stack as it is created,
+        # see at_after_move
+        new_stack = self.copy()
+        new_stack.db.quantity = amount
+        self.db.quantity = self.quantity - amount
+        # the copy was counted as it was created, before its Attributes
+        # were copied over; re-sum the container once both are set
+        encumbrance.refresh(self)
+        return new_stack
+
+    def merge(self, other):
+        """
+        Moves as many units as fit from another matching stack into this one.
+        The other stack is deleted if it is emptied.
+        Returns:
+            (int): the number of units moved
+        """
+        if not self.stacks_with(other):
+            return 0
+        moved = min(other.quantity,
+                    max((self.db.max_stack or self.max_stack) - self.quantity, 0))
+        if moved:
+            other.set_quantity(other.quantity - moved)
+            self.set_quantity(self.quantity + moved)
+        return moved
+
+    def at_after_move(self, source_location, **kwargs):
+        """
+        Merges into a matching stack already at the new location. Stacks
+        being created do not merge: their Attributes, quantity included, are
+        only set after they are placed, so new stacks should be created
+        without a location, and moved in once their quantity is set.
+        """
+        super().at_after_move(source_location, **kwargs)
+        if self.ndb.creating or not hasattr(self.location, 'inventory'):
+            return
+        for other in self.location.inventory.find_all('stack', self.stack_id):
+            if other.stacks_with(self):
+                other.merge(self)
+                if not self.pk:
+                    # fully merged into the other stack and deleted
+                    break
+
+    def _unit_mass(self):
+        mass = self.traits.get('mass')
+        return mass.actual if mass is not None else 0
+
+
+class Bundable(Stackable):
     """
     Items that can be bundled together as stored as a single object to make it
     easier on the db infra.
@@ -145,20 +403,44 @@ class Bundable(Item):
     def at_object_creation(self):
         "Only called at creation and forced update"
         super().at_object_creation()
-        self.db.bundle_size = 999
+        self.db.bundle_size = self.max_stack
         self.db.prototype_name = None
 
-    # TODO: Add in function for at_get and at_drop that includes bundling
-
 
 class Bundle(Item):
-    """Typeclass for bundles of Items."""
+    """
+    Typeclass for bundles of Items. Kept for older bundles; new ammunition
+    should use Stackable items instead.
+    """
     def expand(self):
-        """Expands a bundle into its component items."""
-        for i in list(range(self.db.quantity)):
-            p = self.db.prototype_name
-            spawn(dict(prototype=p, location=self.location))
+        """
+        Expands a bundle into its component items. Stackable items become a
+        single stack of the bundle's quantity, which merges into a matching
+        stack already there.
+        Returns:
+            (list): the new objects, less any stack that merged away
+        """
+        p = self.db.prototype_name
+        location, quantity = self.location, self.db.quantity
+        # spawned nowhere and moved in once the quantity is set, so the
+        # whole stack merges at once
+        first = spawn(dict(prototype=p, location=None))
+        spawned = list(first)
+        if first and first[0].is_typeclass(Stackable, exact=False):
+            first[0].set_quantity(quantity)
+        else:
+            for i in list(range(quantity - 1)):
+                spawned += spawn(dict(prototype=p, location=None))
+        # the bundle makes room for its contents before they move in
         self.delete()
+        for obj in spawned:
+            obj.move_to(location, quiet=True)
+        return [obj for obj in spawned if obj.pk]
+
+    def index_keys(self):
+        """Bundles are indexed by what they hold, ex. 'bundle arrow'."""
+        return [('bundle', alias[len('bundle '):])
+                for alias in self.aliases.all() if alias.startswith('bundle ')]
 
 
 class Equippable(Item):
@@ -186,7 +468,8 @@ class Equippable(Item):
         Args:
             character: the character equipping this object
         """
-        pass
+        self.db.used_by = character
+        character.equip_stats.add_item(self)
 
     def at_remove(self, character):
         """
@@ -194,13 +477,22 @@ class Equippable(Item):
         Args:
             character: the character removing this object
         """
-        pass
+        self.db.used_by = None
+        character.equip_stats.remove_item(self)
+
+    def at_trait_change(self, db_attribute, trait_key):
+        """
+        Called by the TraitHandlers when one of this item's traits changes.
+        Keeps the equipment stats cache of the wearer current.
+        """
+        super().at_trait_change(db_attribute, trait_key)
+        if db_attribute == 'traits' and self.db.used_by:
+            self.db.used_by.equip_stats.update_item(self)
 
     def at_drop(self, dropper):
         super(Equippable, self).at_drop(dropper)
-        if self in dropper.equip:
-            dropper.equip.remove(self)
-            self.at_remove(dropper)
+        if hasattr(dropper, 'equipment') and self in dropper.equipment:
+            dropper.equipment.remove(self)
 
 
 class Tool(Equippable):
@@ -299,6 +591,14 @@ class Furnishing(Item):
             self.location.msg_contents(f"{hanger.name} hangs {self.key} on the wall.")
             self.move_to(hanger.location)
 
+    def at_light(self, lighter=None):
+        """ Called when a furnishing that provides light is lit """
+        self.set_lit(True)
+
+    def at_darken(self, darkener=None):
+        """ Called when a furnishing is extinguished or runs out of fuel """
+        self.set_lit(False)
+
 
 class LightSource(Equippable):
     """
@@ -326,18 +626,18 @@ class LightSource(Equippable):
     def at_light(self, lighter=None):
         """ Called when the object is lit """
         if lighter:
-            lighter.location.msg_contents(f"{lighter.nanme} lights {self.key}.")
+            lighter.location.msg_contents(f"{lighter.name} lights {self.key}.")
         else:
             self.location.msg_contents(f"{self.key} is lit.")
-        self.db.lit = True
+        self.set_lit(True)
 
     def at_darken(self, darkener=None):
         """ Called when an item is extinguished or runs out of fuel """
         if darkener:
-            darkener.location.msg_contents(f"{lighter.nanme} extinguishes {self.key}.")
+            darkener.location.msg_contents(f"{darkener.name} extinguishes {self.key}.")
         else:
             self.location.msg_contents(f"{self.key} is extinguished.")
-        self.db.lit = False
+        self.set_lit(False)
 
 
 class RoadsAndTrail(Item):
@@ -370,12 +670,24 @@ class Component(Item):
         self.delete()
 
 class Consumnable(Item):
-    """ Subtype of item that is consumed. May have a number of charges. """
+    """
+    Subtype of item that is consumed. May have a number of charges.
+    Attributes:
+        category (str): kind of consumable, ex. 'food' or 'medicine', used
+            to find one in an inventory. Defaults to the item's key.
+    """
+    category = None
+
     def at_object_creation(self):
         "Only called at creation and forced update"
         super().at_object_creation()
         self.traits.add(key="charge", name="Charges", type="gauge", \
                         base=10, extra={'learn' : 0})
+        self.db.category = self.category
+
+    def index_keys(self):
+        """Consumables are found by category in their holder's index."""
+        return [('consumable', self.db.category or self.key)]
 
     def at_consume(self, charges_to_consume):
         """ Consume one or more charges """
@@ -503,6 +815,11 @@ class Vehicle(Item):
 class Key(Item):
     """
     A special subclass of item that can lock or unlock other items.
+
+    Keys are indexed by their holder under ('key', target id) for every
+    target in `key_for`, so the `haskey` lockfunc (server.conf.lockfuncs)
+    checks a door in one lookup. Add targets with `add_target` so the index
+    stays current.
     """
     def at_object_creation(self):
         "Only called at creation and forced update"
@@ -511,13 +828,47 @@ class Key(Item):
         # locakble object or an exit to (and potentially from) a room
         # NOTE:
         #       locks are handled on exits using a line like:
-        #       <obj>.locks.add("traverse:holds(key_name)")
+        #       <obj>.locks.add("traverse:haskey()")
+
+    def index_keys(self):
+        """Keys are indexed under the id of each object they open."""
+        return [('key', target) for target in
+                (key_target_id(target) for target in self.db.key_for or [])
+                if target is not None]
+
+    def add_target(self, target):
+        """Makes this key open target, an object or its id or dbref."""
+        holder = self.location
+        if hasattr(holder, 'inventory'):
+            holder.inventory.remove(self)
+        key_for = list(self.db.key_for or [])
+        if target not in key_for:
+            key_for.append(target)
+        self.db.key_for = key_for
+        if hasattr(holder, 'inventory'):
+            holder.inventory.add(self)
+
+
+def key_target_id(target):
+    """Returns the id of a key target given as an object, id or dbref."""
+    if hasattr(target, 'id'):
+        return target.id
+    try:
+        return int(str(target).lstrip('#'))
+    except ValueError:
+        return None
 
 
 class Trap(Item):
     """
     A special kind of item that applies status effects, usually of a type that
     do damage or immobilize the person caught by the trap
+
+    Armed traps are indexed by their holder under ('trap', trigger) for each
+    trigger in `triggered_by`, so a room finds the traps an action sets off
+    with one lookup (see Room.trigger_traps). Always change `armed` and
+    `triggered_by` through `arm`, `disarm` and `add_trigger` so the index
+    stays current.
     """
     def at_object_creation(self):
         "Only called at creation and forced update"
@@ -528,7 +879,7 @@ class Trap(Item):
         self.traits.cap.base = 50
         self.db.armed = False
         self.db.status_effects = {} # dict of status effects, dice_to_hit
-        self.db.triggered_by = {} # dict of triggering actions
+        self.db.triggered_by = [] # list of triggering actions, ex. 'enter'
         self.talents.add(
             key='sneak',
             type='static',
@@ -538,6 +889,43 @@ class Trap(Item):
             extra={'learn' : 0}
         )
 
+    def index_keys(self):
+        """Armed traps are indexed under each action that triggers them."""
+        if not self.db.armed:
+            return []
+        return [('trap', trigger) for trigger in self.db.triggered_by or []]
+
+    def arm(self):
+        """Arms the trap."""
+        self._reindex(armed=True)
+
+    def disarm(self):
+        """Disarms the trap."""
+        self._reindex(armed=False)
+
+    def add_trigger(self, trigger):
+        """Adds an action that sets off the trap, ex. 'enter'."""
+        triggers = list(self.db.triggered_by or [])
+        if trigger not in triggers:
+            triggers.append(trigger)
+        self._reindex(triggered_by=triggers)
+
+    def _reindex(self, **changes):
+        """Saves changes to the trap and updates its holder's index."""
+        holder = self.location
+        if hasattr(holder, 'inventory'):
+            holder.inventory.remove(self)
+        for attr, value in changes.items():
+            self.attributes.add(attr, value)
+        if hasattr(holder, 'inventory'):
+            holder.inventory.add(self)
+
+    def at_trigger(self, trigger, trappee):
+        """Called by the room when someone sets off the armed trap."""
+        log_file(f"{trappee.name} set off {self.name} ({trigger}) in "
+                 f"{self.location.name}.", filename='traps.log')
+        self.apply_status_effect(trappee)
+
     def apply_status_effect(self, trappee):
         """
         Applies a status effect to a person caught im the trap.
@@ -0,0 +1,19 @@
+# coding=utf-8
+"""
+NPC typeclasses
+
+Non-player characters and mobs. They share all of the Character machinery
+(traits, mutations, talents, equipment) but keep their body parts as inline
+components to stay cheap when spawned by the hundred. See
+world.npc_spawner for bulk spawning.
+
+"""
+from typeclasses.characters import Character
+
+
+class NPC(Character):
+    """
+    Base typeclass for non-player characters and creatures.
+    """
+    # one `body_parts` Attribute instead of six body part objects
+    compact_body = True
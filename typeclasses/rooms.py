@@ -11,11 +11,15 @@ from evennia.utils.logger import log_file
 from evennia.utils import lazy_property
 from world.handlers.traits import TraitHandler
 from world.handlers.biomes import apply_biomes
+from world.handlers.inventory_index import InventoryIndex, content_category
+from world.handlers import lighting, map_atlas, map_stream, render_cache
+from world.handlers import room_snapshot
+from world.handlers import spatial_index
 import time
 from world.randomness_controller import distro_return_a_roll as roll
 from world.randomness_controller import distro_return_a_roll_sans_crits as rarsc
-from world.handlers.map import Map
-from evennia.utils import evform, evtable
+from world.handlers.map import Map, frame_radius, map_radius, remember_seen
+from evennia.utils import evform
 from evennia.utils.utils import (
     class_from_module,
     variable_from_module,
@@ -27,7 +31,12 @@ from evennia.utils.utils import (
 )
 from evennia import create_object
 from typeclasses.exits import Exit
-from collections import defaultdict
+
+
+# widest map that fits in the map cell of world/handlers/mapform.py
+MAP_CELL_WIDTH = 43
+# most forms kept per render, one for each set of mobiles seen with it
+MAX_FORMS = 8
 
 
 class Room(DefaultRoom):
@@ -64,6 +73,106 @@ class Room(DefaultRoom):
         """TraitHandler that manages room status effects."""
         return TraitHandler(self, db_attribute='status_effects')
 
+    @lazy_property
+    def inventory(self):
+        """Index of the room's contents by category, ex. ammunition type."""
+        return InventoryIndex(self)
+
+    def at_object_receive(self, moved_obj, source_location, **kwargs):
+        "Called after an object has been moved into this room"
+        super().at_object_receive(moved_obj, source_location, **kwargs)
+        self.inventory.add(moved_obj)
+        lighting.apply_delta(self, lighting.total_light(moved_obj))
+        if content_category(moved_obj) != 'mobile':
+            # mobiles are listed as the room is served, not in its render
+            render_cache.bump_content(self)
+        if utils.inherits_from(moved_obj, 'typeclasses.characters.Character'):
+            self.trigger_traps('enter', moved_obj)
+
+    def at_object_leave(self, moved_obj, target_location, **kwargs):
+        "Called just before an object leaves this room"
+        super().at_object_leave(moved_obj, target_location, **kwargs)
+        self.inventory.remove(moved_obj)
+        lighting.apply_delta(self, -lighting.total_light(moved_obj))
+        if content_category(moved_obj) != 'mobile':
+            render_cache.bump_content(self)
+        if utils.inherits_from(moved_obj, 'typeclasses.characters.Character'):
+            self.trigger_traps('leave', moved_obj)
+
+    def at_trait_change(self, db_attribute, trait_key):
+        """
+        Called by the TraitHandlers whenever one of this room's traits,
+        mutations, biomes or status effects changes.
+        """
+        render_cache.bump_content(self)
+        if db_attribute == 'traits' and trait_key in ('xcord', 'ycord', 'elev'):
+            # coordinates and elevation are drawn on nearby maps
+            self.at_map_change()
+
+    def at_map_change(self, removed_exit=None):
+        """
+        Called when anything about this room that is drawn on maps changes:
+        its zone, coordinates, elevation, map symbol or exits. Refreshes the
+        room's snapshot, updates the spatial index and the zone's map atlas,
+        and outdates cached renders.
+        Rooms being created are updated once, after at_object_creation,
+        however many of these fields it sets (see at_first_save).
+        Args:
+            removed_exit (Exit, optional): an exit that is being deleted
+        """
+        if self.ndb.creating:
+            return
+        # the snapshot still holds where the room was drawn until now
+        old = spatial_index.position(self)
+        room_snapshot.refresh(self)
+        spatial_index.update(self)
+        map_atlas.update_room(self, removed_exit)
+        new = spatial_index.position(self)
+        render_cache.bump_map(old)
+        if new != old:
+            render_cache.bump_map(new)
+
+    def at_first_save(self):
+        """
+        Called by the typeclass system when the room is first saved. Runs
+        at_object_creation, then updates the maps once for everything it
+        set up.
+        """
+        self.ndb.creating = True
+        super().at_first_save()
+        self.ndb.creating = False
+        self.at_map_change()
+
+    def at_object_delete(self):
+        "Called just before the room is deleted"
+        render_cache.bump_map(spatial_index.position(self))
+        spatial_index.remove(self)
+        map_atlas.remove_room(self)
+        room_snapshot.remove(self)
+        return super().at_object_delete()
+
+    @property
+    def light_level(self):
+        """Ambient light plus every lit source in the room. Cached."""
+        return lighting.light_level(self)
+
+    def armed_traps(self, trigger):
+        """Returns the armed traps in this room set off by an action."""
+        return self.inventory.find_all('trap', trigger)
+
+    def trigger_traps(self, trigger, actor):
+        """
+        Sets off the armed traps in this room that an action triggers, ex.
+        'enter' or 'leave'. One index lookup; rooms without traps pay
+        nothing else.
+        Returns:
+            (list): the traps that were set off
+        """
+        traps = self.armed_traps(trigger)
+        for trap in traps:
+            trap.at_trigger(trigger, actor)
+        return traps
+
     def at_object_creation(self):
         "Called only at object creation and with update command."
         # clear traits and trait-like containers
@@ -117,90 +226,124 @@ class Room(DefaultRoom):
         # add biome info. Biome types should be expressed in a number between 0
         # and 1. The total set of biomes added should add up to 1.
         apply_biomes(self)
+        # index the room at its zone and coordinates
+        self.at_map_change()
 
 
     def return_appearance(self, looker):
-        """ Returns custom appearance for the room, including overhead map. """
-        visible = (con for con in self.contents if con != looker and con.access(looker, "view"))
-        exits, users, things = [], [], defaultdict(list)
-        for con in visible:
-            key = con.get_display_name(looker)
-            if con.destination:
-                exits.append(key)
-            elif con.has_account:
-                users.append("|c%s|n" % key)
-            else:
-                # things can be pluralized
-                things[key].append(con)
-        # get description, build string
-        string = ""
+        """
+        Returns custom appearance for the room, including overhead map.
+        Renders are cached until the room, its neighbourhood or the viewer's
+        perspective changes. See world.handlers.render_cache
+
+        Lookers whose sessions are streamed the map as tile data get the form
+        without the map, and the map is sent to them over OOB instead. See
+        world.handlers.map_stream
+        """
+        cacheable = looker.location == self
+        streamed = cacheable and map_stream.subscribed(looker)
+        radius = map_radius(looker)
+        frame = frame_radius(looker, radius)
+        # rooms out of sight are drawn from what the looker remembers, so
+        # only a map framed wider than sight depends on the looker's fog
+        fog = getattr(looker, 'fog', None)
+        memory = fog.version if fog is not None and frame > radius else None
+        variant = (radius, frame, streamed, memory)
+        render = render_cache.get(self, looker, variant) if cacheable else None
+        if render is None:
+            render = self.render_appearance(looker, radius, frame,
+                                            show_map=not streamed)
+            if cacheable:
+                # maps drawn from the atlas only reach as far as the frame
+                reach = frame if render['seen'] is not None else None
+                render_cache.store(self, looker, render, variant, reach)
+        remember_seen(looker, render['seen'])
+        if streamed:
+            map_stream.send(looker, render['grid'])
+        # the room builder menu uses the rooms seen on the map
+        looker.ndb.nearby_rooms = render['nearby_rooms']
+        self.ndb.nearby_rooms = render['nearby_rooms']
+        return self.compose_appearance(render, looker)
+
+    def render_appearance(self, looker, radius=None, frame=None,
+                          show_map=True):
+        """
+        Renders the parts of the room form for a looker, with a map showing
+        rooms up to radius away, in a frame reaching `frame` rooms away (see
+        world.handlers.map.frame_radius). With show_map False, the map is
+        left out of the form. The render is shared by every looker with the
+        same perspective, so it leaves out the mobiles, which come and go
+        far more often than anything else; compose_appearance adds them.
+        Returns:
+            (dict): the form cells, the map grid, the rooms in sight on the map and the ids of the rooms
+                drawn on the map
+        """
+        exits = [exit.get_display_name(looker) for exit
+                 in self.inventory.find_all('content', 'exit')
+                 if exit != looker and exit.access(looker, "view")]
         exits_descs = ""
-        thing_strings = []
-        desc = self.db.desc
-        if desc:
-            string += "%s" % desc
         if exits:
             exits_descs += "|cExits:|n " + list_to_string(exits)
-        if users or things:
-            # handle pluralization of things (never pluralize users)
-            for key, itemlist in sorted(things.items()):
-                nitem = len(itemlist)
-                if nitem == 1:
-                    key, _ = itemlist[0].get_numbered_name(nitem, looker, key=key)
-                else:
-                    key = [item.get_numbered_name(nitem, looker, key=key)[1] for item in itemlist][
-                        0
-                    ]
-                thing_strings.append(key)
-
-        room_contents = "\n|wYou see:|n " + list_to_string(users + thing_strings)
-        room_text = string + "\n\n" + room_contents + "\n\n" + exits_descs
-        # Putting room description and map in a table format
         coord_string = f" |510Map Coordinates|n ---> |wX: |510{self.traits.xcord.current}|n, |wY: |510{self.traits.ycord.current}|n"
-        map = str(Map(looker).show_map())
-        desc = str(super().return_appearance(looker))
-        table = evtable.EvTable(coord_string, f"|c{self.get_display_name(looker)}|n",
-            table=[], border="tablecols")
-        table.reformat_column(0, width=46, align="l", valign="c", evenwidth=True)
-        table.reformat_column(1, width=54, align="l", valign="c", evenwidth=True)
-        table.add_row(Map(looker).show_map(), room_text)
-        self.ndb.nearby_rooms = looker.ndb.nearby_rooms
-        self.db.room_map = evform.EvForm("world/handlers/mapform.py")
-        mobs = "|cMobiles:|n "
-        items = "|cItems:|n "
-        buildingsntowns = "|cEntrances:|n "
-        roads = "|cRoads:|n "
-        for obj in self.contents:
-            if utils.inherits_from(obj, 'typeclasses.characters.Character'):
-                if obj != looker:
-                    mobs += obj.get_display_name(looker) + ","
-            elif utils.inherits_from(obj, 'typeclasses.items.Item') and \
-                not (utils.inherits_from(obj, 'typeclasses.items.Building') or \
-                utils.inherits_from(obj, 'typeclasses.items.Town') or \
-                utils.inherits_from(obj, 'typeclasses.items.RoadsAndTrail')):
-                items += obj.get_display_name(looker)  + ","
-            elif utils.inherits_from(obj, 'typeclasses.items.Building') or \
-                utils.inherits_from(obj, 'typeclasses.items.Town'):
-                buildingsntowns += obj.get_display_name(looker) + ","
-            elif utils.inherits_from(obj, 'typeclasses.items.RoadsAndTrail'):
-                roads += obj.get_display_name(looker)  + ","
+        overhead_map = Map(looker, radius, frame)
+        map = str(overhead_map.show_map()) if show_map else ""
+        zone = f"\n|cZone: |440{self.db.info['zone']}|n"
+        wide_map = None
+        # grid cells are joined by spaces when shown
+        if show_map and 2 * overhead_map.max_width - 1 > MAP_CELL_WIDTH:
+            # too big for the form, show it underneath instead
+            wide_map, map = map, ""
+        items = self.list_contents(looker, 'item', "|cItems:|n")
+        buildingsntowns = self.list_contents(looker, 'entrance',
+                                             "|cEntrances:|n")
+        room_roads = self.list_contents(looker, 'road', "|cRoads:|n")
         room_name = f"|c{self.get_display_name(looker)}|n"
         room_desc = str(self.db.desc)
-        room_roads = roads.strip(", ")
-        room_items = items.strip(", ") + "\n\n" + mobs.strip(", ")
-        entr_n_exits = buildingsntowns.strip(", ") + "\n\n" + exits_descs
-        map += f"\n|cZone: |440{self.db.info['zone']}|n"
-        self.db.room_map.map(cells={1: room_name, \
-                        2: coord_string, \
-                        3: room_desc, \
-                        4: room_items, \
-                        5: room_roads, \
-                        6: entr_n_exits, \
-                        7: map})
-        if self.db.room_map:
-            return self.db.room_map
-        else:
-            return table
+        entr_n_exits = buildingsntowns + "\n\n" + exits_descs
+        map += zone
+        return {'cells': {1: room_name,
+                          2: coord_string,
+                          3: room_desc,
+                          4: items,
+                          5: room_roads,
+                          6: entr_n_exits,
+                          7: map},
+                'wide_map': wide_map,
+                'forms': {},
+                'grid': overhead_map.grid,
+                'seen': overhead_map.seen,
+                'nearby_rooms': looker.ndb.nearby_rooms}
+
+    def compose_appearance(self, render, looker):
+        """
+        Fills in the room form from a render and the mobiles in the room
+        now, leaving out the looker. The form is kept in the render for the
+        next looker who sees the same mobiles.
+        """
+        mobs = self.list_contents(looker, 'mobile', "|cMobiles:|n")
+        if mobs not in render['forms']:
+            if len(render['forms']) >= MAX_FORMS:
+                # the mobiles came and went, the old forms are not seen again
+                render['forms'].clear()
+            cells = dict(render['cells'])
+            cells[4] = cells[4] + "\n\n" + mobs
+            room_map = evform.EvForm("world/handlers/mapform.py")
+            room_map.map(cells=cells)
+            form = str(room_map)
+            if render['wide_map']:
+                form += "\n" + render['wide_map']
+            render['forms'][mobs] = form
+        return render['forms'][mobs]
+
+    def list_contents(self, looker, category, heading):
+        """
+        Returns a heading followed by the names of the room's contents in a
+        content category, leaving out the looker.
+        """
+        names = [obj.get_display_name(looker) for obj
+                 in self.inventory.find_all('content', category)
+                 if obj != looker]
+        return f"{heading} {','.join(names)}".strip()
 
     def reset_biomes(self):
         """ Resets biomes on this room """
@@ -223,6 +366,7 @@ class IndoorRoom(Room):
         self.db.info['outdoor room'] = False
         self.db.info['zone'] = None
         self.db.map_symbol = ['|155:|n','|255:|n','|355:|n','|455:|n','|555:|n']
+        self.at_map_change()
 
 
 class BuildingEntrance(IndoorRoom):
@@ -243,6 +387,7 @@ class BuildingEntrance(IndoorRoom):
         self.db.info['outdoor room'] = False
         self.db.info['zone'] = None
         self.db.map_symbol = ['|155:|n','|255:|n','|355:|n','|455:|n','|555:|n']
+        self.at_map_change()
         self.desc = "An entrance room for the building"
 
 
@@ -261,4 +406,5 @@ class TownEntrance(Room):
         self.db.info['outdoor room'] = True
         self.db.info['zone'] = None
         self.db.map_symbol = ['|155©|n','|255©|n','|355©|n','|455©|n','|555©|n']
+        self.at_map_change()
         self.desc = "An entrance room for the building"
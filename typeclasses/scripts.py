@@ -14,6 +14,7 @@ just overloads its hooks to have it perform its function.
 """
 
 from evennia import DefaultScript
+from world.handlers import decay, trash
 
 
 class Script(DefaultScript):
@@ -91,3 +92,40 @@ class Script(DefaultScript):
     """
 
     pass
+
+
+class DecaySweepScript(Script):
+    """
+    Global, low-priority script that breaks items whose condition has
+    decayed to zero. Items decay lazily (see world.handlers.decay); this
+    script only looks at the items scheduled to break by now, and handles at
+    most `batch_size` of them per run so it never stalls the server.
+    """
+    batch_size = 100
+
+    def at_script_creation(self):
+        self.key = 'decay_sweep'
+        self.desc = 'Breaks items whose condition has decayed to zero.'
+        self.interval = 300
+        self.persistent = True
+
+    def at_repeat(self):
+        decay.sweep(self.batch_size)
+
+
+class TrashCollectorScript(Script):
+    """
+    Global, low-priority script that clears away trash piles nobody has
+    added to for a while (see world.handlers.trash). Expired piles are
+    deleted in batches of at most `batch_size`, one transaction per run.
+    """
+    batch_size = 200
+
+    def at_script_creation(self):
+        self.key = 'trash_collector'
+        self.desc = 'Clears away expired piles of broken items.'
+        self.interval = 3600
+        self.persistent = True
+
+    def at_repeat(self):
+        trash.expire_piles(self.batch_size)
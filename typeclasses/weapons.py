@@ -52,10 +52,10 @@ class Weapon(Equippable):
         }
 
     def at_equip(self, character):
-        pass
+        super().at_equip(character)
 
     def at_remove(self, character):
-        pass
+        super().at_remove(character)
 
 class RangedWeapon(Weapon):
     """
@@ -76,33 +76,36 @@ class RangedWeapon(Weapon):
         self.db.combat_cmdset = 'commands.combat.RangedWeaponCmdSet'
 
     def at_equip(self, character):
-        pass
+        super().at_equip(character)
 
     def at_remove(self, character):
-        pass
+        super().at_remove(character)
 
     def get_ammunition_to_fire(self):
-        """Checks whether there is proper ammunition and returns one unit."""
-        ammunition = [obj for obj in self.location.contents
-                      if (obj.is_typeclass('typeclasses.items.Bundlable')
-                          or obj.is_typeclass('typeclasses.weapons.RangedWeapon'))
-                      and self.db.ammunition in obj.aliases.all()]
+        """
+        Checks whether there is proper ammunition and returns it. Ammunition
+        is normally a Stackable: the whole stack is returned, and the caller
+        should `consume(1)` it (or `split(1)` it when the shot needs to land
+        somewhere as an object). Carried thrown weapons are returned as is.
+        """
+        ammo_type = self.db.ammunition
+        holder = self.location
+        if not hasattr(holder, 'inventory'):
+            return None
+        ammunition = holder.inventory.find('ammo', ammo_type)
+        if ammunition:
+            return ammunition
 
-        if not ammunition:
-            # no individual ammo found, search for bundle
-            bundle = [obj for obj in self.location.contents
-                      if "bundle {}".format(self.db.ammunition)
-                          in obj.aliases.all()
-                      and obj.is_typeclass('typeclasses.items.Bundle')]
+        # no loose ammo found, unpack an old style bundle if there is one
+        bundle = holder.inventory.find('bundle', ammo_type)
+        if bundle:
+            bundle.expand()
+            return self.get_ammunition_to_fire()
+        return None
 
-            if bundle:
-                bundle = bundle[0]
-                bundle.expand()
-                return self.get_ammunition_to_fire()
-            else:
-                return None
-        else:
-            return ammunition[0]
+    def index_keys(self):
+        """Thrown weapons can be found as ammunition by their aliases."""
+        return [('ammo', alias) for alias in self.aliases.all()]
 
 
 class TwoHanded(object):
@@ -285,9 +288,9 @@ class Sword(Weapon):
         }
 
     def at_equip(self, character):
-        pass
+        super().at_equip(character)
 
     def at_remove(self, character):
-        pass
+        super().at_remove(character)
 
 ## TODO: Same as above, for ranged weapons
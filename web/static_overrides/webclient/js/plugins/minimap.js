@@ -0,0 +1,110 @@
+/*
+ * Minimap plugin
+ *
+ * Asks the server to stream the overhead map as tile data instead of ANSI
+ * text (see world/handlers/map_stream.py) and draws it in a #minimap
+ * element. The first frame holds every tile; after that the server only
+ * sends the tiles that changed, and this plugin keeps the grid.
+ *
+ *   minimap [] {full: true, rows: [[tile, ...], ...]}
+ *   minimap [] {full: false, tiles: [[row, col, tile], ...]}
+ *
+ * Tiles are HTML. Load this file after the other plugins in the webclient
+ * template, ex.
+ *   <script src={% static "webclient/js/plugins/minimap.js" %} language="javascript" type="text/javascript"></script>
+ */
+let minimap_plugin = (function () {
+
+    // one array of <span> elements per map row
+    var cells = [];
+
+    //
+    // the element the map is drawn in, made if the page has none
+    var container = function () {
+        var minimap = $("#minimap");
+        if (minimap.length === 0) {
+            minimap = $("<pre id='minimap'></pre>").css({
+                "position": "fixed",
+                "top": "1em",
+                "right": "1em",
+                "margin": 0,
+                "z-index": 100,
+                "background": "black",
+                "line-height": "1",
+            });
+            $("body").append(minimap);
+        }
+        return minimap;
+    }
+
+    //
+    // rebuild the whole grid from a full frame
+    var drawFull = function (rows) {
+        var minimap = container().empty();
+        cells = [];
+        for (var i = 0; i < rows.length; i++) {
+            var row = [];
+            for (var j = 0; j < rows[i].length; j++) {
+                var cell = $("<span></span>").html(rows[i][j]);
+                minimap.append(cell);
+                if (j < rows[i].length - 1) {
+                    minimap.append(" ");
+                }
+                row.push(cell);
+            }
+            minimap.append("\n");
+            cells.push(row);
+        }
+    }
+
+    //
+    // patch the tiles that changed
+    var drawDelta = function (tiles) {
+        for (var n = 0; n < tiles.length; n++) {
+            var i = tiles[n][0], j = tiles[n][1];
+            if (!cells[i] || !cells[i][j]) {
+                // we lost the grid, ask for a full frame
+                Evennia.msg("minimap", [], {enable: true});
+                return;
+            }
+            cells[i][j].html(tiles[n][2]);
+        }
+    }
+
+    //
+    // handle an incoming minimap frame
+    var onMinimap = function (args, kwargs) {
+        if (kwargs.full) {
+            drawFull(kwargs.rows);
+        } else {
+            drawDelta(kwargs.tiles);
+        }
+    }
+
+    //
+    // ask for the map once logged in
+    var onLoggedIn = function () {
+        Evennia.msg("minimap", [], {enable: true});
+    }
+
+    //
+    // forget the grid when the connection drops
+    var onConnectionClose = function () {
+        cells = [];
+        $("#minimap").remove();
+    }
+
+    //
+    // Mandatory plugin init function
+    var init = function () {
+        Evennia.emitter.on("minimap", onMinimap);
+        console.log("Minimap Plugin Initialized.");
+    }
+
+    return {
+        init: init,
+        onLoggedIn: onLoggedIn,
+        onConnectionClose: onConnectionClose,
+    }
+})();
+plugin_handler.add("minimap", minimap_plugin);
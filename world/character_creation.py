@@ -0,0 +1,261 @@
+# coding=utf-8
+"""
+Character creation pipeline.
+
+Setting up a new character used to cost dozens of separate database writes:
+every `traits.add` call saved the whole traits Attribute again, each of the
+six body parts was created and then moved onto the character with
+`move_to`, and every talent was added one at a time. Each of those saves ran
+in its own transaction.
+
+This module does the same work in a few steps:
+    1. All random values for one or many characters are rolled in a single
+       vectorized NumPy batch (see `roll_characters`).
+    2. Trait, talent, and body part data are assembled in memory and written
+       with one Attribute write per handler (`TraitHandler.batch_add`).
+    3. Body parts are created directly inside the character instead of
+       being moved there, and everything runs inside one atomic database
+       transaction, so it is committed once. Characters with `compact_body`
+       set (NPCs and mobs) store their body parts as components in one
+       Attribute instead of as separate objects.
+
+Module Functions:
+    - roll_characters(count, overrides=None)
+        Rolls the random starting values for `count` characters at once.
+    - prerolled(rolls)
+        Context manager that feeds bulk rolls to the characters created
+        inside it. Used by world.npc_spawner.
+    - initialize_character(character, rolls=None)
+        Sets up a freshly created character. Called from
+        Character.at_object_creation.
+    - benchmark_creation(count, location)
+        Creates and deletes `count` characters and reports the time taken
+        per character. Used by the @benchcreate command.
+"""
+import time
+from contextlib import contextmanager
+import numpy as np
+from django.db import transaction
+from evennia import create_object
+from evennia.utils.logger import log_file
+from world.handlers import talents, mutations
+from world.handlers.traits import TraitHandler
+
+# key, name of the primary ability scores, in the column order of the rolls
+PRIMARY_SCORES = (
+    ('Dex', 'Dexterity'),
+    ('Str', 'Strength'),
+    ('Vit', 'Vitality'),
+    ('Per', 'Perception'),
+    ('FOP', 'Force of Personality'),
+)
+# mean and standard deviation of the rolled traits; this matches calling
+# distro_return_a_roll_sans_crits(mean) with the 'normal' distribution
+ROLLED_TRAITS = (
+    ('Dex', 100, 10), ('Str', 100, 10), ('Vit', 100, 10), ('Per', 100, 10),
+    ('FOP', 100, 10), ('mass', 75, 7.5), ('height', 170, 17),
+)
+# key, display name, typeclass, and share of the character's hp and sp
+HUMANOID_BODY_PLAN = (
+    ('head', 'Head', 'world.handlers.body_parts.Head', .1),
+    ('torso', 'Torso', 'world.handlers.body_parts.Torso', .4),
+    ('right_arm', 'Right Arm', 'world.handlers.body_parts.Arm', .1),
+    ('left_arm', 'Left Arm', 'world.handlers.body_parts.Arm', .1),
+    ('right_leg', 'Right Leg', 'world.handlers.body_parts.Leg', .15),
+    ('left_leg', 'Left Leg', 'world.handlers.body_parts.Leg', .15),
+)
+# rolls queued up by `prerolled`, used up by `initialize_character`
+_PREROLLED = []
+
+
+def roll_characters(count=1, overrides=None):
+    """
+    Rolls the starting values for a batch of characters in one go.
+    Args:
+        count (int): number of characters to roll for
+        overrides (dict, optional): {trait key: (mean, scale)} to use
+            instead of the ROLLED_TRAITS defaults, ex. for NPC prototypes
+    Returns:
+        (list): one dict per character of {trait key: rolled int}
+    """
+    overrides = overrides or {}
+    rng = np.random.default_rng()
+    spread = [overrides.get(key, (mean, scale))
+              for key, mean, scale in ROLLED_TRAITS]
+    means = np.array([mean for mean, _ in spread], dtype=float)
+    scales = np.array([scale for _, scale in spread], dtype=float)
+    # truncate toward zero like int() does for the single rolls
+    rolls = rng.normal(means, scales, size=(count, len(ROLLED_TRAITS))).astype(int)
+    keys = [key for key, _, _ in ROLLED_TRAITS]
+    return [dict(zip(keys, row)) for row in rolls.tolist()]
+
+
+@contextmanager
+def prerolled(rolls):
+    """
+    Hands out rolls made in bulk to the characters created inside this
+    block, in place of rolling for each one in at_object_creation.
+    Args:
+        rolls (list): values from `roll_characters`
+    Example:
+        ```python
+        with prerolled(roll_characters(500)):
+            for num in range(500):
+                create_object(...)
+        ```
+    """
+    _PREROLLED[:] = reversed(rolls)
+    try:
+        yield
+    finally:
+        del _PREROLLED[:]
+
+
+def character_traits(rolls):
+    """
+    Returns the list of starting traits for a character, ready to be passed
+    to `TraitHandler.batch_add`.
+    Args:
+        rolls (dict): one entry from `roll_characters`
+    """
+    traits = [dict(key=key, name=name, type='static', base=rolls[key],
+                   extra={'learn': 0})
+              for key, name in PRIMARY_SCORES]
+    dex, strength, vit, fop = rolls['Dex'], rolls['Str'], rolls['Vit'], rolls['FOP']
+    traits += [
+        dict(key='hp', name='Health Points', type='gauge',
+             base=(vit * 5) + (fop * 2), extra={'learn': 0}),
+        dict(key='sp', name='Stamina Points', type='gauge',
+             base=(vit * 3) + (strength * 2) + dex, extra={'learn': 0}),
+        dict(key='cp', name='Conviction Points', type='gauge',
+             base=(fop * 5) + vit, extra={'learn': 0}),
+        # mass and height will need to be rerolled after gender is chosen
+        # height is in cm. Weight is in kilograms
+        dict(key='mass', name='Mass', type='static', base=rolls['mass'],
+             extra={'learn': 0}),
+        dict(key='height', name='Height', type='static', base=rolls['height'],
+             extra={'learn': 0}),
+        dict(key='enc', name='Encumberance', type='counter', base=0,
+             max=strength * .5, extra={'learn': 0}),
+    ]
+    return traits
+
+
+def body_part_traits(character, share):
+    """Returns the hp and sp traits of a body part, for `batch_add`."""
+    return [
+        dict(key='hp', name='Health Points', type='gauge',
+             base=character.traits.hp.current * share, extra={'learn': 0}),
+        dict(key='sp', name='Stamina Points', type='gauge',
+             base=character.traits.sp.current * share, extra={'learn': 0}),
+    ]
+
+
+def create_body_parts(character, body_plan=HUMANOID_BODY_PLAN):
+    """
+    Creates the body parts of a character. Characters with `compact_body`
+    set get component parts (see `create_body_components`); everyone else
+    gets body part objects created directly in their inventory (no `move_to`
+    and its hooks), with their hp and sp added in one write each.
+    Returns:
+        (list): the new body parts
+    """
+    if getattr(character, 'compact_body', False):
+        return create_body_components(character, body_plan)
+    parts = []
+    for key, name, typeclass, share in body_plan:
+        part = create_object(typeclass, key=f"{character.name}'s {name}",
+                             location=character, home=character)
+        part.traits.batch_add(body_part_traits(character, share))
+        parts.append(part)
+    return parts
+
+
+def create_body_components(character, body_plan=HUMANOID_BODY_PLAN):
+    """
+    Creates the body parts of a character as components stored in its
+    `body_parts` Attribute: one Attribute write instead of a new object and
+    three Attributes per part.
+    Returns:
+        (list): the new BodyComponents
+    """
+    # imported here since body_parts imports this module
+    from world.handlers.body_parts import component_data
+    parts = {}
+    for key, name, typeclass, share in body_plan:
+        traits = {trait.pop('key'): TraitHandler._trait_data(**trait)
+                  for trait in body_part_traits(character, share)}
+        part_type = typeclass.rsplit('.', 1)[-1].lower()
+        parts[key] = component_data(f"{character.name}'s {name}", part_type,
+                                    typeclass, traits)
+    character.body.add_components(parts)
+    return [character.body.components[key] for key in parts]
+
+
+def initialize_character(character, rolls=None):
+    """
+    Sets up a freshly created character: traits, body parts, equipment
+    slots, wallet, preferences, talents, and mutations.
+    Args:
+        character (Character): the new character
+        rolls (dict, optional): pre-rolled values from `roll_characters`.
+            Taken from an enclosing `prerolled` block, or rolled here, if
+            not given.
+    """
+    if rolls is None:
+        rolls = _PREROLLED.pop() if _PREROLLED else roll_characters(1)[0]
+    with transaction.atomic():
+        character.traits.clear()
+        character.mutations.clear()
+        character.talents.clear()
+        character.traits.batch_add(character_traits(rolls))
+
+        ## generate initial component parts of the body
+        if not character.body.parts():
+            create_body_parts(character)
+        ## add list of empty eq slots to character db
+        character.eq_slots_status_update()
+
+        # money
+        character.db.wallet = {'GC': 0, 'SC': 0, 'CC': 0}
+
+        ## info dictionary to contain player preferences. These can be changed
+        ## via player commands
+        character.db.info = {'target': None, 'mercy': True, 'default attack': \
+            'unarmed_strike', 'sneaking' : False, 'wimpy': 150, 'yield': 250}
+
+        # apply the initial mutations and talents. Most talents will be set
+        # to zero. Many mutations will only be added if the character gains
+        # that mutation
+        talents.apply_talents(character)
+        mutations.initialize_mutations(character)
+
+
+def benchmark_creation(count, location, typeclass='typeclasses.characters.Character'):
+    """
+    Creates `count` throwaway characters, times them, and deletes them again.
+    Args:
+        count (int): number of characters to create
+        location (Room): where to create them
+        typeclass (str): typeclass of the characters to create
+    Returns:
+        (dict): 'count', 'total' (seconds), and 'per_character' (ms)
+    """
+    created = []
+    start = time.perf_counter()
+    try:
+        for num in range(count):
+            created.append(create_object(typeclass, key=f"benchmark {num}",
+                                         location=location, home=location))
+        total = time.perf_counter() - start
+    finally:
+        for char in created:
+            for part in char.body.objects():
+                part.delete()
+            char.delete()
+    result = {'count': count, 'total': total,
+              'per_character': (total / count * 1000) if count else 0}
+    log_file(f"Character creation benchmark: {count} characters in "
+             f"{total:.3f}s ({result['per_character']:.1f} ms each)",
+             filename='benchmarks.log')
+    return result
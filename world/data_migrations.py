@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Data Migrations Module.
+
+One-off changes to game data that is already in the database, ex. removing
+Attributes that the code no longer uses. Each migration runs once: the names
+of the migrations that have been applied are kept in ServerConfig, and
+`run_migrations` is called at every server start (see
+server/conf/at_server_startstop.py) to apply any new ones.
+
+To add a migration, write a function that takes no arguments and returns a
+short summary of what it did, then append (name, function) to MIGRATIONS.
+Never rename or reorder migrations that have shipped.
+
+Module Functions:
+    - run_migrations()
+        Applies the migrations that have not been applied yet.
+"""
+from django.db import transaction
+from evennia.server.models import ServerConfig
+from evennia.typeclasses.attributes import Attribute
+from evennia.utils.logger import log_file, log_trace
+
+APPLIED_KEY = 'data_migrations_applied'
+
+
+def strip_room_map_attributes():
+    """
+    Rooms used to save their rendered look output in a `room_map`
+    Attribute on every look. Renders are now cached in memory (see
+    world.handlers.render_cache), so the saved forms are dead weight.
+    """
+    deleted, _ = Attribute.objects.filter(db_key='room_map').delete()
+    return f"deleted {deleted} rows"
+
+
+MIGRATIONS = [
+    ('strip_room_map_attributes', strip_room_map_attributes),
+]
+
+
+def run_migrations():
+    """
+    Applies every migration not yet recorded as applied, in order. A
+    migration that fails is logged and rolled back, and stops the run so
+    later migrations never run before earlier ones.
+    Returns:
+        (list): names of the migrations applied by this call
+    """
+    applied = list(ServerConfig.objects.conf(APPLIED_KEY, default=[]) or [])
+    ran = []
+    for name, migration in MIGRATIONS:
+        if name in applied:
+            continue
+        try:
+            with transaction.atomic():
+                summary = migration()
+        except Exception:
+            log_trace(f"Data migration {name} failed.")
+            break
+        applied.append(name)
+        ServerConfig.objects.conf(APPLIED_KEY, applied)
+        ran.append(name)
+        log_file(f"Applied data migration {name}: {summary}",
+                 filename='data_migrations.log')
+    return ran
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+Body Mutations Handler.
+
+Mutations can be stored on the character itself (whole body mutations in the
+character's `mutations` TraitHandler) or on the individual body parts of the
+character, whether those are objects in its inventory or components stored
+on the character (see world.handlers.body_parts). Game logic often needs the
+effective value of a mutation across the whole body, such as the average
+bone density of all limbs. Working that out from scratch means loading the
+mutations Attribute of every body part each time.
+
+This handler keeps a cached rollup per mutation instead. The cache is built
+the first time it is read and is then kept up to date incrementally: body
+parts report their mutation changes to the character that carries them
+through the `at_trait_change` hook (see world.handlers.traits).
+
+Setup:
+    ```python
+    from world.handlers.body_mutations import BodyMutationHandler
+      ...
+    @lazy_property
+    def body_mutations(self):
+        return BodyMutationHandler(self)
+    ```
+Use:
+    ```python
+    >>> rollup = char.body_mutations.get('bone_density')
+    >>> rollup.mean, rollup.max
+    (104.5, 121)
+    >>> rollup.parts
+    {"Meirok's Head": 98, "Meirok's Torso": 121, ...}
+    >>> char.body_mutations.effective('bone_density')
+    104.5
+    ```
+"""
+
+
+class MutationRollup(object):
+    """
+    Cached whole-body figures for a single mutation.
+    Args:
+        key (str): the mutation key, ex. 'bone_density'
+    Properties:
+        sum (int, float): total of the mutation across all body parts
+        mean (int, float): average across the body parts that have it
+        max (int, float): highest value on any one body part
+        parts (dict): per-part breakdown of {part name: value}
+        whole_body (int, float): value stored on the character itself, or
+            None if the character has no whole body entry for it
+    """
+    def __init__(self, key):
+        self.key = key
+        self.sum = 0
+        self.max = None
+        self.whole_body = None
+        self._parts = {}
+
+    def __repr__(self):
+        return "MutationRollup({!r}, sum={}, mean={}, max={}, parts={})".format(
+            self.key, self.sum, self.mean, self.max, len(self._parts))
+
+    @property
+    def mean(self):
+        """Average value across the body parts with this mutation."""
+        if not self._parts:
+            return None
+        return self.sum / len(self._parts)
+
+    @property
+    def parts(self):
+        """Per-part breakdown of the mutation, keyed by body part name."""
+        return {part.key: value for part, value in self._parts.items()}
+
+    def set_part(self, part, value):
+        """Adds, changes, or removes (value of None) one body part's value."""
+        old = self._parts.pop(part, None)
+        if old is not None:
+            self.sum -= old
+        if value is not None:
+            self._parts[part] = value
+            self.sum += value
+        # with at most a handful of parts, rescanning for the max is cheap
+        if value is not None and (self.max is None or value >= self.max):
+            self.max = value
+        elif old is not None and old == self.max:
+            self.max = max(self._parts.values()) if self._parts else None
+
+    def is_empty(self):
+        """True if neither the body parts nor the character have it."""
+        return not self._parts and self.whole_body is None
+
+
+class BodyMutationHandler(object):
+    """
+    Handler for cached whole-body mutation rollups on a character.
+    Args:
+        obj (Character): the character whose body parts are rolled up
+    Methods:
+        get (str): returns the MutationRollup for a mutation or None
+        effective (str): best single number to use for a mutation
+        update_part (BodyPart, str): refresh one part's value for a mutation
+        add_part (BodyPart): start tracking a newly attached body part
+        remove_part (BodyPart): stop tracking a detached body part
+        update_whole_body (str): refresh a mutation stored on the character
+        invalidate (): drop the cache so it is rebuilt on next read
+    """
+    def __init__(self, obj):
+        self.obj = obj
+        self._rollups = None
+
+    def __contains__(self, mutation):
+        return self.get(mutation) is not None
+
+    def __iter__(self):
+        """Iterate over (mutation key, rollup) pairs."""
+        return iter(self._cache().items())
+
+    # Public members
+
+    def get(self, mutation):
+        """Returns the cached MutationRollup for a mutation, if any."""
+        return self._cache().get(mutation)
+
+    def effective(self, mutation, default=None):
+        """
+        Returns the value game logic should use for a mutation. This is the
+        mean across body parts if any part has the mutation; otherwise it is
+        the whole body value stored on the character.
+        """
+        rollup = self.get(mutation)
+        if rollup is None:
+            return default
+        if rollup.mean is not None:
+            return rollup.mean
+        return rollup.whole_body
+
+    def parts(self):
+        """Returns the body parts currently attached to the character."""
+        return self.obj.body.parts()
+
+    def update_part(self, part, mutation):
+        """Refresh the cached value for one mutation on one body part."""
+        if self._rollups is None:
+            # nothing cached yet, the next read builds it from scratch
+            return
+        trait = part.mutations.get(mutation)
+        self._set(mutation, part, trait.actual if trait else None)
+
+    def add_part(self, part):
+        """Adds every mutation of a newly attached body part to the cache."""
+        if self._rollups is None:
+            return
+        for mutation in part.mutations.all:
+            self._set(mutation, part, part.mutations.get(mutation).actual)
+
+    def remove_part(self, part):
+        """Removes a detached body part from every cached rollup."""
+        if self._rollups is None:
+            return
+        for mutation in list(self._rollups):
+            self._set(mutation, part, None)
+
+    def update_whole_body(self, mutation):
+        """Refresh a mutation that is stored on the character itself."""
+        if self._rollups is None:
+            return
+        trait = self.obj.mutations.get(mutation)
+        rollup = self._rollups.setdefault(mutation, MutationRollup(mutation))
+        rollup.whole_body = trait.actual if trait else None
+        if rollup.is_empty():
+            del self._rollups[mutation]
+
+    def invalidate(self):
+        """Drops the cache. It will be rebuilt on the next read."""
+        self._rollups = None
+
+    # Private members
+
+    def _set(self, mutation, part, value):
+        rollup = self._rollups.get(mutation)
+        if rollup is None:
+            if value is None:
+                return
+            rollup = self._rollups[mutation] = MutationRollup(mutation)
+        rollup.set_part(part, value)
+        if rollup.is_empty():
+            del self._rollups[mutation]
+
+    def _cache(self):
+        """Builds the rollups from the character and its parts if needed."""
+        if self._rollups is None:
+            self._rollups = {}
+            for mutation in self.obj.mutations.all:
+                self.update_whole_body(mutation)
+            for part in self.parts():
+                self.add_part(part)
+        return self._rollups
@@ -12,6 +12,12 @@
 
     Classes:
         'body_part': generalize body part object
+        'BodyComponent': a body part stored inline in the character's
+            `body_parts` Attribute instead of as its own object. It has the
+            same API as a body part object and is much cheaper for NPCs and
+            mobs created in bulk.
+        'BodyHandler': `character.body`, lists and manages a character's
+            body parts in either form
 
     Sub-Classes:
         'head': The location of the mind of a creature
@@ -33,26 +39,43 @@
         - initialize_body_parts(character)
             Initializes a set of body parts for a new character.
 
+        - component_data(name, part_type, typeclass, traits)
+            Returns the stored dict for a new component body part.
+
         - add_new_body_part(body_part, character)
             Adds a new instance of a body_part to a character object's set of
             body parts
 
 """
 # imports
+from collections.abc import Mapping, MutableSequence
 from world.randomness_controller import distro_return_a_roll as roll
 from world.randomness_controller import distro_return_a_roll_sans_crits as rarsc
 from evennia import DefaultObject
 from evennia.utils import lazy_property
-from world.handlers.equipment import EquipHandler
 from world.handlers.traits import TraitHandler
 from world.handlers import mutations #, status_effects
 from evennia import create_object
 from evennia import utils as utils
+from django.db import transaction
+from world.character_creation import create_body_parts
 
 class BPException(Exception):
     def __init__(self, msg):
         self.msg = msg
 
+# part type: (slots that equipment may target, slots the part starts with)
+PART_SLOTS = {
+    'head': (('head', 'face', 'ears', 'eyes', 'nose', 'mouth', 'neck'),
+             ('head', 'face', 'ears', 'eyes', 'nose', 'mouth', 'neck')),
+    'torso': (('chest', 'back', 'waist', 'quiver'),
+              ('chest', 'back', 'waist', 'quiver')),
+    'leg': (('thigh', 'lower_leg', 'foot', 'toes', 'hoof'),
+            ('thigh', 'lower_leg', 'foot', 'toes')),
+    'arm': (('shoulder', 'upper_arm', 'forearm', 'hand', 'fingers'),
+            ('shoulder', 'upper_arm', 'forearm', 'hand', 'fingers')),
+}
+
 # classes for body part objects
 class BodyPart(DefaultObject):
     """
@@ -70,103 +93,310 @@ class BodyPart(DefaultObject):
         """TraitHandler that manages character mutations."""
         return TraitHandler(self, db_attribute='mutations')
 
-    @lazy_property
-    def equip(self):
-        """Handler for equipped items."""
-        return EquipHandler(self)
-
     @lazy_property
     def status_effects(self):
         """TraitHandler that manages room status effects."""
         return TraitHandler(self, db_attribute='status_effects')
 
+    part_type = 'undefined'
+
     def at_object_creation(self):
         "Called only at object creation and with update command."
         # size is relative to normal for the given creature's baseline of 100
         # 150 is 1.5 times normal size in proportion to the overall body size
         self.traits.add(key="size", name='Size', type='static', base=100)
-        self.db.type = 'undefined'
+        self.db.type = self.part_type
+        if self.part_type in PART_SLOTS:
+            allowable_eq_slots, slots = PART_SLOTS[self.part_type]
+            self.db.allowable_eq_slots = list(allowable_eq_slots)
+            self.db.slots = {slot: None for slot in slots}
+
+    def at_trait_change(self, db_attribute, trait_key):
+        """
+        Called by the TraitHandlers when one of this part's traits changes.
+        Mutation changes are passed up to the character that carries this
+        part so its whole-body rollups stay current.
+        """
+        if db_attribute == 'mutations' and self.location and \
+            utils.inherits_from(self.location, 'typeclasses.characters.Character'):
+            self.location.body_mutations.update_part(self, trait_key)
 
 
 class Head(BodyPart):
     """
     Subclass for a head on a character or NPC's body
     """
-
-    def at_object_creation(self):
-        "Called only at object creation and with update command."
-        self.traits.add(key="size", name='Size', type='static', base=100)
-        self.db.type = 'head'
-        self.db.allowable_eq_slots = ['head', 'face', 'ears',
-                                      'eyes', 'nose', 'mouth',
-                                      'neck']
-        self.db.slots = {
-            'head' : None,
-            'face' : None,
-            'ears' : None,
-            'eyes' : None,
-            'nose' : None,
-            'mouth' : None,
-            'neck' : None
-        }
+    part_type = 'head'
 
 
 class Torso(BodyPart):
     """
     Subclass for a torso on a character or NPC's body
     """
-
-    def at_object_creation(self):
-        "Called only at object creation and with update command."
-        self.traits.add(key="size", name='Size', type='static', base=100)
-        self.db.type = 'torso'
-        self.db.allowable_eq_slots = ['chest', 'back', 'waist', 'quiver']
-        self.db.slots = {
-            'chest': None,
-            'back': None,
-            'waist': None,
-            'quiver': None
-        }
+    part_type = 'torso'
 
 
 class Leg(BodyPart):
     """
     Subclass for a leg on a character or NPC's body
     """
-
-    def at_object_creation(self):
-        "Called only at object creation and with update command."
-        self.traits.add(key="size", name='Size', type='static', base=100)
-        self.db.type = 'leg'
-        self.db.allowable_eq_slots = ['thigh', 'lower_leg', 'foot', 'toes',
-                                      'hoof']
-        self.db.slots = {
-            'thigh' : None,
-            'lower_leg' : None,
-            'foot' : None,
-            'toes' : None
-        }
-
+    part_type = 'leg'
 
 
 class Arm(BodyPart):
     """
     Subclass for a arm on a character or NPC's body
     """
+    part_type = 'arm'
 
-    def at_object_creation(self):
-        "Called only at object creation and with update command."
-        self.traits.add(key="size", name='Size', type='static', base=100)
-        self.db.type = 'arm'
-        self.db.allowable_eq_slots = ['shoulder', 'upper_arm', 'forearm',
-                                      'hand', 'fingers']
-        self.db.slots = {
-            'shoulder' : None,
-            'upper_arm' : None,
-            'forearm' : None,
-            'hand' : None,
-            'fingers' : None
-        }
+
+## Component body parts
+# Each body part object costs a database row plus its own traits, mutations
+# and status_effects Attributes. Creatures spawned in bulk instead store their
+# parts as components: one dict per part, all kept in the single
+# `body_parts` Attribute on the character. `BodyComponent` wraps one of those
+# dicts and offers the same API as a BodyPart object (traits, mutations,
+# status_effects, db, key, location), so game code does not need to care
+# which form a character uses. Use `character.body` to get at either form.
+
+class ComponentAttributes(object):
+    """
+    Stand-in for an object's AttributeHandler that stores its values in the
+    dict of a body part component. This lets TraitHandler work unchanged on
+    components. Every write is saved as part of the character's `body_parts`
+    Attribute.
+    """
+    def __init__(self, data):
+        self.data = data
+
+    def has(self, key):
+        return key in self.data
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def add(self, key, value):
+        self.data[key] = value
+
+    def remove(self, key):
+        self.data.pop(key, None)
+
+
+class ComponentDb(object):
+    """`db` style attribute access to the values of a body part component."""
+    def __init__(self, data):
+        object.__setattr__(self, '_data', data)
+
+    def __getattr__(self, key):
+        return self._data.get(key)
+
+    def __setattr__(self, key, value):
+        self._data[key] = value
+
+    def __delattr__(self, key):
+        self._data.pop(key, None)
+
+
+class BodyComponent(object):
+    """
+    A body part stored inline on a character instead of as its own object.
+    Args:
+        character (Character): the character this part belongs to
+        part_key (str): key of the part in the `body_parts` Attribute,
+            ex. 'right_arm'
+        data (dict): the stored data of the part
+    """
+    is_component = True
+
+    def __init__(self, character, part_key, data):
+        self.location = character
+        self.part_key = part_key
+        self.attributes = ComponentAttributes(data)
+        self.db = ComponentDb(data)
+
+    def __repr__(self):
+        return "BodyComponent({!r}, {!r})".format(self.location, self.part_key)
+
+    def __str__(self):
+        return self.key
+
+    @property
+    def key(self):
+        return self.db.name
+
+    name = key
+
+    @property
+    def part_type(self):
+        return self.db.type
+
+    @property
+    def typeclass_path(self):
+        return self.db.typeclass
+
+    @lazy_property
+    def traits(self):
+        """TraitHandler that manages body part traits."""
+        return TraitHandler(self)
+
+    @lazy_property
+    def mutations(self):
+        """TraitHandler that manages body part mutations."""
+        return TraitHandler(self, db_attribute='mutations')
+
+    @lazy_property
+    def status_effects(self):
+        """TraitHandler that manages body part status effects."""
+        return TraitHandler(self, db_attribute='status_effects')
+
+    def at_trait_change(self, db_attribute, trait_key):
+        "Passes mutation changes up to the character, as BodyPart does."
+        if db_attribute == 'mutations':
+            self.location.body_mutations.update_part(self, trait_key)
+
+
+def component_data(name, part_type, typeclass=None, traits=None):
+    """
+    Returns the stored dict for a new body part component.
+    Args:
+        name (str): display name of the part, ex. "Meirok's Right Arm"
+        part_type (str): one of the PART_SLOTS keys, ex. 'arm'
+        typeclass (str): BodyPart typeclass this part stands in for
+        traits (dict): extra trait data, as made by TraitHandler._trait_data
+    """
+    allowable_eq_slots, slots = PART_SLOTS.get(part_type, ((), ()))
+    part_traits = {'size': TraitHandler._trait_data('Size', 'static', 100)}
+    part_traits.update(traits or {})
+    return {
+        'name': name,
+        'type': part_type,
+        'typeclass': typeclass,
+        'allowable_eq_slots': list(allowable_eq_slots),
+        'slots': {slot: None for slot in slots},
+        'traits': part_traits,
+        'mutations': {},
+        'status_effects': {},
+    }
+
+
+class BodyHandler(object):
+    """
+    Handler for the body parts of a character, whichever form they take.
+    Args:
+        obj (Character): the character
+    Methods:
+        parts (): all body parts, objects and components alike
+        get (str): a body part by component key or name
+        add_components (dict): store new component parts in one write
+        compact (): convert the character's body part objects to components
+        reset (): forget the cached components, ex. after a migration
+    """
+    def __init__(self, obj):
+        self.obj = obj
+        self._components = None
+
+    def __iter__(self):
+        return iter(self.parts())
+
+    def __len__(self):
+        return len(self.parts())
+
+    @property
+    def components(self):
+        """Dict of {part key: BodyComponent} stored on the character."""
+        if self._components is None:
+            data = self.obj.attributes.get('body_parts') or {}
+            self._components = {key: BodyComponent(self.obj, key, part)
+                                for key, part in data.items()}
+        return self._components
+
+    def objects(self):
+        """Returns the body part objects in the character's inventory."""
+        return [obj for obj in self.obj.contents
+                if utils.inherits_from(obj, BodyPart)]
+
+    def parts(self):
+        """Returns every body part of the character."""
+        return self.objects() + list(self.components.values())
+
+    def get(self, key):
+        """Returns a body part by component key or name, or None."""
+        if key in self.components:
+            return self.components[key]
+        for part in self.parts():
+            if part.key == key:
+                return part
+        return None
+
+    def add_components(self, parts):
+        """
+        Adds component body parts with a single write to the database.
+        Args:
+            parts (dict): {part key: dict made by `component_data`}
+        """
+        data = dict(self.obj.attributes.get('body_parts') or {})
+        for key in parts:
+            if key in data:
+                raise BPException("Body part '{}' already exists.".format(key))
+        data.update(parts)
+        self.obj.attributes.add('body_parts', data)
+        self.reset()
+
+    def compact(self):
+        """
+        Migrates the character's body part objects to components. Each
+        object's Attributes are copied into the `body_parts` Attribute and the
+        object is deleted, all in one transaction.
+        Returns:
+            (int): number of body parts converted
+        """
+        objects = self.objects()
+        if not objects:
+            return 0
+        data = dict(self.obj.attributes.get('body_parts') or {})
+        for part in objects:
+            part_data = {attr.key: _plain(attr.value)
+                         for attr in part.attributes.all()}
+            part_data.update(name=part.key, typeclass=part.typeclass_path)
+            part_data.setdefault('type', part.part_type)
+            for attribute in ('traits', 'mutations', 'status_effects'):
+                part_data.setdefault(attribute, {})
+            data[_component_key(part, data)] = part_data
+        with transaction.atomic():
+            self.obj.attributes.add('body_parts', data)
+            for part in objects:
+                part.delete()
+        self.reset()
+        self.obj.eq_slots_status_update()
+        return len(objects)
+
+    def reset(self):
+        """Drops the cached components and the rollups that refer to them."""
+        self._components = None
+        self.obj.body_mutations.invalidate()
+
+
+def _component_key(part, taken):
+    """Returns an unused component key for a body part object."""
+    # "Meirok's Right Arm" -> 'right_arm'
+    name = part.key.split("'s ", 1)[-1]
+    key = base = name.strip().lower().replace(' ', '_') or part.part_type
+    num = 1
+    while key in taken:
+        num += 1
+        key = "{}_{}".format(base, num)
+    return key
+
+
+def _plain(value):
+    """Returns a copy of an Attribute value with plain dicts and lists."""
+    # Attributes hand back _SaverDict and _SaverList, which are not dict or
+    # list subclasses
+    if isinstance(value, Mapping):
+        return {key: _plain(val) for key, val in value.items()}
+    if isinstance(value, (MutableSequence, tuple)):
+        return [_plain(val) for val in value]
+    return value
 
 
 # TODO: Add body part classes for the non-standard types
@@ -176,52 +406,8 @@ class Arm(BodyPart):
 # initialize a new humanoid character
 def initialize_body_parts(character):
     """
-    Load new character with their body part Objects
-    """
-    # Create body part objects
-    head = create_object("world.handlers.body_parts.Head", key='head')
-    head.name = f"{character.name}'s Head"
-    torso = create_object("world.handlers.body_parts.Torso", key='torso')
-    torso.name = f"{character.name}'s Torso"
-    right_arm = create_object("world.handlers.body_parts.Arm", key='right_arm')
-    right_arm.name = f"{character.name}'s Right Arm"
-    left_arm = create_object("world.handlers.body_parts.Arm", key='left_arm')
-    left_arm.name = f"{character.name}'s Left Arm"
-    right_leg = create_object("world.handlers.body_parts.Leg", key='right_leg')
-    right_leg.name = f"{character.name}'s Right Leg"
-    left_leg = create_object("world.handlers.body_parts.Leg", key='left_leg')
-    left_leg.name = f"{character.name}'s Left Leg"
-
-    # Add objects to character
-    head.move_to(character)
-    torso.move_to(character)
-    right_arm.move_to(character)
-    left_arm.move_to(character)
-    right_leg.move_to(character)
-    left_leg.move_to(character)
-
-    # add hp and sp to body parts
-    head.traits.add(key="hp", name="Health Points", type="gauge", \
-                    base=character.traits.hp.current * .1, extra={'learn' : 0})
-    head.traits.add(key="sp", name="Stamina Points", type="gauge", \
-                    base=character.traits.sp.current * .1, extra={'learn' : 0})
-    torso.traits.add(key="hp", name="Health Points", type="gauge", \
-                    base=character.traits.hp.current * .4, extra={'learn' : 0})
-    torso.traits.add(key="sp", name="Stamina Points", type="gauge", \
-                    base=character.traits.sp.current * .4, extra={'learn' : 0})
-    right_arm.traits.add(key="hp", name="Health Points", type="gauge", \
-                    base=character.traits.hp.current * .1, extra={'learn' : 0})
-    right_arm.traits.add(key="sp", name="Stamina Points", type="gauge", \
-                    base=character.traits.sp.current * .1, extra={'learn' : 0})
-    left_arm.traits.add(key="hp", name="Health Points", type="gauge", \
-                    base=character.traits.hp.current * .1, extra={'learn' : 0})
-    left_arm.traits.add(key="sp", name="Stamina Points", type="gauge", \
-                    base=character.traits.sp.current * .1, extra={'learn' : 0})
-    right_leg.traits.add(key="hp", name="Health Points", type="gauge", \
-                    base=character.traits.hp.current * .15, extra={'learn' : 0})
-    right_leg.traits.add(key="sp", name="Stamina Points", type="gauge", \
-                    base=character.traits.sp.current * .15, extra={'learn' : 0})
-    left_leg.traits.add(key="hp", name="Health Points", type="gauge", \
-                    base=character.traits.hp.current * .15, extra={'learn' : 0})
-    left_leg.traits.add(key="sp", name="Stamina Points", type="gauge", \
-                    base=character.traits.sp.current * .15, extra={'learn' : 0})
+    Load new character with their body parts. The parts are created directly
+    inside the character, as objects or as components depending on the
+    character's `compact_body` setting; see world.character_creation.
+    """
+    return create_body_parts(character)
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Item Decay Module.
+
+Most items lose condition (the `cond` trait, 1 is new and 0 is broken) over
+time. Ticking every item in the world to lower its condition would mean a
+constant stream of writes, so decay is stored lazily instead:
+
+    item.db.decay = {'rate': condition lost per game day,
+                     'since': game time the `cond` trait was last settled,
+                     'due': bucket the item is scheduled to break in}
+
+The current condition is worked out when it is read (`condition`) and only
+written back to the `cond` trait when the item is used or repaired
+(`settle`).
+
+Every decaying item carries a Tag in the 'decay_due' category naming the
+time bucket in which its condition will reach zero. The low-priority
+DecaySweepScript (typeclasses.scripts) looks only at the buckets that have
+come due and breaks those items in batches. Items that never decay cost
+nothing.
+
+Module Functions:
+    - now()
+        Current game time, in seconds.
+    - condition(item)
+        Projected condition of an item right now. No writes.
+    - settle(item)
+        Writes the projected condition to the item's `cond` trait.
+    - set_rate(item, rate)
+        Starts, changes, or stops (rate 0) the decay of an item.
+    - sweep(batch_size)
+        Breaks up to `batch_size` items whose condition has reached zero.
+"""
+from evennia import gametime, search_tag
+from evennia.typeclasses.tags import Tag
+from evennia.utils.logger import log_file, log_trace
+
+DECAY_CATEGORY = 'decay_due'
+# width of a due-time bucket, in game seconds
+BUCKET_SECONDS = 3600
+DAY_SECONDS = 86400
+
+
+def now():
+    """Returns the current game time in seconds."""
+    return gametime.gametime(absolute=True)
+
+
+def _bucket(when):
+    return int(when // BUCKET_SECONDS)
+
+
+def condition(item, when=None):
+    """
+    Returns the projected condition of an item, without saving it.
+    Args:
+        item (Item): an item with a `cond` trait
+        when (float, optional): game time to project to, default now
+    """
+    cond = item.traits.cond.actual
+    decay = item.attributes.get('decay')
+    if not decay or not decay['rate']:
+        return cond
+    elapsed = (now() if when is None else when) - decay['since']
+    return max(cond - decay['rate'] * elapsed / DAY_SECONDS, 0)
+
+
+def settle(item):
+    """
+    Writes the projected condition to the `cond` trait and restarts the
+    decay clock from now. Call this before changing condition directly.
+    Returns:
+        (float): the settled condition
+    """
+    decay = item.attributes.get('decay')
+    if not decay or not decay['rate']:
+        return item.traits.cond.actual
+    when = now()
+    cond = condition(item, when)
+    item.traits.cond.base = cond - item.traits.cond.mod
+    decay['since'] = when
+    return cond
+
+
+def set_rate(item, rate):
+    """
+    Sets how fast an item decays and schedules it for the sweep.
+    Args:
+        item (Item): an item with a `cond` trait
+        rate (float): condition lost per game day, 0 to stop decaying
+    """
+    settle(item)
+    decay = dict(item.attributes.get('decay') or {})
+    decay.update(rate=rate, since=now())
+    _schedule(item, decay)
+
+
+def reschedule(item):
+    """Moves an item to the right due bucket after its condition changed."""
+    decay = item.attributes.get('decay')
+    if decay:
+        _schedule(item, dict(decay))
+
+
+def _schedule(item, decay):
+    """Saves the decay data and tags the item with its due bucket."""
+    old_due = decay.get('due')
+    if decay['rate'] > 0:
+        cond = item.traits.cond.actual
+        breaks_at = decay['since'] + cond / decay['rate'] * DAY_SECONDS
+        decay['due'] = _bucket(breaks_at)
+    else:
+        decay['due'] = None
+    if old_due != decay['due']:
+        if old_due is not None:
+            item.tags.remove(str(old_due), category=DECAY_CATEGORY)
+        if decay['due'] is not None:
+            item.tags.add(str(decay['due']), category=DECAY_CATEGORY)
+    item.attributes.add('decay', decay)
+
+
+def _unschedule(item):
+    """
+    Takes an item out of every due bucket and stops its decay, ex. after
+    the sweep failed on it, so it is not picked up again on every sweep.
+    """
+    item.tags.clear(category=DECAY_CATEGORY)
+    decay = item.attributes.get('decay')
+    if decay:
+        item.attributes.add('decay', dict(decay, rate=0, due=None))
+
+
+def _due_buckets():
+    """Returns the due bucket tag keys that have come due, oldest first."""
+    current = _bucket(now())
+    keys = Tag.objects.filter(db_category=DECAY_CATEGORY).values_list(
+        'db_key', flat=True).distinct()
+    return sorted((key for key in keys if int(key) <= current), key=int)
+
+
+def sweep(batch_size=100):
+    """
+    Breaks items whose condition has run out, oldest due first, at most
+    `batch_size` per call. Items that were repaired or used since they were
+    scheduled are settled and moved to their new bucket instead.
+    Returns:
+        (int): number of items broken
+    """
+    broken = 0
+    due_items = (item for key in _due_buckets()
+                 for item in search_tag(key, category=DECAY_CATEGORY))
+    for checked, item in enumerate(due_items):
+        if checked >= batch_size:
+            break
+        try:
+            if settle(item) <= 0:
+                _schedule(item, dict(item.attributes.get('decay'), rate=0))
+                item.at_break()
+                broken += 1
+            else:
+                reschedule(item)
+        except Exception:
+            log_trace(f"Decay sweep failed for {item} (#{item.id}).")
+            _unschedule(item)
+    if broken:
+        log_file(f"Decay sweep broke {broken} items.", filename='decay.log')
+    return broken
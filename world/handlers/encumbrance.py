@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+Encumbrance Module.
+
+Every character and container keeps a running total of the mass it carries
+in its `carried_mass` Attribute. The total includes everything nested
+inside it: a character carrying a quiver of arrows carries the mass of the
+quiver and of every arrow in it. Rooms do not keep a total.
+
+The totals are kept up to date with mass deltas from the move hooks
+(`at_object_receive` and `at_object_leave` on Character and Item). A delta
+is applied to the container and to each container above it, up to the
+room. A get or drop therefore costs one write per level of nesting, no
+matter how much is in the inventory.
+
+When an item's `mass` trait changes, the difference from the mass it was
+counted with, kept in its `counted_mass` Attribute, is passed up the same
+way (see `mass_changed`).
+
+On characters, the `enc` counter trait mirrors the total so it can be shown
+against its max (the most the character can carry).
+
+Module Functions:
+    - own_mass(obj)
+        Mass of the object itself.
+    - carried_mass(obj)
+        Cached total mass of everything inside the object.
+    - total_mass(obj)
+        own_mass + carried_mass, what the object weighs to whoever carries it.
+    - capacity(obj)
+        Most mass the object can hold, or None if unlimited.
+    - can_carry(destination, obj)
+        True if obj can be moved into destination without exceeding the
+        capacity of destination or anything that carries it.
+    - apply_delta(container, delta)
+        Adds a mass change to a container and every container above it.
+    - mass_changed(obj)
+        Passes a change to the mass trait of obj up to its containers.
+    - refresh(obj)
+        Updates the containers of obj after its own mass changed, by
+        re-summing its container.
+    - recalculate(obj)
+        Rebuilds the totals of obj and everything inside it from scratch.
+"""
+from evennia import utils as utils
+
+ROOM_TYPECLASS = 'evennia.objects.objects.DefaultRoom'
+CHARACTER_TYPECLASS = 'typeclasses.characters.Character'
+BODY_PART_TYPECLASS = 'world.handlers.body_parts.BodyPart'
+
+
+def _containers(obj):
+    """Yields obj and each object carrying it, stopping before the room."""
+    while obj is not None and not utils.inherits_from(obj, ROOM_TYPECLASS):
+        yield obj
+        obj = obj.location
+
+
+def own_mass(obj):
+    """
+    Returns the mass of the object itself, 0 if it has none. For stacks,
+    the `mass` trait is per unit and is multiplied by the quantity.
+    """
+    if utils.inherits_from(obj, BODY_PART_TYPECLASS):
+        # body parts are part of the character's own mass
+        return 0
+    traits = getattr(obj, 'traits', None)
+    mass = traits.get('mass') if traits is not None else None
+    if mass is None:
+        return 0
+    return mass.actual * getattr(obj, 'quantity', 1)
+
+
+def carried_mass(obj):
+    """Returns the cached total mass of everything inside the object."""
+    return obj.attributes.get('carried_mass', default=0)
+
+
+def total_mass(obj):
+    """Returns what the object weighs, including everything inside it."""
+    return own_mass(obj) + carried_mass(obj)
+
+
+def capacity(obj):
+    """Returns the most mass the object can hold, or None if unlimited."""
+    traits = getattr(obj, 'traits', None)
+    if traits is None:
+        return None
+    if utils.inherits_from(obj, CHARACTER_TYPECLASS):
+        enc = traits.get('enc')
+        return enc.max if enc is not None else None
+    cap = traits.get('cap')
+    return cap.actual if cap is not None else None
+
+
+def can_carry(destination, obj):
+    """
+    Checks the capacity of the destination and of each container above it.
+    Containers that already carry the object are skipped, since moving it
+    around inside them does not change their load.
+    Returns:
+        (bool): True if the object fits
+    """
+    mass = total_mass(obj)
+    carriers = set(_containers(obj.location))
+    for container in _containers(destination):
+        if container in carriers:
+            break
+        limit = capacity(container)
+        if limit is not None and carried_mass(container) + mass > limit:
+            return False
+    return True
+
+
+def apply_delta(container, delta):
+    """Adds a change in carried mass to a container and all above it."""
+    if not delta:
+        return
+    for obj in _containers(container):
+        _store(obj, carried_mass(obj) + delta)
+
+
+def mass_changed(obj):
+    """
+    Passes a change to an object's `mass` trait on to whoever carries it, as
+    the difference from the mass it was last counted with. Costs O(depth).
+    Objects counted before `counted_mass` was kept are re-summed once.
+    """
+    mass = obj.traits.get('mass')
+    new = mass.actual if mass is not None else 0
+    old = obj.attributes.get('counted_mass')
+    if old is None:
+        refresh(obj)
+    else:
+        # the trait is per unit for stacks
+        apply_delta(obj.location, (new - old) * getattr(obj, 'quantity', 1))
+    if new != old:
+        obj.attributes.add('counted_mass', new)
+
+
+def refresh(obj):
+    """
+    Updates the totals above an object whose own mass has changed, ex. from
+    its `mass` trait. The total of its container is re-summed from the
+    cached totals of its contents, and the difference is passed on up.
+    Costs O(items in that container + depth), not O(inventory).
+    """
+    container = obj.location
+    if container is None or utils.inherits_from(container, ROOM_TYPECLASS):
+        return
+    carried = sum(total_mass(content) for content in container.contents
+                  if not content.destination)
+    delta = carried - carried_mass(container)
+    if delta:
+        _store(container, carried)
+        apply_delta(container.location, delta)
+
+
+def recalculate(obj):
+    """
+    Rebuilds the carried mass of an object and everything inside it from
+    scratch. Only needed to repair totals, ex. for objects that were
+    carrying things before running totals were kept.
+    Returns:
+        (float): the total mass of the object, including its contents
+    """
+    carried = sum(recalculate(content) for content in obj.contents
+                  if not content.destination)
+    _store(obj, carried)
+    return own_mass(obj) + carried
+
+
+def _store(obj, carried):
+    """Saves a carried mass total, mirrored to `enc` on characters."""
+    # avoid float drift below zero when everything has been removed
+    carried = max(carried, 0)
+    obj.attributes.add('carried_mass', carried)
+    if utils.inherits_from(obj, CHARACTER_TYPECLASS):
+        enc = obj.traits.get('enc')
+        if enc is not None:
+            enc.current = carried
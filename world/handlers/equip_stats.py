@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+Equipment Stats Handler.
+
+Combat needs a character's armor mitigation multipliers (`pamm`, `samm`,
+`camm` on Armor) and weapon stats (`pdamm`, `sdamm`, `cdamm`, `minran`,
+`maxran` on Weapon and Tool) on every swing. Reading them from scratch means
+loading the traits Attribute of every equipped item each time.
+
+This handler keeps the numbers precomputed instead, for the character as a
+whole and for each body part (for hit-location mitigation). The cache is
+built the first time it is read and is then updated incrementally:
+    - Equippable.at_equip and Equippable.at_remove add and remove items
+    - Equippable.at_trait_change refreshes an equipped item whose stats
+      change (see world.handlers.traits)
+
+Armor multipliers stack by multiplying, so two pieces of armor with a `pamm`
+of 1.1 covering the same body part give that part a `pamm` of 1.21. A
+multiplier of 1 (nothing equipped) provides no protection.
+
+Setup:
+    ```python
+    from world.handlers.equip_stats import EquipStatsHandler
+      ...
+    @lazy_property
+    def equip_stats(self):
+        return EquipStatsHandler(self)
+    ```
+Use:
+    ```python
+    >>> char.equip_stats.armor('pamm')
+    1.21
+    >>> char.equip_stats.armor('pamm', part="Meirok's Head")
+    1.1
+    >>> char.equip_stats.weapon('pdamm')
+    1.1
+    >>> char.equip_stats.reach()
+    (0, 2)
+    ```
+"""
+ARMOR_STATS = ('pamm', 'samm', 'camm')
+WEAPON_STATS = ('pdamm', 'sdamm', 'cdamm', 'minran', 'maxran')
+
+
+class EquipStatsHandler(object):
+    """
+    Handler for cached equipment stats on a character.
+    Args:
+        obj (Character): the character wearing the equipment
+    Methods:
+        armor (str, str): armor multiplier for the character or a body part
+        weapon (str, Weapon): stat of the primary or a given weapon
+        weapons (): the equipped items that have weapon stats
+        reach (): (minimum, maximum) range over all equipped weapons
+        add_item (Equippable): start tracking a newly equipped item
+        remove_item (Equippable): stop tracking a removed item
+        update_item (Equippable): refresh the stats of an equipped item
+        invalidate (): drop the cache so it is rebuilt on next read
+    """
+    def __init__(self, obj):
+        self.obj = obj
+        self._items = None
+
+    # Public members
+
+    def armor(self, stat, part=None):
+        """
+        Returns an armor mitigation multiplier.
+        Args:
+            stat (str): 'pamm', 'samm' or 'camm'
+            part (str, optional): body part name for hit-location mitigation.
+                All equipped armor is counted if not given.
+        """
+        self._cache()
+        if part is None:
+            return self._armor[stat]
+        return self._part_armor.get(part, {}).get(stat, 1)
+
+    def weapon(self, stat, item=None, default=None):
+        """
+        Returns a weapon stat for the given equipped item, or for the first
+        equipped weapon if no item is given.
+        """
+        weapons = self.weapons()
+        if item is None:
+            item = weapons[0] if weapons else None
+        entry = self._cache().get(getattr(item, 'id', None))
+        if entry is None:
+            return default
+        return entry['stats'].get(stat, default)
+
+    def weapons(self):
+        """Returns the equipped items that have weapon stats."""
+        return [entry['item'] for entry in self._cache().values()
+                if any(stat in entry['stats'] for stat in WEAPON_STATS)]
+
+    def reach(self):
+        """Returns the (minimum, maximum) range of the equipped weapons."""
+        self._cache()
+        return self._reach
+
+    def add_item(self, item):
+        """Adds a newly equipped item to the cache."""
+        if self._items is None:
+            # nothing cached yet, the next read builds it from scratch
+            return
+        self._items[item.id] = self._entry(item)
+        self._aggregate()
+
+    def remove_item(self, item):
+        """Removes an item that was unequipped from the cache."""
+        if self._items is None:
+            return
+        if self._items.pop(item.id, None) is not None:
+            self._aggregate()
+
+    def update_item(self, item):
+        """Refreshes the cached stats of an equipped item."""
+        if self._items is None or item.id not in self._items:
+            return
+        self._items[item.id] = self._entry(item)
+        self._aggregate()
+
+    def invalidate(self):
+        """Drops the cache. It will be rebuilt on the next read."""
+        self._items = None
+
+    # Private members
+
+    def _entry(self, item):
+        """Reads the stats of one item and the body parts it covers."""
+        stats = {}
+        for stat in ARMOR_STATS + WEAPON_STATS:
+            trait = item.traits.get(stat)
+            if trait is not None:
+                stats[stat] = trait.actual
+        claims = self.obj.equipment.index['items'].get(item.id, ())
+        return {'item': item, 'stats': stats,
+                'parts': {part for _, part in claims}}
+
+    def _aggregate(self):
+        """
+        Recomputes the totals from the cached per-item numbers. No item
+        traits are read here.
+        """
+        armor = dict.fromkeys(ARMOR_STATS, 1)
+        part_armor = {}
+        minran, maxran = None, None
+        for entry in self._items.values():
+            stats = entry['stats']
+            for stat in ARMOR_STATS:
+                if stat in stats:
+                    armor[stat] *= stats[stat]
+                    for part in entry['parts']:
+                        part_stats = part_armor.setdefault(
+                            part, dict.fromkeys(ARMOR_STATS, 1))
+                        part_stats[stat] *= stats[stat]
+            if 'minran' in stats:
+                minran = stats['minran'] if minran is None \
+                    else min(minran, stats['minran'])
+            if 'maxran' in stats:
+                maxran = stats['maxran'] if maxran is None \
+                    else max(maxran, stats['maxran'])
+        self._armor = armor
+        self._part_armor = part_armor
+        self._reach = (minran, maxran)
+
+    def _cache(self):
+        """Builds the cache from the equipped items if needed."""
+        if self._items is None:
+            self._items = {item.id: self._entry(item)
+                           for item in self.obj.equipment.eq}
+            self._aggregate()
+        return self._items
@@ -6,151 +6,245 @@ and then modified to fit Delusion of Grandeur's twitch style combat.
 
 Equipment handler module.
 
+Equipment slots live on the body parts of a character (see
+world.handlers.body_parts). Rather than scanning every body part on each
+equip, the handler keeps a slot index in the character's `eq_index`
+Attribute:
+
+    {'slots': {slot name: {body part name: item or None}},
+     'free': {slot name: set of body part names with that slot empty},
+     'items': {item id: [(slot name, body part name), ...]}}
+
+Equipping or removing an item only touches the slots of that item and saves
+the index with a single Attribute write. The index is authoritative; the
+`slots` dict on each body part only describes which slots it has.
+
+Item slot names may be plural, ex. 'hands' or 'feet'. A plural slot
+occupies the singular slot on every body part that has it, so a two-handed
+weapon with `slots = ['hands']` takes the 'hand' slot of both arms.
+
 Config Properties:
-    TODO
+    PLURAL_SLOTS (dict): plural item slot name -> body part slot name
 
 Setup:
     To use the EquipHandler, add it to a character typeclass as follows:
     ```python
-    from world.equip import EquipHandler
+    from world.handlers.equipment import EquipHandler
       ...
-    @property
-    def equip(self):
+    @lazy_property
+    def equipment(self):
         return EquipHandler(self)
     ```
 Use:
     Equippable items are equipped and unequipped using the `add` and `remove`
-    methods, respectively.
+    methods, respectively. These call the item's `at_equip` and `at_remove`
+    hooks.
     The EquipHandler can be iterated over to access the contents of its slots
-    in an ordered fashion. It also supports `obj in character.equip` syntax
-    to check whether an item is equipped
+    in an ordered fashion. It also supports `obj in character.equipment`
+    syntax to check whether an item is equipped.
+    Call `rebuild` after the character's body parts change.
 """
 from typeclasses.items import Equippable
-from functools import reduce
+from evennia.utils.dbserialize import deserialize
+
+PLURAL_SLOTS = {
+    'hands': 'hand',
+    'feet': 'foot',
+    'thighs': 'thigh',
+    'lower_legs': 'lower_leg',
+    'upper_arms': 'upper_arm',
+    'forearms': 'forearm',
+    'shoulders': 'shoulder',
+}
+
 
 class EquipException(Exception):
     """Base exception class for EquipHandler."""
     def __init__(self, msg):
         self.msg = msg
 
+
 class EquipHandler(object):
     """Handler for a character's "equipped" items.
     Args:
         obj (character): character object
     Properties
-        slots (tuple): returns a tuple of all slots in order
-        empty_slots (list): returns a list of empty slots
-    Note:
-        Individual slots' items can be accessed as attributes
+        slots (list): returns a list of all slot names
+        empty_slots (list): returns slot names with at least one free part
+        full_slots (list): returns slot names with at least one item in them
+        eq (list): returns the equipped items
     Methods:
         add (Equippable): "equip" an item from the character's inventory.
         remove (Equippable): "un-equip" an item and move it to inventory.
+        get (str): returns the items in a slot
+        rebuild (): rebuilds the slot index from the body parts
     """
     def __init__(self, obj):
         # save the parent typeclass
         self.obj = obj
-
-        if not self.obj.db.eq_slots:
-            raise EquipException('`EquipHandler` requires `db.eq_slots` attribute on `{}`.'.format(obj))
-
-        if len(self.obj.contents) > 0:
-            self.slots = [slot for body_part in eq_slots for slot in self.obj.db.eq_slots[body_part].items()]
-            self.slot_names = [slot for body_part in eq_slots for slot in self.obj.db.eq_slots[body_part].keys()]
-            self.empty_slots = [slot[0] for body_part in eq_slots for slot in self.obj.db.eq_slots[body_part].items() if slot[1] == None]
-            self.full_slots = [slot[0] for body_part in eq_slots for slot in self.obj.db.eq_slots[body_part].items() if slot[1] != None]
-            self.eq = [slot[1] for body_part in eq_slots for slot in self.obj.db.eq_slots[body_part].items() if slot[1] != None]
-
-        else:
-            self.body_parts = {}
-
-
-    def _set(self, body_part, slot, item):
-        "Set a slot's contents on a body part"
-        # allows None values to pass all checks
-        if item is not None:
-            # confirm the item is equippable
-            if not item.is_typeclass(Equippable, exact=False):
-                raise EquipException("Item is not equippable.")
-            # confirm the requested slot is valid
-            if slot not in self.slots:
-                raise EquipException("Slot not available: {}".format(slot))
-        # We'll equip the item to the body part and then update the character
-        body_part.db.slots[slot] = item
-        self.obj.eq_slots_status_update()
-
-
-    def get(self, slot):
-        """Return the item in the named slot."""
-        if slot in self.slots:
-            return self.slots[slot]
+        index = obj.attributes.get('eq_index')
+        if index is None:
+            self.rebuild()
         else:
-            return None
-
+            # work on a plain copy; it is saved back in one write per change
+            self.index = deserialize(index)
 
     def __len__(self):
         """Returns the number of equipped objects."""
-        return len(self.full_slots)
-
+        return len(self.index['items'])
 
     def __str__(self):
         """Shows the Equipment"""
         return str(self.eq)
 
-
     def __iter__(self):
-        """Iterate over the equipment in an ordered way."""
-        if not self.obj.db.eq_slots:
-            return
+        """Iterate over (slot, item) pairs in an ordered way."""
         for slot in self.slots:
-                yield slot, self.get(slot)
+            for part in sorted(self.index['slots'][slot]):
+                yield slot, self.index['slots'][slot][part]
 
+    def __contains__(self, item):
+        """True if the item is equipped."""
+        return getattr(item, 'id', None) in self.index['items']
 
     @property
     def slots(self):
         """Returns a list of all equipment slots."""
-        return self.slots
-
+        return sorted(self.index['slots'])
 
     @property
     def empty_slots(self):
-        """Returns a list of empty slots."""
-        return self.empty_slots
+        """Returns a list of slots with at least one free body part."""
+        return [slot for slot in self.slots if self.index['free'][slot]]
+
+    @property
+    def full_slots(self):
+        """Returns a list of slots with at least one item in them."""
+        return [slot for slot in self.slots
+                if len(self.index['free'][slot]) < len(self.index['slots'][slot])]
 
+    @property
+    def eq(self):
+        """Returns a list of the equipped items."""
+        items = []
+        for slot, item in self:
+            if item is not None and item not in items:
+                items.append(item)
+        return items
+
+    def get(self, slot, part=None):
+        """
+        Return the items in the named slot.
+        Args:
+            slot (str): slot name, ex. 'hand'. Plural names are accepted.
+            part (str, optional): only look at the body part of this name
+        Returns:
+            (list): the items in that slot, without empty entries
+        """
+        slot = PLURAL_SLOTS.get(slot, slot)
+        parts = self.index['slots'].get(slot, {})
+        if part is not None:
+            item = parts.get(part)
+            return [item] if item is not None else []
+        return [item for item in parts.values() if item is not None]
 
     def add(self, item):
         """Add an object to character's equip.
         Args:
             item (Equippable): the item to be equipped
+        Returns:
+            (bool): True if the item was equipped
         """
-        if len(self.empty_slots) < 1:
+        if not item.is_typeclass(Equippable, exact=False):
+            raise EquipException("Item is not equippable.")
+        if item in self:
             return False
-        if len(self.empty_slots) < len(item.db.slots):
+        claims = self._claims(item)
+        if not claims:
             return False
-        for slot in self.empty_slots:
-            for item_slot in item.db.slots:
-                if slot == item_slot:
-                    # now we have to iterate through the body parts and equip
-                    # to the right slot on the right body part
-                    for body_part in self.obj.db.limbs:
-                        for slot_name, eq in body_part.db.eq_slots.items():
-                            if eq != None and slot_name == item_slot:
-                                # try to ensure we scrub the empty slot list of this slot
-                                self.empty_slots.pop(slot)
-                                # equip the item
-                                self._set(body_part, slot, item)
+        for slot, part in claims:
+            self.index['slots'][slot][part] = item
+            self.index['free'][slot].discard(part)
+        self.index['items'][item.id] = claims
+        self._save()
+        item.at_equip(self.obj)
         return True
 
-    def remove(self,item):
+    def remove(self, item):
         """Remove an object from character's equip.
         Args:
             item (Equippable): the item to be un-equipped
+        Returns:
+            (bool): True if the item was equipped
         """
-        removed = False
-        for item_slot in item.db.slots:
-            for body_part in self.obj.db.limbs:
-                for slot_name, eq in body_part.db.eq_slots.items():
-                    if slot_name == item_slot:
-                        self._set(body_part, slot, None)
-                        self.empty_slots.append(slot_name)
-                        removed = True
-        return removed
+        claims = self.index['items'].pop(getattr(item, 'id', None), None)
+        if claims is None:
+            return False
+        for slot, part in claims:
+            self.index['slots'][slot][part] = None
+            self.index['free'][slot].add(part)
+        self._save()
+        item.at_remove(self.obj)
+        return True
+
+    def rebuild(self):
+        """
+        Rebuilds the slot index from the character's body parts, keeping any
+        items already equipped on parts that still exist. Call this after body
+        parts are added, removed, or converted.
+        """
+        old_slots = getattr(self, 'index', {}).get('slots', {})
+        index = {'slots': {}, 'free': {}, 'items': {}}
+        for part in self.obj.body.parts():
+            for slot, item in (part.db.slots or {}).items():
+                item = old_slots.get(slot, {}).get(part.key, item)
+                index['slots'].setdefault(slot, {})[part.key] = item
+                free = index['free'].setdefault(slot, set())
+                if item is None:
+                    free.add(part.key)
+                else:
+                    index['items'].setdefault(item.id, []).append((slot, part.key))
+        self.index = index
+        self._save()
+        # the body parts covered by each item may have changed
+        self.obj.equip_stats.invalidate()
+
+    def _claims(self, item):
+        """
+        Works out which (slot, body part) pairs an item would occupy. Only
+        the item's own slots are looked at.
+        Returns:
+            (list): the pairs, or an empty list if the item does not fit
+        """
+        wanted = item.db.slots or []
+        if isinstance(wanted, str):
+            wanted = [wanted]
+        claims = []
+        for item_slot in wanted:
+            claim = self._claim_slot(item_slot)
+            if claim and not item.db.multi_slot:
+                # equips to the first available slot
+                return claim
+            if not claim and item.db.multi_slot:
+                # requires all listed slots
+                return []
+            claims += claim or []
+        return claims
+
+    def _claim_slot(self, item_slot):
+        """Returns the (slot, part) pairs for one item slot, or None."""
+        slot = PLURAL_SLOTS.get(item_slot, item_slot)
+        parts = self.index['slots'].get(slot)
+        free = self.index['free'].get(slot)
+        if not free:
+            return None
+        if item_slot in PLURAL_SLOTS:
+            # plural slots need that slot free on every body part with it
+            if len(free) < len(parts):
+                return None
+            return [(slot, part) for part in sorted(free)]
+        return [(slot, min(free))]
+
+    def _save(self):
+        """Saves the whole slot index with one Attribute write."""
+        self.obj.attributes.add('eq_index', self.index)
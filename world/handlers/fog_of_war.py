@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""
+Fog of War Handler.
+
+Keeps track of where a character has been and what they have seen, so the
+overhead map can show remembered rooms that are out of sight. Lists or
+dicts of room ids on every character would grow with every room they ever
+walk through, so the state is kept as bitsets instead: per zone, one bit
+per X, Y cell of the zone, in two layers
+
+    visited:   the character has stood in the room
+    explored:  the room has been in sight on the character's map
+
+Each zone is saved in its own Attribute (category FOG_CATEGORY, keyed by
+zone) as its bounds plus the zlib-compressed, bit-packed layers, so one
+move only rewrites the zone it happened in, and only when a bit changed.
+In memory, the layers of the zones used are unpacked into boolean numpy
+arrays, so the map can AND a slice of them with its view in one operation.
+
+The last RECENT_VISITS rooms entered are kept, with when they were entered,
+in a small ring buffer in memory. It is saved to the `recent_visits`
+Attribute every RECENT_FLUSH new rooms and when the character is
+unpuppeted (see `flush`), not on every step. Visits older than
+RECENT_SECONDS no longer count as recent.
+
+Setup:
+    ```python
+    from world.handlers.fog_of_war import FogOfWar
+      ...
+    @lazy_property
+    def fog(self):
+        return FogOfWar(self)
+    ```
+Use:
+    ```python
+    >>> char.fog.visit(room)
+    >>> char.fog.has_visited(room)
+    True
+    >>> char.fog.window('the outdoors', 12, -3, 2)
+    array([[False, False, False, False, False], ...])
+    >>> char.fog.recently_visited()
+    [123, 122, 118]
+    ```
+
+Config Properties:
+    RECENT_VISITS (int): size of the ring buffer of recent visits
+    RECENT_SECONDS (int): how long a visit counts as recent
+    RECENT_FLUSH (int): new rooms visited between saves of the ring buffer
+"""
+import time
+import zlib
+from itertools import count
+import numpy as np
+from world.handlers import spatial_index
+
+FOG_CATEGORY = 'fog_of_war'
+LAYERS = ('visited', 'explored')
+RECENT_VISITS = 20
+RECENT_SECONDS = 3600
+RECENT_FLUSH = 10
+
+# fog versions are drawn from one counter, so a version is never reused
+_versions = count(1)
+
+
+class ZoneFog(object):
+    """
+    The fog layers of one zone. Cell [i, j] is at coordinates
+    (x0 + i, y0 + j). The layers grow when a cell outside them is marked.
+    """
+    def __init__(self, x0=0, y0=0, shape=(0, 0)):
+        self.x0, self.y0 = x0, y0
+        self.layers = {layer: np.zeros(shape, dtype=bool) for layer in LAYERS}
+
+    @classmethod
+    def load(cls, record):
+        """Unpacks a zone saved by `save`."""
+        zone_fog = cls(record['x0'], record['y0'], tuple(record['shape']))
+        size = zone_fog.layers['visited'].size
+        for layer in LAYERS:
+            bits = np.frombuffer(zlib.decompress(record[layer]), dtype=np.uint8)
+            zone_fog.layers[layer] = np.unpackbits(bits, count=size).reshape(
+                record['shape']).astype(bool)
+        return zone_fog
+
+    def save(self):
+        """Returns the zone packed for saving in an Attribute."""
+        record = {'x0': self.x0, 'y0': self.y0,
+                  'shape': list(self.layers['visited'].shape)}
+        for layer in LAYERS:
+            record[layer] = zlib.compress(
+                np.packbits(self.layers[layer]).tobytes())
+        return record
+
+    def mark(self, layer, x, y, seen):
+        """
+        ORs a boolean window centred on (x, y) into a layer.
+        Returns:
+            (bool): True if any bit changed
+        """
+        rows, cols = np.nonzero(seen)
+        if not len(rows):
+            return False
+        # only the box around the cells seen needs to fit in the layer
+        part = seen[rows.min():rows.max() + 1, cols.min():cols.max() + 1]
+        radius = seen.shape[0] // 2
+        x1, y1 = x - radius + int(rows.min()), y - radius + int(cols.min())
+        self._fit(x1, y1, x1 + part.shape[0] - 1, y1 + part.shape[1] - 1)
+        i, j = x1 - self.x0, y1 - self.y0
+        target = self.layers[layer][i:i + part.shape[0], j:j + part.shape[1]]
+        if not (part & ~target).any():
+            return False
+        target |= part
+        return True
+
+    def window(self, layer, x, y, radius):
+        """
+        Returns the square of a layer within `radius` of (x, y). Cells
+        outside the layer are False.
+        """
+        size = 2 * radius + 1
+        out = np.zeros((size, size), dtype=bool)
+        source = self.layers[layer]
+        width, height = source.shape
+        i1, j1 = max(x - radius - self.x0, 0), max(y - radius - self.y0, 0)
+        i2 = min(x + radius - self.x0 + 1, width)
+        j2 = min(y + radius - self.y0 + 1, height)
+        if i1 < i2 and j1 < j2:
+            oi, oj = i1 - (x - radius - self.x0), j1 - (y - radius - self.y0)
+            out[oi:oi + i2 - i1, oj:oj + j2 - j1] = source[i1:i2, j1:j2]
+        return out
+
+    def _fit(self, x1, y1, x2, y2):
+        """Grows the layers so that cells (x1, y1) to (x2, y2) are inside."""
+        width, height = self.layers['visited'].shape
+        if not width:
+            # nothing marked yet, start at the first cells marked
+            self.x0, self.y0 = x1, y1
+        pad_x = (max(self.x0 - x1, 0), max(x2 - self.x0 - width + 1, 0))
+        pad_y = (max(self.y0 - y1, 0), max(y2 - self.y0 - height + 1, 0))
+        if any(pad_x) or any(pad_y):
+            for layer in LAYERS:
+                self.layers[layer] = np.pad(self.layers[layer], (pad_x, pad_y))
+            self.x0 -= pad_x[0]
+            self.y0 -= pad_y[0]
+
+
+class FogOfWar(object):
+    """
+    Handler for the rooms a character has visited and explored.
+    Args:
+        obj (Character): the character whose fog this is
+    Properties:
+        version (int): changes whenever a bit changes, for caches of
+            anything drawn from the fog
+    Methods:
+        visit (Room): record that the character entered a room
+        explore (str, int, int, ndarray): record the rooms in sight
+        window (str, int, int, int, str): a slice of a layer
+        has_visited (Room): whether the character has been in a room
+        recently_visited (int): ids of the rooms entered recently
+        flush (): save the recent visits kept in memory
+        clear (): forget everything
+    """
+    def __init__(self, obj):
+        self.obj = obj
+        self.version = next(_versions)
+        self._zones = {}
+        self._recent = None
+        self._unsaved = 0
+
+    def visit(self, room):
+        """Records that the character entered a room."""
+        self._remember_visit(room.id)
+        pos = spatial_index.position(room)
+        if pos is None:
+            return
+        zone, x, y = pos
+        here = np.ones((1, 1), dtype=bool)
+        zone_fog = self._zone(zone)
+        changed = zone_fog.mark('visited', x, y, here)
+        changed = zone_fog.mark('explored', x, y, here) or changed
+        if changed:
+            self._save(zone)
+
+    def explore(self, zone, x, y, seen):
+        """
+        Marks the rooms in sight as explored.
+        Args:
+            zone (str): the zone looked at
+            x, y (int): the centre of the view
+            seen (ndarray): square boolean window centred on (x, y), True
+                for the cells with a room in sight
+        """
+        if self._zone(zone).mark('explored', x, y, seen):
+            self._save(zone)
+
+    def window(self, zone, x, y, radius, layer='explored'):
+        """Returns the square of a layer within `radius` of (x, y)."""
+        return self._zone(zone).window(layer, x, y, radius)
+
+    def has_visited(self, room):
+        """Returns True if the character has stood in the room."""
+        pos = spatial_index.position(room)
+        if pos is None:
+            return False
+        zone, x, y = pos
+        return bool(self.window(zone, x, y, 0, layer='visited')[0, 0])
+
+    def recently_visited(self, seconds=RECENT_SECONDS):
+        """Returns the ids of the rooms entered recently, latest first."""
+        recent = self._recent_visits()
+        visits, cursor = recent['visits'], recent['cursor']
+        since = time.time() - seconds
+        # oldest first from the cursor on, once the buffer has wrapped
+        ordered = visits[cursor:] + visits[:cursor]
+        return [room_id for room_id, entered in reversed(ordered)
+                if entered >= since]
+
+    def clear(self):
+        """Forgets every room visited and explored."""
+        self.obj.attributes.clear(category=FOG_CATEGORY)
+        self.obj.attributes.remove('recent_visits')
+        self._zones = {}
+        self._recent = None
+        self._unsaved = 0
+        self.version = next(_versions)
+
+    def flush(self):
+        """Saves the recent visits kept in memory, if any are unsaved."""
+        if self._unsaved:
+            self.obj.attributes.add('recent_visits', self._recent)
+            self._unsaved = 0
+
+    def _recent_visits(self):
+        """Returns the ring buffer of recent visits, loading it if needed."""
+        if self._recent is None:
+            recent = self.obj.attributes.get('recent_visits') or {}
+            self._recent = {'visits': [list(visit) for visit
+                                       in recent.get('visits', [])],
+                            'cursor': recent.get('cursor', 0)}
+        return self._recent
+
+    def _remember_visit(self, room_id):
+        """Adds a visit to the ring buffer of recent visits."""
+        recent = self._recent_visits()
+        visits, cursor = recent['visits'], recent['cursor']
+        last = (cursor or len(visits)) - 1
+        if visits and visits[last][0] == room_id:
+            # stepping back into the same room only refreshes the time,
+            # which is saved with the next new room
+            visits[last][1] = time.time()
+            return
+        if len(visits) < RECENT_VISITS:
+            visits.append([room_id, time.time()])
+        else:
+            visits[cursor] = [room_id, time.time()]
+            recent['cursor'] = (cursor + 1) % RECENT_VISITS
+        self._unsaved += 1
+        if self._unsaved >= RECENT_FLUSH:
+            self.flush()
+
+    def _zone(self, zone):
+        """Returns the fog of a zone, loading it on first use."""
+        zone = spatial_index.zone_key(zone)
+        if zone not in self._zones:
+            record = self.obj.attributes.get(zone, category=FOG_CATEGORY)
+            self._zones[zone] = ZoneFog.load(record) if record else ZoneFog()
+        return self._zones[zone]
+
+    def _save(self, zone):
+        """Saves the fog of a zone after a bit changed."""
+        self.obj.attributes.add(zone, self._zones[zone].save(),
+                                category=FOG_CATEGORY)
+        self.version = next(_versions)
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Inventory Index Handler.
+
+Finding the right ammunition or consumable used to mean scanning every
+object a character carries and checking its typeclass and aliases, on every
+shot. This handler keeps an index of a holder's direct contents keyed by
+(category, key) pairs, so those lookups take constant time.
+
+Objects say how they should be indexed through an `index_keys` method that
+returns a list of (category, key) pairs, for example:
+    Stackable arrows:     [('ammo', 'arrow'), ('stack', '...Arrow:arrow')]
+    Consumnable rations:  [('consumable', 'food')]
+
+Every object is also indexed under ('content', <content category>), the
+group it is listed in when a room is looked at: 'mobile', 'item',
+'entrance', 'road' or 'exit' (see CONTENT_CATEGORIES). The category of a
+typeclass is worked out once and cached by typeclass path, so an object
+that changes typeclass gets the category of its new one.
+
+The index is not persistent. It is built from the holder's contents the
+first time it is read and then kept up to date by the move hooks
+(`at_object_receive`, `at_object_leave`) and by item deletion.
+
+Setup:
+    ```python
+    from world.handlers.inventory_index import InventoryIndex
+      ...
+    @lazy_property
+    def inventory(self):
+        return InventoryIndex(self)
+    ```
+Use:
+    ```python
+    >>> char.inventory.find('ammo', 'arrow')
+    <Arrow: arrow>
+    >>> char.inventory.find_all('consumable', 'food')
+    [<Ration: trail ration>, <Ration: dried meat>]
+    >>> room.inventory.find_all('content', 'mobile')
+    [<Character: Bob>, <NPC: a goblin>]
+    ```
+
+Config Properties:
+    CONTENT_CATEGORIES (list): (category, typeclasses) in the order they are
+        checked, the first category with a matching typeclass wins
+
+Module Functions:
+    - content_category(obj)
+        The group an object is listed in when a room is looked at.
+"""
+from evennia.utils.utils import inherits_from
+
+CONTENT_CATEGORIES = [
+    ('mobile', ('typeclasses.characters.Character',)),
+    ('entrance', ('typeclasses.items.Building', 'typeclasses.items.Town')),
+    ('road', ('typeclasses.items.RoadsAndTrail',)),
+    ('item', ('typeclasses.items.Item',)),
+]
+
+# typeclass path -> content category
+_categories = {}
+
+
+class InventoryIndex(object):
+    """
+    Handler for the (category, key) index of a holder's contents.
+    Args:
+        obj (Object): the character or container that holds the items
+    Methods:
+        find (str, str): first indexed object for a category and key
+        find_all (str, str): every indexed object for a category and key
+        add (Object): index an object that arrived in the holder
+        remove (Object): forget an object that left the holder
+        invalidate (): drop the index so it is rebuilt on next read
+    """
+    def __init__(self, obj):
+        self.obj = obj
+        self._index = None
+
+    def find(self, category, key):
+        """Returns the first object indexed under category and key, or None."""
+        found = self.find_all(category, key)
+        return found[0] if found else None
+
+    def find_all(self, category, key):
+        """Returns the objects indexed under category and key."""
+        entries = self._cache().get((category, key))
+        if not entries:
+            return []
+        # drop anything that left without going through the move hooks
+        live = [obj for obj in entries
+                if obj.pk and obj.location == self.obj]
+        if len(live) != len(entries):
+            entries[:] = live
+        return list(live)
+
+    def add(self, obj):
+        """Indexes an object that was moved into the holder."""
+        if self._index is None:
+            # nothing cached yet, the next read builds it from scratch
+            return
+        for index_key in _index_keys(obj):
+            entries = self._index.setdefault(index_key, [])
+            if obj not in entries:
+                entries.append(obj)
+
+    def remove(self, obj):
+        """Removes an object that left the holder from the index."""
+        if self._index is None:
+            return
+        for index_key in _index_keys(obj):
+            entries = self._index.get(index_key)
+            if entries and obj in entries:
+                entries.remove(obj)
+                if not entries:
+                    del self._index[index_key]
+
+    def invalidate(self):
+        """Drops the index. It will be rebuilt on the next read."""
+        self._index = None
+
+    def _cache(self):
+        """Builds the index from the holder's contents if needed."""
+        if self._index is None:
+            self._index = {}
+            for obj in self.obj.contents:
+                self.add(obj)
+        return self._index
+
+
+def content_category(obj):
+    """
+    Returns the group an object is listed in when a room is looked at, or
+    None for objects that are not listed.
+    """
+    if obj.destination:
+        return 'exit'
+    path = obj.typeclass_path
+    if path not in _categories:
+        _categories[path] = None
+        for category, typeclasses in CONTENT_CATEGORIES:
+            if any(inherits_from(obj, typeclass) for typeclass in typeclasses):
+                _categories[path] = category
+                break
+    return _categories[path]
+
+
+def _index_keys(obj):
+    """Returns the (category, key) pairs an object is indexed under."""
+    keys = [('content', content_category(obj))]
+    index_keys = getattr(obj, 'index_keys', None)
+    return keys + index_keys() if callable(index_keys) else keys
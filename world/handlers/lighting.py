@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Lighting Module.
+
+A room's light level is its ambient light plus the light of every lit
+source in it, including lanterns carried by the characters in the room and
+torches inside their packs. Rather than scanning a room's contents whenever
+someone looks or a map is drawn, every object keeps a running total of the
+light coming from inside it in its `carried_light` Attribute, the same way
+world.handlers.encumbrance keeps carried mass. Unlike mass, the totals are
+kept all the way up to and including the room, but not past it.
+
+A lit source remembers the light it gives off in its `emitted_light`
+Attribute. The totals are updated with light deltas when a source is lit or
+darkened (also when it runs out of fuel, which darkens it), when its
+`light` trait changes while lit, and from the move hooks (`at_object_receive`
+and `at_object_leave` on Character, Item and Room). Objects that give off no
+light cost nothing to move.
+
+Ambient light comes from the room's own `light` trait if it has one,
+otherwise from AMBIENT_LIGHT for outdoor and indoor rooms (read from the
+room's snapshot, see world.handlers.room_snapshot).
+
+Config Properties:
+    AMBIENT_LIGHT (dict): default ambient light, keyed by 'outdoor room'
+
+Module Functions:
+    - own_light(obj)
+        Light the object itself gives off.
+    - carried_light(obj)
+        Cached total light of the lit sources inside the object.
+    - total_light(obj)
+        own_light + carried_light.
+    - light_level(room)
+        Ambient light of a room plus everything lit inside it.
+    - apply_delta(container, delta)
+        Adds a light change to a container and every container above it.
+    - set_emitted(source, amount)
+        Changes the light a source gives off, ex. when lit or darkened.
+    - recalculate(obj)
+        Rebuilds the totals of obj and everything inside it from scratch.
+"""
+
+from evennia import utils as utils
+from world.handlers import room_snapshot
+
+ROOM_TYPECLASS = 'evennia.objects.objects.DefaultRoom'
+AMBIENT_LIGHT = {True: 100, False: 0}
+
+
+def own_light(obj):
+    """Returns the light the object itself gives off, 0 if it is not lit."""
+    return obj.attributes.get('emitted_light', default=0)
+
+
+def carried_light(obj):
+    """Returns the cached total light of the lit sources inside obj."""
+    return obj.attributes.get('carried_light', default=0)
+
+
+def total_light(obj):
+    """Returns the light coming from the object and everything inside it."""
+    return own_light(obj) + carried_light(obj)
+
+
+def ambient_light(room):
+    """Returns the light a room has without any light sources."""
+    traits = getattr(room, 'traits', None)
+    light = traits.get('light') if traits is not None else None
+    if light is not None:
+        return light.actual
+    return AMBIENT_LIGHT[bool(room_snapshot.snapshot(room)['outdoor'])]
+
+
+def light_level(room):
+    """Returns the light level of a room. Reads two cached values."""
+    return ambient_light(room) + carried_light(room)
+
+
+def apply_delta(container, delta):
+    """Adds a change in carried light to a container and all above it."""
+    if not delta:
+        return
+    obj = container
+    while obj is not None:
+        _store(obj, carried_light(obj) + delta)
+        if utils.inherits_from(obj, ROOM_TYPECLASS):
+            # rooms inside buildings do not light the room outside
+            break
+        obj = obj.location
+
+
+def set_emitted(source, amount):
+    """
+    Sets the light a source gives off and passes the change on to whatever
+    holds it. Use 0 for a source that is not lit.
+    """
+    delta = amount - own_light(source)
+    if not delta:
+        return
+    if amount:
+        source.attributes.add('emitted_light', amount)
+    else:
+        source.attributes.remove('emitted_light')
+    apply_delta(source.location, delta)
+
+
+def recalculate(obj):
+    """
+    Rebuilds the carried light of an object and everything inside it from
+    scratch, ex. for rooms that had lit sources before totals were kept.
+    Returns:
+        (float): the total light of the object, including its contents
+    """
+    carried = sum(recalculate(content) for content in obj.contents
+                  if not content.destination)
+    _store(obj, carried)
+    return own_light(obj) + carried
+
+
+def _store(obj, carried):
+    """Saves a carried light total."""
+    # avoid float drift below zero when every source has gone out
+    carried = max(carried, 0)
+    if carried:
+        obj.attributes.add('carried_light', carried)
+    else:
+        obj.attributes.remove('carried_light')
@@ -26,12 +26,49 @@ rooms.
 Color is used to establish the relative elevation of a room the character can
 perceive in relation to where they are standing.
 
+Rooms that are in the spatial index are drawn from their zone's atlas (see
+world.handlers.map_atlas): the map is a slice of the atlas around the
+character's coordinates, with no database reads, showing the rooms that can
+be reached through exits. Rooms without a zone, and neighbourhoods where two
+rooms share the same coordinates, fall back to the worm.
+
+The worm does a breadth-first search out from the character's room, one ring
+of rooms at a time. The exits of a whole ring are loaded with one query, the
+symbols, elevations and outdoor flags of its rooms come from their snapshots
+(world.handlers.room_snapshot), each room is visited once, and whether a grid
+position can show a room is looked up in the mask of the map's shape. The
+time each map took to draw is kept in `render_time`. Writing every map to a
+log would cost more than drawing some of them, so the times are gathered in
+memory and only their median and slowest are logged to map_timing.log, once
+every TIMING_SAMPLE maps. Set TIMING_SAMPLE to 0 to log nothing.
+
+How far a character can see is the map radius, in rooms (`map_radius`). It
+starts at DEFAULT_RADIUS and goes up with perception and flying, and down in
+bad weather, in the dark, and to nothing when blinded. Every radius has its
+own diamond-shaped map: a template grid to draw on and a mask of the grid
+positions that can hold a room, made once per radius by `map_shape`. Every
+template is drawn in the style of the hand-drawn BASE_MAP_GRID, which is
+exactly the template made for DEFAULT_RADIUS.
+
+Characters remember what they have seen (world.handlers.fog_of_war). When
+sight is shorter than MEMORY_RADIUS and the character has explored rooms
+further out, the map frame grows to take in the furthest of them (no more
+than MEMORY_RADIUS, see `frame_radius`), and rooms out of sight are drawn if
+explored, by ANDing the explored bits with the part of the map out of
+sight. A character who has explored nothing around them gets a map no
+bigger than their sight. The rooms in sight are kept in `seen`, for the
+caller to mark as explored.
+
 """
+import time
+import numpy as np
 from evennia import create_object
 from evennia import DefaultObject
+from evennia.objects.models import ObjectDB
 from evennia.utils.logger import log_file
 from statistics import median
 from evennia import EvForm, EvTable
+from world.handlers import lighting, map_atlas, room_snapshot, spatial_index
 
 BASE_MAP_GRID = """\
 █████████████████████
@@ -56,13 +93,151 @@ BASE_MAP_GRID = """\
 ██████████ ██████████
 █████████████████████
 """
-MAPPABLE_ROOM_COORDS = \
-[[10,10],[8,10],[6,10],[4,10], [2,10], [0,10], [12,10], [14,10], [16,10], \
-[18,10],[20,10], [10,8],[10,6],[10,4],[10,2],[10,0],[10,12],[10,14],[10,16], \
-[10,18],[10,20],[8,2],[12,2],[6,4],[8,4],[12,4],[14,4],[4,6],[6,6],[8,6],[12,6], \
-[14,6],[16,6],[2,8],[4,8],[6,8],[8,8],[12,8],[14,8],[16,8],[18,8], [8,18], \
-[12,18],[6,16],[8,16],[12,16],[14,16],[4,14],[6,14],[8,14],[12,14], \
-[14,14],[16,14],[2,12],[4,12],[6,12],[8,12],[12,12],[14,12],[16,12],[18,12]]
+DEFAULT_RADIUS = 5
+# furthest out that explored rooms are drawn from memory when out of sight
+MEMORY_RADIUS = DEFAULT_RADIUS
+MIN_RADIUS = 0
+MAX_RADIUS = 8
+# perception above or below the average of 100 per extra or lost room
+PERCEPTION_STEP = 20
+FLYING_BONUS = 2
+# room status effects that shorten how far one can see
+WEATHER_MODIFIERS = {'fog': -3, 'storm': -2, 'snow': -2, 'rain': -1}
+# light levels (world.handlers.lighting) below which sight is cut short
+LIGHT_MODIFIERS = ((1, -3), (50, -1))
+# maps drawn per line logged to map_timing.log, 0 to not log
+TIMING_SAMPLE = 100
+
+# radius -> (template rows, mask), see map_shape
+_shapes = {}
+# render times of the maps drawn since the last line in map_timing.log
+_render_times = []
+
+
+def map_shape(radius):
+    """
+    Returns the shape of a map that shows rooms up to `radius` away: the
+    template rows to draw on, and a boolean mask that is True at the grid
+    positions that can hold a room. Made once per radius.
+    """
+    if radius not in _shapes:
+        size = 4 * radius + 1
+        offsets = np.abs(np.arange(size) - 2 * radius)
+        rows, cols = np.meshgrid(offsets, offsets, indexing='ij')
+        distance = rows + cols
+        mask = (rows % 2 == 0) & (cols % 2 == 0) & (distance <= 2 * radius)
+        # as in BASE_MAP_GRID, the rows between two rings of rooms are as
+        # wide open as the ring further out, and the border stays solid
+        inside = (rows + rows % 2 + cols <= 2 * radius) & \
+            (rows < 2 * radius) & (cols < 2 * radius)
+        chars = np.where(inside, ' ', '█')
+        chars[(rows % 2 == 1) & (cols % 2 == 1)
+              & (distance <= 2 * radius - 2)] = '·'
+        chars[2 * radius, 2 * radius] = '@'
+        template = tuple(''.join(row) for row in chars)
+        _shapes[radius] = (template, mask)
+    return _shapes[radius]
+
+
+def frame_radius(character, radius):
+    """
+    Returns the radius of the map frame for a character who can see
+    `radius` rooms away: the distance of the furthest room they have
+    explored around them, up to MEMORY_RADIUS, if that is further.
+    """
+    fog = getattr(character, 'fog', None)
+    if fog is None or radius >= MEMORY_RADIUS:
+        return radius
+    pos = spatial_index.position(character.location)
+    if pos is None:
+        return radius
+    explored = fog.window(*pos, MEMORY_RADIUS)
+    offsets = np.abs(np.arange(2 * MEMORY_RADIUS + 1) - MEMORY_RADIUS)
+    steps = np.add.outer(offsets, offsets)[explored]
+    if not len(steps):
+        return radius
+    return max(radius, min(int(steps.max()), MEMORY_RADIUS))
+
+
+def remember_seen(character, seen):
+    """
+    Marks the rooms in sight on a map as explored by the character. `seen`
+    is Map.seen, which is None for maps drawn by the worm.
+    """
+    fog = getattr(character, 'fog', None)
+    if fog is not None and seen is not None:
+        fog.explore(*seen)
+
+
+def log_render_time(render_time):
+    """
+    Adds a map's render time to the sample, logging the sample to
+    map_timing.log once it holds TIMING_SAMPLE times.
+    """
+    if not TIMING_SAMPLE:
+        return
+    _render_times.append(render_time)
+    if len(_render_times) >= TIMING_SAMPLE:
+        log_file(f"{len(_render_times)} maps: median "
+                 f"{median(_render_times) * 1000:.2f} ms, slowest "
+                 f"{max(_render_times) * 1000:.2f} ms",
+                 filename='map_timing.log')
+        del _render_times[:]
+
+
+def map_radius(character):
+    """
+    Returns how many rooms away a character can see on their map, from
+    their perception, whether they are flying or blinded, and the weather
+    and light of the room they are in.
+    """
+    status_effects = getattr(character, 'status_effects', None)
+    effects = status_effects.all if status_effects is not None else []
+    if 'blinded' in effects:
+        return MIN_RADIUS
+    radius = DEFAULT_RADIUS
+    traits = getattr(character, 'traits', None)
+    perception = traits.get('Per') if traits is not None else None
+    if perception is not None:
+        radius += int((perception.actual - 100) / PERCEPTION_STEP)
+    if 'flying' in effects:
+        radius += FLYING_BONUS
+    room = character.location
+    room_effects = getattr(room, 'status_effects', None)
+    for effect in (room_effects.all if room_effects is not None else []):
+        radius += WEATHER_MODIFIERS.get(effect, 0)
+    light = lighting.light_level(room)
+    for level, modifier in LIGHT_MODIFIERS:
+        if light < level:
+            radius += modifier
+            break
+    return max(MIN_RADIUS, min(radius, MAX_RADIUS))
+
+
+# grid offsets for each direction the worm follows. NOTE: X and Y are the
+# opposite of how you would think of the map coordinates because they index
+# rows and columns of the grid, not X and Y on the map.
+DIRECTION_OFFSETS = {
+    'east': (0, 2),
+    'west': (0, -2),
+    'north': (-2, 0),
+    'south': (2, 0),
+    'northeast': (-2, 2),
+    'southeast': (2, 2),
+    'northwest': (-2, -2),
+    'southwest': (2, -2),
+}
+# connector drawn between a room and its neighbour, with its grid offset
+EXIT_CONNECTORS = {
+    'east': ('horizontal', 0, 1),
+    'west': ('horizontal', 0, -1),
+    'north': ('vertical', -1, 0),
+    'south': ('vertical', 1, 0),
+    'northeast': ('nesw', -1, 1),
+    'southwest': ('nesw', 1, -1),
+    'northwest': ('nwse', -1, -1),
+    'southeast': ('nwse', 1, 1),
+}
 
 # the symbol is identified with a key "sector_type" on the
 # Room. Keys None and "you" must always exist.
@@ -76,12 +251,17 @@ SYMBOLS = { None : ' . ', # unknown type, outdoors
 
 class Map(object):
 
-    def __init__(self, caller, max_width=21, max_length=21):
-        log_file("Starting __init__ func", filename='map_debug.log')
+    def __init__(self, caller, radius=None, frame=None):
+        started = time.perf_counter()
         self.caller = caller
         self.caller_location = caller.location
-        self.max_width = max_width
-        self.max_length = max_length
+        self.radius = map_radius(caller) if radius is None else radius
+        self.frame_radius = frame_radius(caller, self.radius) \
+            if frame is None else frame
+        # (zone, x, y, cells) of the rooms in sight, see draw_from_atlas
+        self.seen = None
+        self.template, self.mask = map_shape(self.frame_radius)
+        self.max_width = self.max_length = 4 * self.frame_radius + 1
         self.worm_has_mapped = {}
         self.worm_has_mapped_room_ids = []
         self.curX = None
@@ -89,119 +269,155 @@ class Map(object):
 
         # we actually have to store the grid into a variable
         self.grid = self.create_grid()
-        self.draw_room_on_map(caller.location,
-                             ((min(max_width, max_length) -1 ) / 2))
+        if not self.draw_from_atlas(caller.location):
+            self.draw_rooms_on_map(caller.location, self.radius)
         self.caller.ndb.nearby_rooms = self.worm_has_mapped_room_ids
+        self.render_time = time.perf_counter() - started
+        log_render_time(self.render_time)
 
-    def update_pos(self, room, exit_name):
-        # this ensures the pointer variables always
-        # stays up to date to where the worm is currently at.
-        self.curX, self.curY = \
-           self.worm_has_mapped[room][0], self.worm_has_mapped[room][1]
-
-        # now we have to actually move the pointer
-        # variables depending on which 'exit' it found
-        ## NOTE: The X and Y are the opposite of how you would think of the map
-        ## coordinates because we're referencing indexes within a list, not an
-        ## X Y on the map
-        if exit_name == 'east':
-            self.curY += 2
-        elif exit_name == 'west':
-            self.curY -= 2
-        elif exit_name == 'north':
-            self.curX -= 2
-        elif exit_name == 'south':
-            self.curX += 2
-        elif exit_name == 'northeast':
-            self.curX -= 2
-            self.curY += 2
-        elif exit_name == 'southeast':
-            self.curX += 2
-            self.curY += 2
-        elif exit_name == 'northwest':
-            self.curX -= 2
-            self.curY -= 2
-        elif exit_name == 'southwest':
-            self.curX += 2
-            self.curY -= 2
-
-    def draw_room_on_map(self, room, max_distance):
-        self.draw(room)
-
-        if max_distance == 0:
-            return
-
-        for exit in room.exits:
-            if exit.name not in ("north", "east", "west", "south", "northeast", \
-                                 "northwest", "southeast", "southwest"):
-                # we only map in the cardinal directions. Mapping up/down would be
-                # an interesting learning project for someone who wanted to try it.
-                continue
-            if self.has_drawn(exit.destination):
-                # we've been to the destination already, skip ahead.
+    def draw_from_atlas(self, start):
+        """
+        Draws the rooms around the start room from its zone's atlas.
+        Returns:
+            (bool): False if the start room is not in the spatial index, or
+                a room that can be reached shares its cell with another
+        """
+        pos = spatial_index.position(start)
+        if pos is None or spatial_index.room_ids_at(*pos) != [start.id]:
+            return False
+        zone, x, y = pos
+        radius = self.frame_radius
+        symbols, elev, exits, room_ids = map_atlas.window(zone, x, y, radius)
+        reached = map_atlas.connected(symbols, exits)
+        for i, j in zip(*np.nonzero(reached)):
+            if len(spatial_index.room_ids_at(zone, x + int(i) - radius,
+                                             y + int(j) - radius)) > 1:
+                # the atlas holds one room per cell, let the worm sort it out
+                return False
+        symbols = np.where(reached, symbols, 0)
+        # steps east-west plus steps north-south from the start room
+        offsets = np.abs(np.arange(2 * radius + 1) - radius)
+        steps = np.add.outer(offsets, offsets)
+        in_sight = steps <= self.radius
+        shown = in_sight
+        self.seen = (zone, x, y, in_sight & (symbols > 0))
+        fog = getattr(self.caller, 'fog', None)
+        if fog is not None and radius > self.radius:
+            # out of sight, show the rooms on the map explored before
+            explored = fog.window(zone, x, y, radius)
+            shown = in_sight | (explored & (steps <= radius))
+        symbols = np.where(shown, symbols, 0)
+        glyphs = map_atlas.glyphs(symbols, elev,
+                                  room_snapshot.snapshot(start)['elev'])
+        self.start_loc_on_grid()
+        centerX, centerY = self.curX, self.curY
+        self.worm_has_mapped_room_ids.append(start.id)
+        for i, j in zip(*np.nonzero(symbols)):
+            # slice rows are X (east), columns are Y (north); grid rows run
+            # south and grid columns run east
+            self.curX = centerX - 2 * (int(j) - radius)
+            self.curY = centerY + 2 * (int(i) - radius)
+            if (self.curX, self.curY) == (centerX, centerY) or \
+                    not self.mask[self.curX, self.curY]:
                 continue
-
-            self.update_pos(room, exit.name.lower())
-            self.draw_room_on_map(exit.destination, max_distance - 1)
-
-
-    def draw(self, room):
-        # draw initial caller location on map first!
-        if room == self.caller.location:
-            self.start_loc_on_grid()
-            self.worm_has_mapped[room] = [self.curX, self.curY]
-            self.worm_has_mapped_room_ids.append(self.caller.location.id)
+            for direction, bit in map_atlas.EXIT_BITS.items():
+                if exits[i, j] & bit:
+                    connector = EXIT_CONNECTORS[direction]
+                    self.draw_exit(connector[0], self.curX + connector[1],
+                                   self.curY + connector[2])
+            self.grid[self.curX][self.curY] = glyphs[i, j]
+            self.worm_has_mapped[int(room_ids[i, j])] = [self.curX, self.curY]
+            self.worm_has_mapped_room_ids.append(int(room_ids[i, j]))
+        return True
+
+    def draw_rooms_on_map(self, start, max_distance):
+        """
+        Breadth-first search out from the start room, at most max_distance
+        exits away. Each room is drawn once, at the position of the shortest
+        path to it.
+        """
+        self.start_loc_on_grid()
+        self.worm_has_mapped[start] = [self.curX, self.curY]
+        self.worm_has_mapped_room_ids.append(start.id)
+        ring = [start]
+        distance = 0
+        while ring:
+            exits = self.exits_of(ring)
+            room_snapshot.prefetch([room.id for room in ring])
+            if distance:
+                for room in ring:
+                    self.draw(room, exits.get(room.id, []))
+            if distance == max_distance:
+                break
+            next_ring = []
+            for room in ring:
+                x, y = self.worm_has_mapped[room]
+                for exit in exits.get(room.id, []):
+                    offset = DIRECTION_OFFSETS.get(exit.name)
+                    if offset is None:
+                        # we only map in the cardinal directions. Mapping
+                        # up/down would be an interesting learning project
+                        # for someone who wanted to try it.
+                        continue
+                    destination = exit.destination
+                    if self.has_drawn(destination):
+                        # we've been to the destination already, skip ahead.
+                        continue
+                    pos = [x + offset[0], y + offset[1]]
+                    if not (0 <= pos[0] < self.max_width
+                            and 0 <= pos[1] < self.max_length):
+                        # off the edge of the map
+                        continue
+                    self.worm_has_mapped[destination] = pos
+                    next_ring.append(destination)
+            ring = next_ring
+            distance += 1
+
+    def exits_of(self, rooms):
+        """
+        Loads the exits of all the rooms in one query.
+        Returns:
+            (dict): room id -> list of exits, destinations already loaded
+        """
+        exits = {}
+        query = ObjectDB.objects.filter(
+            db_location__in=rooms, db_destination__isnull=False
+            ).select_related('db_destination')
+        for exit in query:
+            exits.setdefault(exit.db_location_id, []).append(exit)
+        return exits
+
+    def draw(self, room, exits):
+        """ Draws a room other than the caller's, and its exits. """
+        self.curX, self.curY = self.worm_has_mapped[room]
+        if not self.mask[self.curX, self.curY]:
+            return
+        for exit in exits:
+            connector = EXIT_CONNECTORS.get(exit.name)
+            if connector:
+                self.draw_exit(connector[0], self.curX + connector[1],
+                               self.curY + connector[2])
+
+        # this will use the sector_type Attribute or None if not set.
+        snapshot = room_snapshot.snapshot(room)
+        if snapshot['symbol']:
+            self.worm_has_mapped_room_ids.append(room.id)
+            glyphs = room_snapshot.PALETTE[snapshot['symbol']]
+            self.grid[self.curX][self.curY] = glyphs[self.get_elev_index(room)]
         else:
-            # map all other rooms
-            self.worm_has_mapped[room] = [self.curX, self.curY]
-            # this will use the sector_type Attribute or None if not set.
-            if [self.curX, self.curY] in MAPPABLE_ROOM_COORDS:
-                for exit in room.exits:
-                    if exit.name == 'east':
-                        if [self.curX, self.curY] in MAPPABLE_ROOM_COORDS:
-                            self.draw_exit('horizontal', self.curX, self.curY + 1)
-                    elif exit.name == 'west':
-                        if [self.curX, self.curY] in MAPPABLE_ROOM_COORDS:
-                            self.draw_exit('horizontal', self.curX, self.curY - 1)
-                    elif exit.name == 'north':
-                        if [self.curX, self.curY] in MAPPABLE_ROOM_COORDS:
-                            self.draw_exit('vertical', self.curX - 1, self.curY)
-                    elif exit.name == 'south':
-                        if [self.curX, self.curY] in MAPPABLE_ROOM_COORDS:
-                            self.draw_exit('vertical', self.curX + 1, self.curY)
-                    elif exit.name == "northeast":
-                        if [self.curX, self.curY] in MAPPABLE_ROOM_COORDS:
-                            self.draw_exit('nesw', (self.curX - 1), (self.curY + 1))
-                    elif exit.name == "southwest":
-                        if [self.curX, self.curY] in MAPPABLE_ROOM_COORDS:
-                            self.draw_exit('nesw', (self.curX + 1), (self.curY - 1))
-                    elif exit.name == "northwest":
-                        if [self.curX, self.curY] in MAPPABLE_ROOM_COORDS:
-                            self.draw_exit('nwse', (self.curX - 1), (self.curY - 1))
-                    elif exit.name == "southeast":
-                        if [self.curX, self.curY] in MAPPABLE_ROOM_COORDS:
-                            self.draw_exit('nwse', (self.curX + 1), (self.curY + 1))
-
-                if room.db.map_symbol:
-                    log_file(f"Draw... Checking X: {self.curX}, Y: {self.curY}", filename='map_debug.log')
-                    self.worm_has_mapped_room_ids.append(room.id)
-
-                    if len(room.db.map_symbol) == 1:
-                        self.grid[self.curX][self.curY] = room.db.map_symbol
-                    else:
-                        self.grid[self.curX][self.curY] = room.db.map_symbol[self.get_elev_index(room)]
+            if not snapshot['outdoor']:
+                # this is an indoor room. Check to see if we have exits up or down
+                exit_names = [exit.name for exit in exits]
+                if 'up' in exit_names and 'down' in exit_names:
+                    self.grid[self.curX][self.curY] = '|w±|n'
+                elif 'up' in exit_names:
+                    self.grid[self.curX][self.curY] = '|w+|n'
+                elif 'down' in exit_names:
+                    self.grid[self.curX][self.curY] = '|w-|n'
                 else:
-                    if not room.db.info['outdoor room']:
-                        # this is an indoor room. Check to see if we have exits up or down
-                        if 'up' in room.exits and 'down' in room.exits:
-                            self.grid[self.curX][self.curY] = '|w±|n'
-                        elif 'up' in room.exits:
-                            self.grid[self.curX][self.curY] = '|w+|n'
-                        elif 'down' in room.exits:
-                            self.grid[self.curX][self.curY] = '|w-|n'
-                        else:
-                            self.grid[self.curX][self.curY] = '|W:|n'
-                    self.grid[self.curX][self.curY] = SYMBOLS[room.db.sector_type]
+                    self.grid[self.curX][self.curY] = '|W:|n'
+            sector = room_snapshot.SECTORS[snapshot['sector']]
+            self.grid[self.curX][self.curY] = SYMBOLS[sector]
 
 
     def get_elev_index(self, room):
@@ -212,7 +428,8 @@ class Map(object):
         will have the effect of showing a color gradient on the map with
         elevations relative to the observer.
         """
-        elevation_diff = room.traits.elev.current -self.caller_location.traits.elev.current
+        elevation_diff = room_snapshot.snapshot(room)['elev'] - \
+            room_snapshot.snapshot(self.caller_location)['elev']
         if elevation_diff < -125:
             return 0
         elif -125 <= elevation_diff < -25:
@@ -251,7 +468,7 @@ class Map(object):
         # x and y are floats by default, can't index lists with float types
         x, y = int(x), int(y)
 
-        if self.caller_location.db.info['outdoor room']:
+        if room_snapshot.snapshot(self.caller_location)['outdoor']:
             self.grid[x][y] = SYMBOLS['CHAR_OUTDOOR']
         else:
             self.grid[x][y] = SYMBOLS['CHAR_INDOOR']
@@ -263,16 +480,9 @@ class Map(object):
 
 
     def create_grid(self):
-        # pull in base map grid and split it so the individual positions
-        # can be called by index number
-        board = BASE_MAP_GRID.split('\n')
-        index = 0
-        for line in board:
-        	line = list(line)
-        	board[index] = line
-        	index += 1
-
-        return board
+        # copy the template of this map's shape, split so the individual
+        # positions can be called by index number
+        return [list(line) for line in self.template]
 
 
     def show_map(self):
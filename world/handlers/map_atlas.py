@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+"""
+Map Atlas Module.
+
+Drawing a minimap room by room means reading the map symbol, elevation and
+exits of every room on it for every look, although those almost never
+change. Instead, each zone keeps an atlas: 2D arrays over the zone's X, Y
+coordinates holding, for each cell,
+
+    symbols:  id of the room's glyphs in room_snapshot.PALETTE (0 = no room)
+    elev:     the room's elevation
+    exits:    bit flags of the directions the room has exits in
+    room_ids: the room's id
+
+A viewer's map is a slice of these arrays around their position. Only the
+rooms that can be reached from the viewer's room by following exits are
+drawn, found by flooding the slice along its exit bits (`connected`). The
+elevation band of every cell, relative to the viewer, is worked out for the
+whole slice at once, and the glyphs picked with one fancy-indexing lookup.
+
+An atlas is built from the spatial index (world.handlers.spatial_index) and
+the room snapshots (world.handlers.room_snapshot) the first time its zone is
+drawn and kept in memory. After that, `update_room` rewrites the one cell of
+a room whose coordinates, elevation, map symbol or exits changed, and
+`remove_room` clears it.
+
+Config Properties:
+    EXIT_BITS (dict): direction -> bit in the `exits` array
+    ELEVATION_BANDS (list): relative elevation bounds of the colour bands
+
+Module Functions:
+    - window(zone, x, y, radius)
+        Slices of the atlas arrays centred on a position.
+    - connected(symbols, exits)
+        The cells of a slice reachable from its centre through exits.
+    - glyphs(symbols, elev, viewer_elev)
+        The glyph to draw in each cell of a slice.
+    - update_room(room)
+        Rewrites the cell of a room after it changed.
+    - remove_room(room)
+        Clears the cell of a room.
+    - reset()
+        Drops every atlas, to be rebuilt when next drawn.
+"""
+import numpy as np
+from evennia.objects.models import ObjectDB
+from world.handlers import room_snapshot, spatial_index
+
+EXIT_BITS = {
+    'north': 1,
+    'south': 2,
+    'east': 4,
+    'west': 8,
+    'northeast': 16,
+    'northwest': 32,
+    'southeast': 64,
+    'southwest': 128,
+}
+# a room is drawn in band i when
+# ELEVATION_BANDS[i - 1] <= elevation - viewer's elevation < ELEVATION_BANDS[i]
+ELEVATION_BANDS = [-125, -25, 25, 125]
+# glyphs for rooms without a map symbol of their own
+DEFAULT_SYMBOL = ' . '
+
+# room_snapshot.PALETTE as an object array, keyed by the palette size it
+# was built for
+_palette_cache = {}
+# zone -> ZoneAtlas
+_atlases = {}
+
+
+class ZoneAtlas(object):
+    """
+    The atlas arrays of one zone. Cell [i, j] is at coordinates
+    (x0 + i, y0 + j). The arrays grow when a room is placed outside them.
+    """
+    def __init__(self, zone, cells=()):
+        self.zone = zone
+        # size the arrays to the zone's rooms up front
+        xs = [x for x, y in cells] or [0]
+        ys = [y for x, y in cells] or [0]
+        self.x0, self.y0 = min(xs), min(ys)
+        shape = (max(xs) - self.x0 + 1, max(ys) - self.y0 + 1)
+        self.symbols = np.zeros(shape, dtype=np.int16)
+        self.elev = np.zeros(shape, dtype=np.float32)
+        self.exits = np.zeros(shape, dtype=np.uint8)
+        self.room_ids = np.zeros(shape, dtype=np.int32)
+        # room id -> (x, y), to find the old cell of a room that moved
+        self.cells = {}
+
+    def set_room(self, room_id, x, y, symbol, elev, exits):
+        """Writes a room into the cell at (x, y)."""
+        self.clear_room(room_id)
+        self._fit(x, y)
+        i, j = x - self.x0, y - self.y0
+        self.symbols[i, j] = symbol
+        self.elev[i, j] = elev
+        self.exits[i, j] = exits
+        self.room_ids[i, j] = room_id
+        self.cells[room_id] = (x, y)
+
+    def clear_room(self, room_id):
+        """Clears the cell of a room, if it has one."""
+        cell = self.cells.pop(room_id, None)
+        if cell is None:
+            return
+        i, j = cell[0] - self.x0, cell[1] - self.y0
+        if self.room_ids[i, j] == room_id:
+            self.symbols[i, j] = 0
+            self.exits[i, j] = 0
+            self.room_ids[i, j] = 0
+
+    def window(self, x, y, radius):
+        """
+        Returns (symbols, elev, exits, room_ids) for the square of cells
+        within `radius` of (x, y). Cells outside the atlas are empty.
+        Row i of each slice is X coordinate x - radius + i.
+        """
+        size = 2 * radius + 1
+        out = [np.zeros((size, size), dtype=array.dtype) for array in
+               (self.symbols, self.elev, self.exits, self.room_ids)]
+        width, height = self.symbols.shape
+        # the part of the window that overlaps the atlas
+        i1, j1 = max(x - radius - self.x0, 0), max(y - radius - self.y0, 0)
+        i2 = min(x + radius - self.x0 + 1, width)
+        j2 = min(y + radius - self.y0 + 1, height)
+        if i1 < i2 and j1 < j2:
+            oi, oj = i1 - (x - radius - self.x0), j1 - (y - radius - self.y0)
+            for target, source in zip(out, (self.symbols, self.elev,
+                                            self.exits, self.room_ids)):
+                target[oi:oi + i2 - i1, oj:oj + j2 - j1] = source[i1:i2, j1:j2]
+        return tuple(out)
+
+    def _fit(self, x, y):
+        """Grows the arrays so that (x, y) is inside them."""
+        width, height = self.symbols.shape
+        pad_x = (max(self.x0 - x, 0), max(x - self.x0 - width + 1, 0))
+        pad_y = (max(self.y0 - y, 0), max(y - self.y0 - height + 1, 0))
+        if any(pad_x) or any(pad_y):
+            self.symbols = np.pad(self.symbols, (pad_x, pad_y))
+            self.elev = np.pad(self.elev, (pad_x, pad_y))
+            self.exits = np.pad(self.exits, (pad_x, pad_y))
+            self.room_ids = np.pad(self.room_ids, (pad_x, pad_y))
+            self.x0 -= pad_x[0]
+            self.y0 -= pad_y[0]
+
+
+def atlas(zone):
+    """Returns the atlas of a zone, building it on first use."""
+    zone = spatial_index.zone_key(zone)
+    if zone not in _atlases:
+        cells = spatial_index.zone_cells(zone)
+        zone_atlas = ZoneAtlas(zone, cells)
+        ids = [room_id for room_ids in cells.values() for room_id in room_ids]
+        exits = _exit_bits(ids) if ids else {}
+        room_snapshot.prefetch(ids)
+        for room_id in ids:
+            record = room_snapshot.record(room_id)
+            if record is not None:
+                _write(zone_atlas, room_id, record, exits.get(room_id, 0))
+        _atlases[zone] = zone_atlas
+    return _atlases[zone]
+
+
+def window(zone, x, y, radius):
+    """Returns the atlas slices of a zone centred on (x, y)."""
+    return atlas(zone).window(x, y, radius)
+
+
+def connected(symbols, exits):
+    """
+    Returns the cells of a slice that can be reached from its centre by
+    following exits, each exit leading to the next cell in its direction.
+    """
+    centre = symbols.shape[0] // 2
+    rooms = symbols > 0
+    rooms[centre, centre] = True
+    reached = np.zeros(symbols.shape, dtype=bool)
+    reached[centre, centre] = True
+    while True:
+        grown = reached.copy()
+        for direction, bit in EXIT_BITS.items():
+            dx, dy = spatial_index.NEIGHBOUR_OFFSETS[direction]
+            grown |= _shift(reached & (exits & bit > 0), dx, dy)
+        grown &= rooms
+        if (grown == reached).all():
+            return reached
+        reached = grown
+
+
+def glyphs(symbols, elev, viewer_elev):
+    """
+    Picks the glyph for every cell of a slice, coloured by the elevation of
+    each room relative to the viewer.
+    Returns:
+        (numpy.ndarray): array of glyph strings, '' where there is no room
+    """
+    bands = np.digitize(elev - viewer_elev, ELEVATION_BANDS)
+    size = len(room_snapshot.PALETTE)
+    palette = _palette_cache.get(size)
+    if palette is None:
+        _palette_cache.clear()
+        palette = _palette_cache[size] = _build_palette_array()
+    return palette[symbols, bands]
+
+
+def update_room(room, removed_exit=None):
+    """
+    Rewrites the cell of a room after its coordinates, elevation, map symbol
+    or exits changed. Zones that have not been drawn yet are left alone.
+    Args:
+        room (Room): the room that changed
+        removed_exit (Exit, optional): an exit of the room that is being
+            deleted, and should no longer be drawn
+    """
+    for zone_atlas in _atlases.values():
+        if room.id in zone_atlas.cells:
+            zone_atlas.clear_room(room.id)
+    pos = spatial_index.position(room)
+    if pos is None or pos[0] not in _atlases:
+        return
+    exits = _exit_bits([room.id], removed_exit)
+    _write(_atlases[pos[0]], room.id, room_snapshot.snapshot(room),
+           exits.get(room.id, 0))
+
+
+def remove_room(room):
+    """Clears the cell of a room, ex. before it is deleted."""
+    for zone_atlas in _atlases.values():
+        zone_atlas.clear_room(room.id)
+
+
+def reset():
+    """Drops every atlas, ex. after the spatial index was rebuilt."""
+    _atlases.clear()
+
+
+def _write(zone_atlas, room_id, record, exits):
+    """Writes a room's snapshot and exits into its zone's atlas."""
+    if not record['placed']:
+        return
+    symbol = record['symbol'] or room_snapshot.symbol_id(DEFAULT_SYMBOL)
+    zone_atlas.set_room(room_id, int(record['x']), int(record['y']), symbol,
+                        record['elev'], exits)
+
+
+def _shift(cells, dx, dy):
+    """Moves every cell of a boolean slice dx rows and dy columns."""
+    out = np.zeros_like(cells)
+    width, height = cells.shape
+    out[max(dx, 0):width + min(dx, 0), max(dy, 0):height + min(dy, 0)] = \
+        cells[max(-dx, 0):width - max(dx, 0), max(-dy, 0):height - max(dy, 0)]
+    return out
+
+
+def _build_palette_array():
+    """The palette as an object array, for picking glyphs by (symbol, band)."""
+    palette = np.empty((len(room_snapshot.PALETTE), 5), dtype=object)
+    for symbol_id, glyph_set in enumerate(room_snapshot.PALETTE):
+        palette[symbol_id, :] = glyph_set
+    return palette
+
+
+def _exit_bits(room_ids, removed_exit=None):
+    """Returns room id -> exit direction bits, from one query of exits."""
+    bits = {}
+    query = ObjectDB.objects.filter(
+        db_location_id__in=room_ids, db_destination__isnull=False)
+    if removed_exit is not None:
+        query = query.exclude(id=removed_exit.id)
+    query = query.values_list('db_location_id', 'db_key')
+    for room_id, key in query:
+        bits[room_id] = bits.get(room_id, 0) | EXIT_BITS.get(key, 0)
+    return bits
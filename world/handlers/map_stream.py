@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Map Stream Module.
+
+Every look re-sends the overhead map to the client as ANSI text, although
+most of it is the same from one step to the next. Webclient sessions can
+ask for the map as tile data over OOB instead (see the `minimap` input
+function in server/conf/inputfuncs.py and the webclient plugin in
+web/static_overrides/webclient/js/plugins/minimap.js). For those sessions,
+the room form is rendered without the map, and the map grid is sent as an
+OOB `minimap` message:
+
+    first frame, or after the map changed size:
+        minimap [] {"full": true, "rows": [[tile, tile, ...], ...]}
+    every frame after that, only the tiles that changed:
+        minimap [] {"full": false, "tiles": [[row, col, tile], ...]}
+
+Tiles are HTML, converted from the Evennia colour codes of the map glyphs
+once per glyph. The client keeps the grid and patches it with each delta.
+The last grid sent to a session is kept on the session, so a step that
+changes nothing on the map sends nothing at all.
+
+Module Functions:
+    - subscribe(session, enabled)
+        Starts or stops streaming the map to a session.
+    - subscribed(looker)
+        Whether every session of the looker gets the map over OOB.
+    - send(looker, grid)
+        Sends what changed on a map grid to the looker's subscribed sessions.
+"""
+from evennia.utils.text2html import parse_html
+
+OOB_CMD = 'minimap'
+
+# map glyph -> HTML tile
+_tiles = {}
+
+
+def subscribe(session, enabled=True):
+    """
+    Starts or stops streaming the minimap to a session. Starting sends a
+    full frame of the map of the puppet's room right away.
+    """
+    session.ndb.minimap = bool(enabled)
+    session.ndb.minimap_grid = None
+    puppet = session.puppet
+    if enabled and puppet and puppet.location:
+        from world.handlers.map import Map, remember_seen
+        overhead_map = Map(puppet)
+        remember_seen(puppet, overhead_map.seen)
+        send(puppet, overhead_map.grid)
+
+
+def subscribed(looker):
+    """Returns True if every session of the looker is streamed the map."""
+    sessions = looker.sessions.all()
+    return bool(sessions) and all(session.ndb.minimap for session in sessions)
+
+
+def send(looker, grid):
+    """
+    Sends the tiles of a map grid that changed since the last frame to each
+    of the looker's sessions that are streamed the map.
+    Args:
+        looker (Character): the character the map was drawn for
+        grid (list): rows of map glyphs, as Map.grid
+    """
+    grid = tuple(tuple(row) for row in grid)
+    for session in looker.sessions.all():
+        if not session.ndb.minimap:
+            continue
+        last = session.ndb.minimap_grid
+        if last is None or len(last) != len(grid) or \
+                len(last[0]) != len(grid[0]):
+            frame = {'full': True,
+                     'rows': [[_tile(glyph) for glyph in row]
+                              for row in grid]}
+        else:
+            changed = [[i, j, _tile(glyph)]
+                       for i, (row, last_row) in enumerate(zip(grid, last))
+                       if row != last_row
+                       for j, glyph in enumerate(row)
+                       if glyph != last_row[j]]
+            if not changed:
+                continue
+            frame = {'full': False, 'tiles': changed}
+        session.ndb.minimap_grid = grid
+        session.msg(**{OOB_CMD: ((), frame)})
+
+
+def _tile(glyph):
+    """Returns the HTML of a map glyph."""
+    if glyph not in _tiles:
+        _tiles[glyph] = parse_html(glyph)
+    return _tiles[glyph]
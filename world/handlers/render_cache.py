@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+Room Render Cache Module.
+
+Rendering a room for `look` draws the overhead map, sorts every object in
+the room into mobiles, items, entrances and roads and fills in the room
+form. Most looks, including the automatic look after every move, see
+exactly what the last look saw, so the rendered output is cached and reused
+until something it shows has changed.
+
+A render is reused while all of these match the ones it was made with:
+    - the room's content version, bumped when anything but a mobile enters
+      or leaves the room, when one of its traits changes, or when something
+      in it changes the way it is named (ex. the size of a stack). Mobiles
+      are not part of a render: they are listed as it is served, so a
+      character walking in does not outdate the render of the room they
+      look at on arrival
+    - the map versions of the part of the zone the render's map covers.
+      Each zone is split into square regions of REGION_SIZE by REGION_SIZE
+      cells, each with its own map version. A room's region is bumped when
+      its coordinates, elevation, map symbol or exits change, so a change
+      only outdates the renders whose maps reach that region. Maps drawn by
+      the worm rather than from the atlas (see world.handlers.map) can show
+      rooms from anywhere, so they depend on the global map version instead,
+      which is bumped by every change
+    - the room's description
+    - the perspective of the viewer: builders see more than players, and
+      how far the viewer can see, how far their map reaches, what they
+      remember when it reaches further than they see, and whether their map
+      is streamed over OOB set the map that is drawn (the `variant` of a
+      render)
+
+A render is not made for one viewer: every viewer with the same
+perspective shares it, so a crowded room is rendered once rather than once
+per viewer. The room's mobiles, less the viewer, are added when the render
+is served (see Room.compose_appearance).
+
+Cache hits and misses are counted in `stats`. `check_move_reuse` walks a
+character out of a room and back in and reports whether the look on
+arrival was served from the cache.
+
+Versions and renders are kept in memory only; nothing about a render is
+worth saving to the database. Renders live in one LRU cache of at most
+MAX_RENDERS entries, so the memory used does not grow with the number of
+rooms or viewers. A content version is drawn from one global counter, so a
+room that was flushed from memory and comes back never reuses a render made
+before.
+
+Config Properties:
+    MAX_RENDERS (int): most renders kept before the least recently used
+        ones are dropped
+    REGION_SIZE (int): width of the square map regions, in cells
+
+Module Functions:
+    - bump_content(room)
+        Marks what is in a room as changed.
+    - bump_map(position)
+        Marks the map as changed around a position.
+    - get(room, looker, variant)
+        Cached render of the room for the looker, or None.
+    - store(room, looker, render, variant, reach)
+        Caches a render of the room for the looker.
+    - clear()
+        Drops every cached render.
+    - check_move_reuse(character, destination)
+        Whether the look after walking into a room is served from the cache.
+"""
+from collections import OrderedDict
+from itertools import count
+from evennia.utils.logger import log_file
+from world.handlers import spatial_index
+
+MAX_RENDERS = 2000
+REGION_SIZE = 16
+
+_versions = count(1)
+_map_version = 0
+# (zone, region x, region y) -> map version of the region
+_region_versions = {}
+_renders = OrderedDict()
+# renders served from the cache and made anew, since the server started
+stats = {'hits': 0, 'misses': 0}
+
+
+def bump_content(room):
+    """Marks the contents of a room as changed."""
+    room.ndb.content_version = next(_versions)
+
+
+def bump_map(position=None):
+    """
+    Marks the map as changed around a position, (zone, x, y) as given by
+    spatial_index.position. Maps drawn by the worm are outdated by every
+    change, with or without a position.
+    """
+    global _map_version
+    _map_version = next(_versions)
+    if position is not None:
+        zone, x, y = position
+        _region_versions[(zone, x // REGION_SIZE, y // REGION_SIZE)] = \
+            next(_versions)
+
+
+def content_version(room):
+    """Returns the current content version of a room."""
+    if room.ndb.content_version is None:
+        bump_content(room)
+    return room.ndb.content_version
+
+
+def perspective(room, looker, variant=None):
+    """Returns what about the looker changes how the room looks to them."""
+    builder = looker.locks.check_lockstring(looker, "perm(Builder)")
+    return (builder, variant)
+
+
+def get(room, looker, variant=None):
+    """
+    Returns the cached render of the room for the looker, or None if there
+    is none or it is out of date.
+    Args:
+        variant (hashable, optional): anything else the render depends on
+    """
+    key = (room.id, perspective(room, looker, variant))
+    entry = _renders.get(key)
+    if entry is None:
+        stats['misses'] += 1
+        return None
+    state, regions, map_state, render = entry
+    if state != _state(room) or map_state != _map_state(regions):
+        del _renders[key]
+        stats['misses'] += 1
+        return None
+    _renders.move_to_end(key)
+    stats['hits'] += 1
+    return render
+
+
+def store(room, looker, render, variant=None, reach=None):
+    """
+    Caches a render of the room for the looker.
+    Args:
+        reach (int, optional): how many cells from the room the render's
+            map reaches, if it was drawn from the atlas. Renders without a
+            reach are outdated by any change to the map.
+    """
+    key = (room.id, perspective(room, looker, variant))
+    regions = _regions(room, reach)
+    _renders[key] = (_state(room), regions, _map_state(regions), render)
+    _renders.move_to_end(key)
+    while len(_renders) > MAX_RENDERS:
+        _renders.popitem(last=False)
+
+
+def clear():
+    """Drops every cached render."""
+    _renders.clear()
+
+
+def check_move_reuse(character, destination):
+    """
+    Checks that the automatic look after a move reuses the cached render.
+    Walks the character into the destination, back out, and in again, and
+    reports whether the look on that last arrival was a cache hit. Meant to
+    be run from @py by an admin.
+    Returns:
+        (bool): True if the look on arrival was served from the cache
+    """
+    origin = character.location
+    character.move_to(destination, quiet=True)
+    character.move_to(origin, quiet=True)
+    hits = stats['hits']
+    character.move_to(destination, quiet=True)
+    reused = stats['hits'] > hits
+    log_file(f"Look on arrival at #{destination.id} by {character.key}: "
+             f"{'cached' if reused else 'rendered'}.",
+             filename='render_cache.log')
+    return reused
+
+
+def _state(room):
+    """Everything a render depends on besides the viewer and the map."""
+    return (content_version(room), room.db.desc)
+
+
+def _regions(room, reach):
+    """
+    Returns the map regions within `reach` cells of the room, or None if
+    the render depends on the whole map.
+    """
+    pos = spatial_index.position(room)
+    if pos is None or reach is None:
+        return None
+    zone, x, y = pos
+    xs = range((x - reach) // REGION_SIZE, (x + reach) // REGION_SIZE + 1)
+    ys = range((y - reach) // REGION_SIZE, (y + reach) // REGION_SIZE + 1)
+    return [(zone, rx, ry) for rx in xs for ry in ys]
+
+
+def _map_state(regions):
+    """Returns the map versions of some regions, or of the whole map."""
+    if regions is None:
+        return _map_version
+    return tuple(_region_versions.get(region, 0) for region in regions)
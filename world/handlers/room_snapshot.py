@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+Room Snapshot Module.
+
+Maps, the spatial index and lighting read a handful of fields from every
+room they look at: the map symbol, the elevation trait, the coordinate
+traits, the zone and whether the room is outdoors. Each of those is an
+Attribute fetch and unpickle, repeated for every room on every render. The
+fields almost never change, so they are copied into one in-memory table,
+a numpy record array with a row per room:
+
+    symbol:   id of the room's own map symbol in PALETTE (0 = none)
+    sector:   id of the room's sector_type in SECTORS (0 = None)
+    elev:     the room's elevation
+    x, y:     the room's coordinates
+    placed:   False if the room has no coordinate traits or no zone
+    zone:     id of the room's zone in ZONES
+    outdoor:  the room's 'outdoor room' info flag
+
+A room's row is filled in from its Attributes the first time it is asked
+for, and refreshed by Room.at_map_change, which is called whenever any of
+those fields change (see Room.at_trait_change, CmdDig, CoordinateWorm and
+the room building menu). Code that reads many rooms, like the map atlas,
+loads their rows with one query through `prefetch`.
+
+Zone names are kept as in spatial index Tag keys: lower case.
+
+Module Functions:
+    - snapshot(room)
+        The record of a room, loading it if needed.
+    - refresh(room)
+        Re-reads a room's fields after they changed.
+    - remove(room)
+        Drops the record of a room.
+    - prefetch(room_ids)
+        Loads the records of many rooms in one query.
+    - record(room_id)
+        The record of a room by id, if it is loaded.
+    - position(room)
+        (zone, x, y) of a room, or None.
+    - symbol_id(map_symbol)
+        The palette id of a map symbol, adding it if new.
+    - reset()
+        Drops every record, to be reloaded when next asked for.
+"""
+import numpy as np
+from evennia.objects.models import ObjectDB
+
+RECORD = np.dtype([
+    ('symbol', np.int16),
+    ('sector', np.int16),
+    ('elev', np.float32),
+    ('x', np.int32),
+    ('y', np.int32),
+    ('placed', np.bool_),
+    ('zone', np.int32),
+    ('outdoor', np.bool_),
+])
+
+# each palette entry is the 5 glyphs of a map symbol, one per elevation band
+PALETTE = [('',) * 5]
+_palette_ids = {}
+# sector_type Attribute values and zone names, by id
+SECTORS = [None]
+_sector_ids = {None: 0}
+ZONES = []
+_zone_ids = {}
+
+
+class RoomSnapshotTable(object):
+    """
+    Rows of RECORD, one per room, with a map of room id -> row. Rows of
+    removed rooms are reused, and the array doubles when full.
+    """
+    def __init__(self, capacity=1024):
+        self.records = np.zeros(capacity, dtype=RECORD)
+        self.rows = {}
+        self.free = []
+
+    def row(self, room_id):
+        """Returns the row of a room, or None if it has none."""
+        return self.rows.get(room_id)
+
+    def write(self, room_id, values):
+        """Writes a tuple of RECORD fields into the row of a room."""
+        row = self.rows.get(room_id)
+        if row is None:
+            row = self.free.pop() if self.free else len(self.rows)
+            if row >= len(self.records):
+                self.records = np.resize(self.records, 2 * len(self.records))
+            self.rows[room_id] = row
+        self.records[row] = values
+
+    def drop(self, room_id):
+        """Frees the row of a room."""
+        row = self.rows.pop(room_id, None)
+        if row is not None:
+            self.free.append(row)
+
+
+_table = RoomSnapshotTable()
+
+
+def snapshot(room):
+    """
+    Returns the record of a room, reading it from the room's Attributes the
+    first time. Fields are read by name, ex. snapshot(room)['elev'].
+    """
+    row = _table.row(room.id)
+    if row is None:
+        refresh(room)
+        row = _table.row(room.id)
+    return _table.records[row]
+
+
+def refresh(room):
+    """Re-reads the snapshot fields of a room from its Attributes."""
+    info = room.db.info or {}
+    traits = getattr(room, 'traits', None)
+    elev = xcord = ycord = None
+    if traits is not None:
+        elev = traits.get('elev')
+        xcord, ycord = traits.get('xcord'), traits.get('ycord')
+    # rooms default to 0, 0, so coordinates mean nothing without a zone
+    placed = xcord is not None and ycord is not None and \
+        info.get('zone') is not None
+    _table.write(room.id, (
+        symbol_id(room.db.map_symbol),
+        _intern(SECTORS, _sector_ids, room.db.sector_type),
+        elev.actual if elev is not None else 0,
+        int(xcord.actual) if placed else 0,
+        int(ycord.actual) if placed else 0,
+        placed,
+        _intern(ZONES, _zone_ids, zone_key(info.get('zone'))),
+        bool(info.get('outdoor room', True)),
+    ))
+
+
+def remove(room):
+    """Drops the record of a room, ex. before it is deleted."""
+    _table.drop(room.id)
+
+
+def prefetch(room_ids):
+    """Loads the records of the rooms that have none, in one query."""
+    missing = [room_id for room_id in room_ids if _table.row(room_id) is None]
+    if missing:
+        for room in ObjectDB.objects.filter(id__in=missing):
+            refresh(room)
+
+
+def record(room_id):
+    """Returns the record of a room by id, or None if it is not loaded."""
+    row = _table.row(room_id)
+    return None if row is None else _table.records[row]
+
+
+def position(room):
+    """Returns the (zone, x, y) of a room, or None if it has no coordinates."""
+    record = snapshot(room)
+    if not record['placed']:
+        return None
+    return (ZONES[record['zone']], int(record['x']), int(record['y']))
+
+
+def zone_key(zone):
+    """Zone names as they appear in spatial index Tag keys."""
+    return str(zone).lower()
+
+
+def symbol_id(map_symbol):
+    """
+    Returns the palette id of a map symbol, adding it to PALETTE if new. A
+    map symbol is one glyph, or a list of one glyph per elevation band.
+    Returns 0 for rooms without one.
+    """
+    if not map_symbol:
+        return 0
+    if isinstance(map_symbol, str):
+        glyphs = (map_symbol,) * 5
+    elif len(map_symbol) == 1:
+        glyphs = (map_symbol[0],) * 5
+    else:
+        glyphs = tuple(map_symbol[:5])
+    if glyphs not in _palette_ids:
+        _palette_ids[glyphs] = len(PALETTE)
+        PALETTE.append(glyphs)
+    return _palette_ids[glyphs]
+
+
+def reset():
+    """Drops every record, to be reloaded from the rooms when next needed."""
+    global _table
+    _table = RoomSnapshotTable()
+
+
+def _intern(names, ids, name):
+    """Returns the id of a name in a lookup list, adding it if new."""
+    if name not in ids:
+        ids[name] = len(names)
+        names.append(name)
+    return ids[name]
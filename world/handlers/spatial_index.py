@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+Spatial Index Module.
+
+Answers "which room is at (x, y) in zone Z" without searching rooms and
+comparing coordinate traits. Every room carries one Tag in the 'spatial'
+category naming its position:
+
+    "<zone>:<x>:<y>"    ex. "the outdoors:12:-3"
+
+Tag keys are lower case, so zone names are matched without regard to case.
+Rooms whose zone is None, ex. the inside of buildings, are not indexed.
+The Tags are the persistent index; a lookup by Tag key is a single indexed
+query. On top of them, each zone's positions are loaded into memory the
+first time the zone is queried, so point and neighbourhood queries after
+that take constant time and rectangle queries take time proportional to the
+area asked for.
+
+The index is kept current by:
+    - Room.at_trait_change, when `xcord` or `ycord` changes
+    - Room.at_object_creation and Room.at_object_delete
+    - CmdDig (and CmdTunnel, which digs) after placing a new room
+    - CoordinateWorm, after it moves a room to a new position or zone
+Call `update(room)` after changing a room's zone by hand. The
+`@spatialindex` command rebuilds the whole index from the rooms' traits.
+
+Config Properties:
+    NEIGHBOUR_OFFSETS (dict): direction -> (x, y) offset of the next room
+
+Module Functions:
+    - update(room)
+        Re-indexes a room at its current zone and coordinates.
+    - remove(room)
+        Takes a room out of the index.
+    - room_at(zone, x, y)
+        The room at a position, or None.
+    - neighbours(room)
+        (room id, direction) pairs for the rooms next to a room.
+    - rooms_in(zone, x1, y1, x2, y2)
+        Rooms in a rectangle of a zone.
+    - zone_cells(zone)
+        The in-memory positions of a zone: {(x, y): [room ids]}.
+    - rebuild()
+        Re-indexes every room from scratch.
+"""
+from django.db import transaction
+from evennia.objects.models import ObjectDB
+from evennia.utils.logger import log_file
+from world.handlers import room_snapshot
+from world.handlers.room_snapshot import zone_key
+
+SPATIAL_CATEGORY = 'spatial'
+NEIGHBOUR_OFFSETS = {
+    'north': (0, 1),
+    'south': (0, -1),
+    'east': (1, 0),
+    'west': (-1, 0),
+    'northeast': (1, 1),
+    'northwest': (-1, 1),
+    'southeast': (1, -1),
+    'southwest': (-1, -1),
+}
+
+# zone -> {(x, y): [room ids]}, loaded per zone on first query
+_zones = {}
+
+
+def position(room):
+    """Returns the (zone, x, y) of a room from its snapshot."""
+    return room_snapshot.position(room)
+
+
+def update(room):
+    """Re-indexes a room at its current zone and coordinates."""
+    new = position(room)
+    new_key = _tag_key(*new) if new else None
+    old_keys = room.tags.get(category=SPATIAL_CATEGORY, return_list=True)
+    if old_keys == ([new_key] if new_key else []):
+        return
+    for old_key in old_keys:
+        room.tags.remove(old_key, category=SPATIAL_CATEGORY)
+        _uncache(room.id, *_parse(old_key))
+    if new_key:
+        room.tags.add(new_key, category=SPATIAL_CATEGORY)
+        _cache(room.id, *new)
+
+
+def remove(room):
+    """Takes a room out of the index, ex. before it is deleted."""
+    for old_key in room.tags.get(category=SPATIAL_CATEGORY, return_list=True):
+        room.tags.remove(old_key, category=SPATIAL_CATEGORY)
+        _uncache(room.id, *_parse(old_key))
+
+
+def room_ids_at(zone, x, y):
+    """Returns the ids of the rooms at a position."""
+    return list(zone_cells(zone).get((int(x), int(y)), []))
+
+
+def room_at(zone, x, y):
+    """Returns the room at a position in a zone, or None."""
+    rooms = _rooms(room_ids_at(zone, x, y))
+    return rooms[0] if rooms else None
+
+
+def neighbours(room):
+    """
+    Returns the rooms next to a room in its zone.
+    Returns:
+        (list): [room id, direction] pairs, ex. [[14, 'north']]
+    """
+    pos = position(room)
+    if pos is None:
+        return []
+    zone, x, y = pos
+    cells = zone_cells(zone)
+    found = []
+    for direction, (dx, dy) in NEIGHBOUR_OFFSETS.items():
+        for room_id in cells.get((x + dx, y + dy), []):
+            if room_id != room.id:
+                found.append([room_id, direction])
+    return found
+
+
+def rooms_in(zone, x1, y1, x2, y2):
+    """Returns the rooms in the rectangle between two corners of a zone."""
+    cells = zone_cells(zone)
+    xs = range(min(x1, x2), max(x1, x2) + 1)
+    ys = range(min(y1, y2), max(y1, y2) + 1)
+    if len(xs) * len(ys) > len(cells):
+        # large area, cheaper to check the zone's rooms than every cell
+        ids = [room_id for (x, y), room_ids in cells.items()
+               if x in xs and y in ys for room_id in room_ids]
+    else:
+        ids = [room_id for x in xs for y in ys
+               for room_id in cells.get((x, y), [])]
+    return _rooms(ids)
+
+
+def rebuild():
+    """
+    Re-indexes every room from its traits, in one transaction.
+    Returns:
+        (int): number of rooms indexed
+    """
+    from typeclasses.rooms import Room
+    indexed = 0
+    with transaction.atomic():
+        _zones.clear()
+        for room in Room.objects.all_family():
+            room.tags.clear(category=SPATIAL_CATEGORY)
+            room_snapshot.refresh(room)
+            pos = position(room)
+            if pos:
+                room.tags.add(_tag_key(*pos), category=SPATIAL_CATEGORY)
+                indexed += 1
+    log_file(f"Rebuilt spatial index: {indexed} rooms.", filename='spatial.log')
+    return indexed
+
+
+def _tag_key(zone, x, y):
+    return f"{zone}:{x}:{y}"
+
+
+def _parse(tag_key):
+    """Splits a Tag key back into (zone, x, y). Zones may contain ':'."""
+    zone, x, y = tag_key.rsplit(':', 2)
+    return zone, int(x), int(y)
+
+
+def zone_cells(zone):
+    """Returns the in-memory positions of a zone, loading them if needed."""
+    zone = zone_key(zone)
+    if zone not in _zones:
+        cells = {}
+        rows = ObjectDB.objects.filter(
+            db_tags__db_category=SPATIAL_CATEGORY,
+            db_tags__db_key__startswith=f"{zone}:").values_list(
+            'id', 'db_tags__db_key')
+        for room_id, tag_key in rows:
+            tag_zone, x, y = _parse(tag_key)
+            if tag_zone == zone:
+                cells.setdefault((x, y), []).append(room_id)
+        _zones[zone] = cells
+    return _zones[zone]
+
+
+def _cache(room_id, zone, x, y):
+    if zone in _zones:
+        room_ids = _zones[zone].setdefault((x, y), [])
+        if room_id not in room_ids:
+            room_ids.append(room_id)
+
+
+def _uncache(room_id, zone, x, y):
+    if zone in _zones:
+        room_ids = _zones[zone].get((x, y), [])
+        if room_id in room_ids:
+            room_ids.remove(room_id)
+            if not room_ids:
+                del _zones[zone][(x, y)]
+
+
+def _rooms(ids):
+    """Loads rooms by id in one query."""
+    if not ids:
+        return []
+    return list(ObjectDB.objects.filter(id__in=ids))
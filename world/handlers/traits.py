@@ -222,7 +222,7 @@ Example:
 
 from evennia.utils.dbserialize import _SaverDict
 from evennia.utils import logger, lazy_property
-from functools import total_ordering, reduce
+from functools import total_ordering, reduce, partial
 
 TRAIT_TYPES = ('static', 'counter', 'gauge')
 RANGE_TRAITS = ('counter', 'gauge')
@@ -247,6 +247,8 @@ class TraitHandler(object):
         if not obj.attributes.has(db_attribute):
             obj.attributes.add(db_attribute, {})
 
+        self.obj = obj
+        self.db_attribute = db_attribute
         self.attr_dict = obj.attributes.get(db_attribute)
         self.cache = {}
 
@@ -256,7 +258,7 @@ class TraitHandler(object):
 
     def __setattr__(self, key, value):
         """Returns error message if trait objects are assigned directly."""
-        if key in ('attr_dict', 'cache'):
+        if key in ('obj', 'db_attribute', 'attr_dict', 'cache'):
             super(TraitHandler, self).__setattr__(key, value)
         else:
             raise TraitException(
@@ -290,7 +292,7 @@ class TraitHandler(object):
             if trait not in self.attr_dict:
                 return None
             data = self.attr_dict[trait]
-            self.cache[trait] = Trait(data)
+            self.cache[trait] = Trait(data, on_change=partial(self._notify, trait))
         return self.cache[trait]
 
     def add(self, key, name, type='static',
@@ -300,20 +302,35 @@ class TraitHandler(object):
         if key in self.attr_dict:
             raise TraitException("Trait '{}' already exists.".format(key))
 
-        if type in TRAIT_TYPES:
-            trait = dict(name=name,
-                         type=type,
-                         base=base,
-                         mod=mod,
-                         extra=extra)
-            if min:
-                trait.update(dict(min=min))
-            if max:
-                trait.update(dict(max=max))
-
-            self.attr_dict[key] = trait
-        else:
-            raise TraitException("Invalid trait type specified.")
+        self.attr_dict[key] = self._trait_data(name, type, base, mod,
+                                               min, max, extra)
+        self._notify(key)
+
+    def batch_add(self, traits):
+        """
+        Create several new Traits with a single write to the database.
+        Args:
+            traits (iterable): dicts of the keyword arguments accepted by
+                `add`, ex. [{'key': 'Dex', 'name': 'Dexterity', 'base': 97}]
+        Note:
+            `add` saves the whole Attribute once per trait added. Use this
+            instead when setting up many traits at once, such as during
+            object creation.
+        """
+        new_traits = {}
+        for kwargs in traits:
+            kwargs = dict(kwargs)
+            key = kwargs.pop('key')
+            if key in self.attr_dict or key in new_traits:
+                raise TraitException("Trait '{}' already exists.".format(key))
+            new_traits[key] = self._trait_data(**kwargs)
+        attr_dict = dict(self.attr_dict)
+        attr_dict.update(new_traits)
+        self.obj.attributes.add(self.db_attribute, attr_dict)
+        self.attr_dict = self.obj.attributes.get(self.db_attribute)
+        self.cache = {}
+        for key in new_traits:
+            self._notify(key)
 
     def remove(self, trait):
         """Remove a Trait from the handler's parent object."""
@@ -323,6 +340,7 @@ class TraitHandler(object):
         if trait in self.cache:
             del self.cache[trait]
         del self.attr_dict[trait]
+        self._notify(trait)
 
     def clear(self):
         """Remove all Traits from the handler's parent object."""
@@ -339,6 +357,35 @@ class TraitHandler(object):
         """Return a dict of all traits in this TraitHandler."""
         return {k: v for k, v in sorted(self.attr_dict.items(), key=lambda item: (item[1]['base'] + item[1]['mod']), reverse=True)}
 
+    @staticmethod
+    def _trait_data(name, type='static', base=0, mod=0, min=None, max=None,
+                    extra={}):
+        """Returns the data dict stored for a new Trait."""
+        if type not in TRAIT_TYPES:
+            raise TraitException("Invalid trait type specified.")
+        trait = dict(name=name,
+                     type=type,
+                     base=base,
+                     mod=mod,
+                     extra=extra)
+        if min:
+            trait.update(dict(min=min))
+        if max:
+            trait.update(dict(max=max))
+        return trait
+
+    def _notify(self, trait):
+        """
+        Tells the parent object that one of its traits was added, removed,
+        or had its base, mod, or current value changed. Objects that keep
+        caches derived from traits implement the hook:
+
+            at_trait_change(db_attribute, trait_key)
+        """
+        hook = getattr(self.obj, 'at_trait_change', None)
+        if callable(hook):
+            hook(self.db_attribute, trait)
+
 
 @total_ordering
 class Trait(object):
@@ -346,7 +393,7 @@ class Trait(object):
     Note:
         See module docstring for configuration details.
     """
-    def __init__(self, data):
+    def __init__(self, data, on_change=None):
         if not 'name' in data:
             raise TraitException(
                 "Required key not found in trait data: 'name'")
@@ -366,6 +413,7 @@ class Trait(object):
             data['max'] = 'base' if self._type == 'gauge' else None
 
         self._data = data
+        self._on_change = on_change
         self._keys = ('name', 'type', 'base', 'mod',
                       'current', 'min', 'max', 'extra')
         self._locked = True
@@ -571,6 +619,7 @@ class Trait(object):
             self._data['base'] = amount
         if type(amount) in (int, float):
             self._data['base'] = self._enforce_bounds(amount)
+        self._changed()
 
     @property
     def mod(self):
@@ -589,6 +638,7 @@ class Trait(object):
                 else:
                     # but not decreases, unless current goes out of range
                     self.current = self._enforce_bounds(self.current)
+            self._changed()
 
     @property
     def min(self):
@@ -650,6 +700,7 @@ class Trait(object):
         if self._type in RANGE_TRAITS:
             if type(value) in (int, float):
                 self._data['current'] = self._enforce_bounds(value)
+                self._changed()
         else:
             raise AttributeError(
                 "'current' property is read-only on static 'Trait'.")
@@ -737,6 +788,11 @@ class Trait(object):
 
     # Private members
 
+    def _changed(self):
+        """Calls the change callback given by the TraitHandler, if any."""
+        if self._on_change:
+            self._on_change()
+
     def _mod_base(self):
         return self._enforce_bounds(self.mod + self.base)
 
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Trash Module.
+
+When an item breaks, it used to leave its own Trash object behind, so every
+fight filled rooms and the database with junk. Broken items are now added to
+a trash pile in their room instead: one Trash object that tallies the
+materials of everything broken into it (in its `materials` TraitHandler)
+and counts the pieces.
+
+Trash is kept bounded in three ways:
+    1. Broken items join the room's newest pile until it holds
+       MAX_PILE_PIECES pieces; only then is a new pile started.
+    2. A room holds at most MAX_PILES_PER_ROOM piles. Starting another
+       one clears away the oldest.
+    3. Every pile is tagged with the game day it expires, PILE_LIFETIME
+       after debris was last added to it. The TrashCollectorScript
+       (typeclasses.scripts) deletes expired piles in batches, one
+       database transaction per batch.
+
+Module Functions:
+    - room_of(obj)
+        The room an object is in, however deeply it is nested.
+    - break_item(item)
+        Adds a broken item to a trash pile in its room and deletes it.
+    - expire_piles(batch_size)
+        Deletes up to `batch_size` expired trash piles.
+"""
+from django.db import transaction
+from evennia import create_object, search_tag
+from evennia import utils as utils
+from evennia.typeclasses.tags import Tag
+from evennia.utils.logger import log_file
+from world.handlers import decay
+
+TRASH_TYPECLASS = 'typeclasses.items.Trash'
+ROOM_TYPECLASS = 'evennia.objects.objects.DefaultRoom'
+EXPIRY_CATEGORY = 'trash_expiry'
+MAX_PILE_PIECES = 50
+MAX_PILES_PER_ROOM = 3
+# game seconds a pile lasts after debris was last added to it
+PILE_LIFETIME = 2 * decay.DAY_SECONDS
+
+
+def room_of(obj):
+    """Returns the room an object is in, or None."""
+    while obj is not None and not utils.inherits_from(obj, ROOM_TYPECLASS):
+        obj = obj.location
+    return obj
+
+
+def break_item(item):
+    """
+    Adds a broken item's materials to a trash pile in the room it is in and
+    deletes the item.
+    Returns:
+        (Trash): the pile the item went to, or None if it was not in a room
+    """
+    room = room_of(item.location)
+    pile = None
+    if room is not None:
+        pile = _open_pile(room)
+        pile.add_debris(item)
+    item.delete()
+    return pile
+
+
+def schedule_expiry(pile):
+    """Tags a pile with the game day it should be cleared away."""
+    expires = str(int((decay.now() + PILE_LIFETIME) // decay.DAY_SECONDS))
+    old = pile.tags.get(category=EXPIRY_CATEGORY, return_list=True)
+    if old != [expires]:
+        pile.tags.clear(category=EXPIRY_CATEGORY)
+        pile.tags.add(expires, category=EXPIRY_CATEGORY)
+
+
+def expire_piles(batch_size=200):
+    """
+    Deletes trash piles whose expiry day has passed, in one transaction.
+    Returns:
+        (int): number of piles deleted
+    """
+    today = int(decay.now() // decay.DAY_SECONDS)
+    days = Tag.objects.filter(db_category=EXPIRY_CATEGORY).values_list(
+        'db_key', flat=True).distinct()
+    expired = []
+    for day in sorted((day for day in days if int(day) <= today), key=int):
+        expired += search_tag(day, category=EXPIRY_CATEGORY)
+        if len(expired) >= batch_size:
+            break
+    expired = expired[:batch_size]
+    with transaction.atomic():
+        for pile in expired:
+            pile.delete()
+    if expired:
+        log_file(f"Cleared away {len(expired)} expired trash piles.",
+                 filename='trash.log')
+    return len(expired)
+
+
+def _open_pile(room):
+    """Returns a pile in the room with space left, starting one if needed."""
+    piles = room.inventory.find_all('trash', 'pile')
+    for pile in reversed(piles):
+        if (pile.db.pieces or 0) < MAX_PILE_PIECES:
+            return pile
+    if len(piles) >= MAX_PILES_PER_ROOM:
+        # oldest first, as piles are indexed in the order they arrived
+        with transaction.atomic():
+            for old_pile in piles[:len(piles) - MAX_PILES_PER_ROOM + 1]:
+                old_pile.delete()
+    return create_object(TRASH_TYPECLASS, key='pile of broken junk',
+                         location=room, home=room)
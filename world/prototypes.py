@@ -88,3 +88,34 @@ See the `spawn` command and `evennia.prototypes.spawner.spawn` for more info.
 # "key": "goblin archwizard",
 # "prototype_parent" : ("GOBLIN_WIZARD", "ARCHWIZARD_MIXIN")
 # }
+
+
+## NPC prototypes
+# Spawned in bulk with world.npc_spawner (or the @spawnnpcs command); they
+# also work with the normal `spawn` command. `npc_stats` overrides the mean
+# and standard deviation of the rolled starting traits, see
+# world.character_creation.ROLLED_TRAITS.
+
+WILDERNESS_NPC = {
+    "prototype_key": "WILDERNESS_NPC",
+    "typeclass": "typeclasses.npcs.NPC",
+    "key": "wanderer",
+    "desc": "A weathered figure picking their way through the wilds.",
+    "tags": [("wilderness", "npc")],
+}
+
+SCAVENGER = {
+    "prototype_parent": "WILDERNESS_NPC",
+    "prototype_key": "SCAVENGER",
+    "key": "scavenger",
+    "desc": "A wiry scavenger with quick eyes and quicker hands.",
+    "npc_stats": {"Dex": (110, 10), "Str": (90, 9), "mass": (65, 6.5)},
+}
+
+RAIDER = {
+    "prototype_parent": "WILDERNESS_NPC",
+    "prototype_key": "RAIDER",
+    "key": "raider",
+    "desc": "A scarred raider wearing a patchwork of scavenged armor.",
+    "npc_stats": {"Str": (115, 11), "Vit": (110, 11), "FOP": (90, 9)},
+}
@@ -0,0 +1,203 @@
+# coding=utf-8
+"""
+Game data registries.
+
+The mutation, talent, and biome definitions used to live in large literal
+dicts inside their handler modules. They now live in data files under
+world/data/ so they can be edited without touching code:
+
+    world/data/mutations.json
+    world/data/talents.json
+    world/data/biomes.json
+
+A `.yaml` file with the same name is used instead of the `.json` file if
+one exists and PyYAML is installed.
+
+Parsing and validating a registry only happens when its data file changes.
+The validated data is marshalled into server/registry_cache/, keyed by the
+SHA-1 hash of the data file, so server starts and reloads just read the
+cache back in.
+
+Module Functions:
+    - load(name)
+        Returns the validated data dict for a registry, using the compiled
+        cache if the data file has not changed.
+    - reload_registries()
+        Loads every registry and swaps the new data into the handler
+        modules in one step. Used by the admin `@reloadregistries` command.
+"""
+import hashlib
+import marshal
+import os
+import json
+from importlib import import_module
+from evennia.utils.logger import log_file
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+GAME_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(GAME_DIR, 'world', 'data')
+CACHE_DIR = os.path.join(GAME_DIR, 'server', 'registry_cache')
+
+ABILITY_SCORES = ('Dex', 'Str', 'Vit', 'Per', 'FOP', 'Cha')
+
+
+class RegistryException(Exception):
+    """Raised when a registry data file is missing or fails validation."""
+    def __init__(self, msg):
+        self.msg = msg
+
+
+## Validators. Each takes the key and entry of one registry record and
+## raises RegistryException if the record is malformed.
+def _require(name, key, entry, fields):
+    """Checks an entry has every field, each of one of the allowed types."""
+    if not isinstance(entry, dict):
+        raise RegistryException(f"{name}: '{key}' is not a mapping.")
+    for field, types in fields.items():
+        if field not in entry:
+            raise RegistryException(f"{name}: '{key}' is missing '{field}'.")
+        if not isinstance(entry[field], types):
+            raise RegistryException(
+                f"{name}: '{key}.{field}' has invalid type "
+                f"{type(entry[field]).__name__}.")
+
+
+def _validate_mutation(key, entry):
+    _require('mutations', key, entry, {
+        'name': str, 'base': str, 'body_part': list, 'desc': str,
+        'prerequisites': (dict, type(None)),
+        'starting_score': (str, int, dict), 'extra': dict})
+    if entry['base'] not in ABILITY_SCORES:
+        raise RegistryException(f"mutations: '{key}' has unknown base "
+                                f"'{entry['base']}'.")
+
+
+def _validate_talent(key, entry):
+    _require('talents', key, entry, {
+        'name': str, 'base': str, 'desc': str,
+        'prerequisites': (dict, type(None)),
+        'starting_score': (str, int, dict)})
+    if entry['base'] not in ABILITY_SCORES:
+        raise RegistryException(f"talents: '{key}' has unknown base "
+                                f"'{entry['base']}'.")
+
+
+def _validate_biome(key, entry):
+    _require('biomes', key, entry, {
+        'name': str, 'type': str, 'desc': str,
+        'vegetation_min': (int, float), 'vegetation_max': (int, float),
+        'climate': list, 'biome_ratio': (int, float), 'extra': dict})
+
+
+# registry name: (data file stem, validator, handler module to install into)
+REGISTRIES = {
+    'mutations': ('mutations', _validate_mutation, 'world.handlers.mutations'),
+    'talents': ('talents', _validate_talent, 'world.handlers.talents'),
+    'biomes': ('biomes', _validate_biome, 'world.handlers.biomes'),
+}
+
+
+## Loading
+def _data_file(stem):
+    """Returns the path of the data file for a registry."""
+    if yaml is not None:
+        for ext in ('.yaml', '.yml'):
+            path = os.path.join(DATA_DIR, stem + ext)
+            if os.path.exists(path):
+                return path
+    path = os.path.join(DATA_DIR, stem + '.json')
+    if not os.path.exists(path):
+        raise RegistryException(f"No data file found for registry '{stem}'.")
+    return path
+
+
+def _parse(path, raw):
+    try:
+        if path.endswith('.json'):
+            return json.loads(raw.decode('utf-8'))
+        return yaml.safe_load(raw)
+    except Exception as err:
+        raise RegistryException(f"Could not parse {path}: {err}")
+
+
+def _read_cache(cache_path):
+    try:
+        with open(cache_path, 'rb') as cache_file:
+            return marshal.load(cache_file)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+
+
+def _write_cache(name, cache_path, data):
+    """Writes the compiled cache and removes stale ones for this registry."""
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        for old in os.listdir(CACHE_DIR):
+            if old.startswith(name + '-'):
+                os.remove(os.path.join(CACHE_DIR, old))
+        tmp_path = cache_path + '.tmp'
+        with open(tmp_path, 'wb') as cache_file:
+            marshal.dump(data, cache_file)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        # the cache is an optimization only; carry on with the parsed data
+        log_file(f"Could not write registry cache {cache_path}",
+                 filename='registries.log')
+
+
+def load(name):
+    """
+    Returns the validated data dict for the named registry.
+    Args:
+        name (str): one of the keys of REGISTRIES
+    Returns:
+        (dict): registry data, keyed by mutation/talent/biome key
+    """
+    if name not in REGISTRIES:
+        raise RegistryException(f"Unknown registry '{name}'.")
+    stem, validator, _ = REGISTRIES[name]
+    path = _data_file(stem)
+    with open(path, 'rb') as data_file:
+        raw = data_file.read()
+    digest = hashlib.sha1(raw).hexdigest()
+    cache_path = os.path.join(
+        CACHE_DIR, f"{name}-{digest}-{marshal.version}.marshal")
+
+    data = _read_cache(cache_path)
+    if data is not None:
+        return data
+
+    data = _parse(path, raw)
+    if not isinstance(data, dict):
+        raise RegistryException(f"{name}: top level of {path} must be a mapping.")
+    for key, entry in data.items():
+        validator(key, entry)
+    _write_cache(name, cache_path, data)
+    log_file(f"Compiled registry '{name}' from {path} ({len(data)} entries).",
+             filename='registries.log')
+    return data
+
+
+def reload_registries():
+    """
+    Reloads all registries from their data files and swaps them into the
+    handler modules. Every registry is loaded and validated before any
+    module is touched, so a bad data file leaves the running game as it was.
+    Returns:
+        (dict): {registry name: number of entries loaded}
+    """
+    loaded = {}
+    for name in REGISTRIES:
+        loaded[name] = load(name)
+    # build the new module state for every registry before swapping any in
+    installs = []
+    for name, data in loaded.items():
+        module = import_module(REGISTRIES[name][2])
+        installs.append((module, module.build_registry(data)))
+    for module, module_globals in installs:
+        vars(module).update(module_globals)
+    return {name: len(data) for name, data in loaded.items()}